@@ -1,8 +1,9 @@
 import ffn
 from ffn import data, get, merge, utils
 
-from . import algos, backtest, core
+from . import algos, backtest, core, execution
 from .backtest import Backtest, run
+from .execution import ExecutionModel, NextBarExecution
 from .core import Algo, AlgoStack, CouponPayingHedgeSecurity, CouponPayingSecurity, FixedIncomeSecurity, FixedIncomeStrategy, HedgeSecurity, Security, Strategy
 
 __version__ = "1.1.0"
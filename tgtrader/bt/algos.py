@@ -131,11 +131,31 @@ class RunOnce(Algo):
 
 
 class RunPeriod(Algo):
-    def __init__(self, run_on_first_date=True, run_on_end_of_period=False, run_on_last_date=False):
+    """
+    Base class of the period change algos.
+
+    Args:
+        * run_on_first_date (bool): determines if it runs the first time the algo is called
+        * run_on_end_of_period (bool): determines if it should run at the end of the period
+          or the beginning
+        * run_on_last_date (bool): determines if it runs on the last time the algo is called
+        * calendar (TradingCalendar): Optional trading calendar for daily bars. If set,
+          period boundaries come from the calendar's precomputed first/last session
+          flags (an O(1) lookup) instead of comparing neighbouring dates of the data
+          index. This also runs at the end of a period on the last bar of the data and
+          handles ISO weeks that span a year change.
+
+    """
+
+    # frequency of the period in the trading calendar, None if not supported
+    calendar_freq = None
+
+    def __init__(self, run_on_first_date=True, run_on_end_of_period=False, run_on_last_date=False, calendar=None):
         super(RunPeriod, self).__init__()
         self._run_on_first_date = run_on_first_date
         self._run_on_end_of_period = run_on_end_of_period
         self._run_on_last_date = run_on_last_date
+        self._calendar = calendar if self.calendar_freq is not None else None
 
     def __call__(self, target):
         # get last date
@@ -145,12 +165,14 @@ class RunPeriod(Algo):
         if now is None:
             return False
 
-        # not a known date in our universe
-        if now not in target.data.index:
-            return False
-
         # get index of the current date
-        index = target.data.index.get_loc(target.now)
+        # target.inow is kept in sync with now by the update loop
+        index = target.inow
+        if index >= len(target.data.index) or target.data.index[index] != now:
+            # not a known date in our universe
+            if now not in target.data.index:
+                return False
+            index = target.data.index.get_loc(now)
 
         result = False
 
@@ -161,6 +183,13 @@ class RunPeriod(Algo):
         if index == 1:
             if self._run_on_first_date:
                 result = True
+        elif self._calendar is not None:
+            if self._run_on_last_date and index == (len(target.data.index) - 1):
+                result = True
+            elif self._run_on_end_of_period:
+                result = self._calendar.is_period_end(now, self.calendar_freq)
+            else:
+                result = self._calendar.is_period_start(now, self.calendar_freq)
         # last date
         elif index == (len(target.data.index) - 1):
             if self._run_on_last_date:
@@ -216,6 +245,7 @@ class RunWeekly(RunPeriod):
         * run_on_end_of_period (bool): determines if it should run at the end of the period
           or the beginning
         * run_on_last_date (bool): determines if it runs on the last time the algo is called
+        * calendar (TradingCalendar): Optional trading calendar, see :class:`RunPeriod`
 
     Returns True if the target.now's week has changed
     since relative to the last(or next) date, if not returns False. Useful for
@@ -223,6 +253,8 @@ class RunWeekly(RunPeriod):
 
     """
 
+    calendar_freq = "W"
+
     def compare_dates(self, now, date_to_compare):
         if now.year != date_to_compare.year or now.week != date_to_compare.week:
             return True
@@ -238,6 +270,7 @@ class RunMonthly(RunPeriod):
         * run_on_end_of_period (bool): determines if it should run at the end of the period
           or the beginning
         * run_on_last_date (bool): determines if it runs on the last time the algo is called
+        * calendar (TradingCalendar): Optional trading calendar, see :class:`RunPeriod`
 
     Returns True if the target.now's month has changed
     since relative to the last(or next) date, if not returns False. Useful for
@@ -245,6 +278,8 @@ class RunMonthly(RunPeriod):
 
     """
 
+    calendar_freq = "M"
+
     def compare_dates(self, now, date_to_compare):
         if now.year != date_to_compare.year or now.month != date_to_compare.month:
             return True
@@ -260,6 +295,7 @@ class RunQuarterly(RunPeriod):
         * run_on_end_of_period (bool): determines if it should run at the end of the period
           or the beginning
         * run_on_last_date (bool): determines if it runs on the last time the algo is called
+        * calendar (TradingCalendar): Optional trading calendar, see :class:`RunPeriod`
 
     Returns True if the target.now's quarter has changed
     since relative to the last(or next) date, if not returns False. Useful for
@@ -267,6 +303,8 @@ class RunQuarterly(RunPeriod):
 
     """
 
+    calendar_freq = "Q"
+
     def compare_dates(self, now, date_to_compare):
         if now.year != date_to_compare.year or now.quarter != date_to_compare.quarter:
             return True
@@ -282,6 +320,7 @@ class RunYearly(RunPeriod):
         * run_on_end_of_period (bool): determines if it should run at the end of the period
           or the beginning
         * run_on_last_date (bool): determines if it runs on the last time the algo is called
+        * calendar (TradingCalendar): Optional trading calendar, see :class:`RunPeriod`
 
     Returns True if the target.now's year has changed
     since relative to the last(or next) date, if not returns False. Useful for
@@ -289,12 +328,85 @@ class RunYearly(RunPeriod):
 
     """
 
+    calendar_freq = "Y"
+
     def compare_dates(self, now, date_to_compare):
         if now.year != date_to_compare.year:
             return True
         return False
 
 
+class RunOnSessionOpen(Algo):
+    """
+    Returns True on the first bar of each trading session.
+
+    Intended for intraday (e.g. minute bar) backtests. Uses the session
+    boundaries precomputed by the Backtest, so there is no date arithmetic
+    per bar. With daily data every bar is a session and this always runs.
+
+    Args:
+        * offset (int): Run on the n-th bar of the session instead of the
+          first one (0 = first bar).
+
+    """
+
+    def __init__(self, offset=0):
+        super(RunOnSessionOpen, self).__init__()
+        self.offset = offset
+
+    def __call__(self, target):
+        if target.inow == 0:
+            return False
+        sessions = target.get_data("sessions")
+        return sessions.bar_in_session[target.inow] == self.offset
+
+
+class RunOnSessionClose(Algo):
+    """
+    Returns True on the last bar of each trading session.
+
+    Intended for intraday (e.g. minute bar) backtests, i.e. to flatten
+    positions before the close. Uses the session boundaries precomputed by
+    the Backtest.
+
+    """
+
+    def __init__(self):
+        super(RunOnSessionClose, self).__init__()
+
+    def __call__(self, target):
+        if target.inow == 0:
+            return False
+        sessions = target.get_data("sessions")
+        return bool(sessions.is_last[target.inow])
+
+
+class RunEveryNBars(Algo):
+    """
+    Returns True every n bars within a trading session.
+
+    The counter restarts at every session open, which is usually what is
+    wanted for intraday strategies (i.e. every 30 minutes on minute bars).
+
+    Args:
+        * n (int): Run every n bars
+        * offset (int): Bar within each session on which to run first
+
+    """
+
+    def __init__(self, n, offset=0):
+        super(RunEveryNBars, self).__init__()
+        self.n = n
+        self.offset = offset
+
+    def __call__(self, target):
+        if target.inow == 0:
+            return False
+        sessions = target.get_data("sessions")
+        pos = sessions.bar_in_session[target.inow] - self.offset
+        return pos >= 0 and pos % self.n == 0
+
+
 class RunOnDate(Algo):
     """
     Returns True on a specific set of dates.
@@ -468,25 +580,33 @@ class SelectAll(Algo):
         * include_no_data (bool): Include securities that do not have data?
         * include_negative (bool): Include securities that have negative
           or zero prices?
+        * membership: Optional point-in-time universe with a
+          filter(date, tickers) method (e.g. UniverseIndex). Securities
+          that are not members on the current date are not selected.
     Sets:
         * selected
 
     """
 
-    def __init__(self, include_no_data=False, include_negative=False):
+    def __init__(self, include_no_data=False, include_negative=False, membership=None):
         super(SelectAll, self).__init__()
         self.include_no_data = include_no_data
         self.include_negative = include_negative
+        self.membership = membership
 
     def __call__(self, target):
         if self.include_no_data:
-            target.temp["selected"] = target.universe.columns
+            selected = target.universe.columns
         else:
             universe = target.universe.loc[target.now].dropna()
             if self.include_negative:
-                target.temp["selected"] = list(universe.index)
+                selected = list(universe.index)
             else:
-                target.temp["selected"] = list(universe[universe > 0].index)
+                selected = list(universe[universe > 0].index)
+
+        if self.membership is not None:
+            selected = self.membership.filter(target.now, list(selected))
+        target.temp["selected"] = selected
         return True
 
 
@@ -554,6 +674,9 @@ class SelectHasData(Algo):
         * include_no_data (bool): Include securities that do not have data?
         * include_negative (bool): Include securities that have negative
           or zero prices?
+        * membership: Optional point-in-time universe with a
+          filter(date, tickers) method (e.g. UniverseIndex). Securities
+          that are not members on the current date are not selected.
     Sets:
         * selected
 
@@ -565,6 +688,7 @@ class SelectHasData(Algo):
         min_count=None,
         include_no_data=False,
         include_negative=False,
+        membership=None,
     ):
         super(SelectHasData, self).__init__()
         self.lookback = lookback
@@ -573,6 +697,7 @@ class SelectHasData(Algo):
         self.min_count = min_count
         self.include_no_data = include_no_data
         self.include_negative = include_negative
+        self.membership = membership
 
     def __call__(self, target):
         if "selected" in target.temp:
@@ -580,6 +705,9 @@ class SelectHasData(Algo):
         else:
             selected = target.universe.columns
 
+        if self.membership is not None:
+            selected = self.membership.filter(target.now, list(selected))
+
         filt = target.universe.loc[target.now - self.lookback :, selected]
         cnt = filt.count()
         cnt = cnt[cnt >= self.min_count]
@@ -700,9 +828,11 @@ class SelectWhere(Algo):
     as data > 100.
 
     Args:
-        * signal (str|DataFrame): Boolean DataFrame containing selection logic.
-          If a string is passed, frame is accessed using target.get_data
-          This is the preferred way of using the algo.
+        * signal (str|DataFrame|callable): Boolean DataFrame containing
+          selection logic. If a string is passed, frame is accessed using
+          target.get_data. This is the preferred way of using the algo.
+          If a callable is passed, it is called once with the target on
+          first use and must return the DataFrame (e.g. a factor selector).
         * include_no_data (bool): Include securities that do not have data?
         * include_negative (bool): Include securities that have negative
           or zero prices?
@@ -714,9 +844,14 @@ class SelectWhere(Algo):
 
     def __init__(self, signal, include_no_data=False, include_negative=False):
         super(SelectWhere, self).__init__()
+        self.signal_fn = None
         if isinstance(signal, pd.DataFrame):
             self.signal_name = None
             self.signal = signal
+        elif callable(signal):
+            self.signal_name = None
+            self.signal = None
+            self.signal_fn = signal
         else:
             self.signal_name = signal
             self.signal = None
@@ -726,7 +861,11 @@ class SelectWhere(Algo):
 
     def __call__(self, target):
         # get signal Series at target.now
-        if self.signal_name is None:
+        if self.signal_fn is not None:
+            if self.signal is None:
+                self.signal = self.signal_fn(target)
+            signal = self.signal
+        elif self.signal_name is None:
             signal = self.signal
         else:
             signal = target.get_data(self.signal_name)
@@ -1050,9 +1189,11 @@ class WeighTarget(Algo):
     target weights are set.
 
     Args:
-        * weights (str|DataFrame): DataFrame containing the target weights
-          If a string is passed, frame is accessed using target.get_data
-          This is the preferred way of using the algo.
+        * weights (str|DataFrame|callable): DataFrame containing the target
+          weights. If a string is passed, frame is accessed using
+          target.get_data. This is the preferred way of using the algo.
+          If a callable is passed, it is called once with the target on
+          first use and must return the DataFrame (e.g. a factor weigher).
 
     Sets:
         * weights
@@ -1061,16 +1202,25 @@ class WeighTarget(Algo):
 
     def __init__(self, weights):
         super(WeighTarget, self).__init__()
+        self.weights_fn = None
         if isinstance(weights, pd.DataFrame):
             self.weights_name = None
             self.weights = weights
+        elif callable(weights):
+            self.weights_name = None
+            self.weights = None
+            self.weights_fn = weights
         else:
             self.weights_name = weights
             self.weights = None
 
     def __call__(self, target):
         # get current target weights
-        if self.weights_name is None:
+        if self.weights_fn is not None:
+            if self.weights is None:
+                self.weights = self.weights_fn(target)
+            weights = self.weights
+        elif self.weights_name is None:
             weights = self.weights
         else:
             weights = target.get_data(self.weights_name)
@@ -121,6 +121,19 @@ class Backtest(object):
               will by used
               by :class:`CouponPayingSecurity <bt.core.CouponPayingSecurity>`
               to calculate asymmetric holding cost of long (or short) positions.
+            - ``lot_size``: A dict or Series of board lots by security name, used
+              to round integer positions (see :func:`lot_sizes <bt.execution.lot_sizes>`)
+            - ``open``/``volume``: DataFrames with the same format as 'data', used
+              by :class:`NextBarExecution <bt.execution.NextBarExecution>`
+              for fill prices and participation caps.
+        * execution_model (ExecutionModel): Optional execution model. If provided,
+          allocations are turned into orders and filled by the model on later
+          bars instead of immediately at the current price. The model is copied
+          like the strategy, so the same instance can be reused across backtests.
+        * calendar (TradingCalendar): Optional trading calendar. If provided, the
+          virtual starting row is placed on the session before the first date
+          instead of one calendar day before it, and the calendar is available to
+          algos via get_data("calendar").
 
 
     Attributes:
@@ -149,6 +162,8 @@ class Backtest(object):
         integer_positions=True,
         progress_bar=False,
         additional_data=None,
+        execution_model=None,
+        calendar=None,
     ):
         if data.columns.duplicated().any():
             cols = data.columns[data.columns.duplicated().tolist()].tolist()
@@ -159,8 +174,15 @@ class Backtest(object):
         self.strategy = deepcopy(strategy)
         self.strategy.use_integer_positions(integer_positions)
 
+        self.calendar = calendar
         self._process_data(data, additional_data)
 
+        self.execution_model = deepcopy(execution_model)
+        if self.execution_model is not None:
+            # fills at custom prices go through bid/offer tracking, which
+            # needs a (here all zero) bidoffer to be set
+            self.additional_data.setdefault("bidoffer", pd.DataFrame(index=self.data.index))
+
         self.initial_capital = initial_capital
         self.name = name if name is not None else strategy.name
         self.progress_bar = progress_bar
@@ -182,12 +204,18 @@ class Backtest(object):
         # be adjusted at 0, and hide the 'total' return. The series should
         # start at 100, but may start at 90, for example. Here, we add a
         # starting point at t0-1day, and this is the reference starting point
+        t0 = data.index[0]
+        start = None
+        if self.calendar is not None:
+            start = self.calendar.previous_session(t0)
+        if start is None:
+            start = t0 - pd.DateOffset(days=1)
         data_new = pd.concat(
             [
                 pd.DataFrame(
                     np.nan,
                     columns=data.columns,
-                    index=[data.index[0] - pd.DateOffset(days=1)],
+                    index=[start],
                 ),
                 data,
             ]
@@ -195,8 +223,13 @@ class Backtest(object):
 
         self.data = data_new
         self.dates = data_new.index
+        self.sessions = Sessions(self.dates)
 
         self.additional_data = (additional_data or {}).copy()
+        # precomputed session boundaries, available to algos via get_data("sessions")
+        self.additional_data.setdefault("sessions", self.sessions)
+        if self.calendar is not None:
+            self.additional_data.setdefault("calendar", self.calendar)
 
         # Look for data frames with the same index as (original) data,
         # and add in the first row as well (i.e. "bidoffer")
@@ -227,6 +260,8 @@ class Backtest(object):
 
         # setup strategy
         self.strategy.setup(self.data, **self.additional_data)
+        if self.execution_model is not None:
+            self.execution_model.setup(self.strategy, self.data, **self.additional_data)
 
         # adjust strategy with initial capital
         self.strategy.adjust(self.initial_capital)
@@ -238,21 +273,27 @@ class Backtest(object):
 
         # since there is a dummy row at time 0, start backtest at date 1.
         # we must still update for t0
-        self.strategy.update(self.dates[0])
+        self.strategy.update(self.dates[0], None, 0)
 
         # and for the backtest loop, start at date 1
-        for dt in self.dates[1:]:
+        # pass the integer bar index along so nodes never have to look up
+        # the date in the index (matters for intraday data with many bars)
+        for inow, dt in enumerate(self.dates[1:], 1):
             # update progress bar
             if self.progress_bar:
                 bar.update()
 
             # update strategy
-            self.strategy.update(dt)
+            self.strategy.update(dt, None, inow)
+
+            # fill pending orders before the algos decide on this bar
+            if self.execution_model is not None:
+                self.execution_model.process(inow)
 
             if not self.strategy.bankrupt:
                 self.strategy.run()
                 # need update after to save weights, values and such
-                self.strategy.update(dt)
+                self.strategy.update(dt, None, inow)
             else:
                 if self.progress_bar:
                     bar.stop()
@@ -359,6 +400,54 @@ class Backtest(object):
         return mrg["outlay"] / mrg["nav"]
 
 
+class Sessions(object):
+    """
+    Precomputed trading session boundaries for a bar index.
+
+    A session is a calendar day. With daily data every bar is its own session,
+    with intraday (e.g. minute) data a session holds all bars of one trading
+    day. All lookups are by integer bar index (see Node.inow), so algos can
+    detect session open/close without Timestamp arithmetic.
+
+    Args:
+        * dates (DatetimeIndex): Bar index of the backtest
+
+    Attributes:
+        * session_ids (ndarray): Session number of each bar
+        * is_first (ndarray): True on the first bar of a session
+        * is_last (ndarray): True on the last bar of a session
+        * bar_in_session (ndarray): Position of each bar within its session
+        * first_bar (ndarray): Index of the first bar of each session
+        * last_bar (ndarray): Index of the last bar of each session
+
+    """
+
+    def __init__(self, dates):
+        days = pd.DatetimeIndex(dates).normalize().asi8
+        n = len(days)
+
+        change = np.empty(n, dtype=bool)
+        if n > 0:
+            change[0] = True
+            change[1:] = days[1:] != days[:-1]
+
+        self.is_first = change
+        self.is_last = np.empty(n, dtype=bool)
+        if n > 0:
+            self.is_last[:-1] = change[1:]
+            self.is_last[-1] = True
+
+        self.session_ids = np.cumsum(change) - 1
+        self.first_bar = np.flatnonzero(self.is_first)
+        self.last_bar = np.flatnonzero(self.is_last)
+
+        bar_idx = np.arange(n)
+        self.bar_in_session = bar_idx - self.first_bar[self.session_ids] if n > 0 else bar_idx
+
+    def __len__(self):
+        return len(self.first_bar)
+
+
 class Result(ffn.GroupStats):
     """
     Based on ffn's GroupStats with a few extra helper methods.
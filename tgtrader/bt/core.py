@@ -72,6 +72,7 @@ class Node(object):
     _fixed_income = cy.declare(cy.bint)
     _bidoffer_set = cy.declare(cy.bint)
     _bidoffer_paid = cy.declare(cy.double)
+    _inow = cy.declare(cy.int)
 
     def __init__(self, name, parent=None, children=None):
         self.name = name
@@ -100,6 +101,8 @@ class Node(object):
 
         # set default value for now
         self.now = 0
+        # integer position of now in the data index, saves get_loc lookups
+        self._inow = 0
         # make sure root has stale flag
         # used to avoid unnecessary update
         # sometimes we change values in the tree and we know that we will need
@@ -259,6 +262,13 @@ class Node(object):
             self.root.update(self.root.now, None)
         return self._weight
 
+    @property
+    def inow(self):
+        """
+        Integer position of the current date (now) in the data index.
+        """
+        return self._inow
+
     def setup(self, universe, **kwargs):
         """
         Setup method used to initialize a Node with a universe, and potentially other information.
@@ -395,6 +405,9 @@ class StrategyBase(Node):
         self._positions = None
         self.bankrupt = False
 
+        # set by the Backtest when orders are filled by an execution model
+        self.execution_model = None
+
     @property
     def price(self):
         """
@@ -621,10 +634,20 @@ class StrategyBase(Node):
         self._fees = self.data["fees"]
         self._all_flows = self.data["flows"]
 
+        # cache the underlying arrays - writing through them on every bar is
+        # much cheaper than going through Series.values
+        self._prices_arr = self._prices.values
+        self._values_arr = self._values.values
+        self._notl_values_arr = self._notl_values.values
+        self._cash_arr = self._cash.values
+        self._fees_arr = self._fees.values
+        self._all_flows_arr = self._all_flows.values
+
         if "bidoffer" in kwargs:
             self._bidoffer_set = True
             self.data["bidoffer_paid"] = 0.0
             self._bidoffers_paid = self.data["bidoffer_paid"]
+            self._bidoffers_paid_arr = self._bidoffers_paid.values
 
         # setup children as well - use original universe here - don't want to
         # pollute with potential strategy children in funiverse
@@ -689,8 +712,12 @@ class StrategyBase(Node):
         if inow is None:
             if self.now == 0:
                 inow = 0
+            elif not newpt:
+                # same date as last update - reuse the known position
+                inow = self._inow
             else:
                 inow = self.data.index.get_loc(date)
+        self._inow = inow
 
         # update children if any and calculate value
         val = self._capital  # default if no children
@@ -731,14 +758,14 @@ class StrategyBase(Node):
         # won't change
         if newpt or not is_zero(self._value - val) or not is_zero(self._notl_value - notl_val):
             self._value = val
-            self._values.values[inow] = val
+            self._values_arr[inow] = val
 
             self._notl_value = notl_val
-            self._notl_values.values[inow] = notl_val
+            self._notl_values_arr[inow] = notl_val
 
             if self._bidoffer_set:
                 self._bidoffer_paid = bidoffer_paid
-                self._bidoffers_paid.values[inow] = bidoffer_paid
+                self._bidoffers_paid_arr[inow] = bidoffer_paid
 
             if self.fixed_income:
                 # For notional weights, we compute additive return
@@ -760,7 +787,7 @@ class StrategyBase(Node):
                         )
 
                 self._price = self._last_price + ret
-                self._prices.values[inow] = self._price
+                self._prices_arr[inow] = self._price
 
             else:
                 bottom = self._last_value + self._net_flows
@@ -786,7 +813,7 @@ class StrategyBase(Node):
                         )
 
                 self._price = self._last_price * (1 + ret)
-                self._prices.values[inow] = self._price
+                self._prices_arr[inow] = self._price
 
         # update children weights
         if self.children:
@@ -815,9 +842,9 @@ class StrategyBase(Node):
         # Cash should track the unallocated capital at the end of the day, so
         # we should update it every time we call "update".
         # Same for fees and flows
-        self._cash.values[inow] = self._capital
-        self._fees.values[inow] = self._last_fee
-        self._all_flows.values[inow] = self._net_flows
+        self._cash_arr[inow] = self._capital
+        self._fees_arr[inow] = self._last_fee
+        self._all_flows_arr[inow] = self._net_flows
 
         # update paper trade if necessary
         if self._paper_trade:
@@ -827,7 +854,7 @@ class StrategyBase(Node):
                 self._paper.update(date)
             # update price
             self._price = self._paper.price
-            self._prices.values[inow] = self._price
+            self._prices_arr[inow] = self._price
 
     @cy.locals(amount=cy.double, update=cy.bint, flow=cy.bint, fees=cy.double)
     def adjust(self, amount, update=True, flow=True, fee=0.0):
@@ -1159,6 +1186,10 @@ class SecurityBase(Node):
         * bidoffer (float): Current bid/offer spread
         * bidoffers (TimeSeries): Series of bid/offer spreads
         * bidoffer_paid (TimeSeries): Series of bid/offer paid on transactions
+        * lot_size (float): Board lot. With integer positions, allocations are
+          rounded down to a multiple of it (closing a position is not rounded
+          so odd lots can always be sold). Set from the ``lot_size`` setup
+          kwarg, a dict or Series keyed by security name.
     """
 
     _last_pos = cy.declare(cy.double)
@@ -1178,6 +1209,8 @@ class SecurityBase(Node):
         self._position = 0
         self.multiplier = multiplier
         self.lazy_add = lazy_add
+        # board lot - with integer positions, quantities are multiples of it
+        self.lot_size = 1
 
         # opt
         self._last_pos = 0
@@ -1379,6 +1412,20 @@ class SecurityBase(Node):
 
             self.data["bidoffer_paid"] = 0.0
             self._bidoffers_paid = self.data["bidoffer_paid"]
+            self._bidoffers_arr = self._bidoffers.values
+            self._bidoffers_paid_arr = self._bidoffers_paid.values
+
+        # cache the underlying arrays - writing through them on every bar is
+        # much cheaper than going through Series.values
+        self._prices_arr = self._prices.values
+        self._values_arr = self._values.values
+        self._notl_values_arr = self._notl_values.values
+        self._positions_arr = self._positions.values
+        self._outlays_arr = self._outlays.values
+
+        # lot sizes are looked up by name (dict or Series)
+        if "lot_size" in kwargs:
+            self.lot_size = kwargs["lot_size"].get(self.name, 1)
 
     @cy.locals(prc=cy.double)
     def update(self, date, data=None, inow=None):
@@ -1396,8 +1443,12 @@ class SecurityBase(Node):
         if inow is None:
             if date == 0:
                 inow = 0
+            elif date == self.parent.now:
+                # parent has already resolved the position of this date
+                inow = self.parent._inow
             else:
                 inow = self.data.index.get_loc(date)
+        self._inow = inow
 
         # date change - update price
         if date != self.now:
@@ -1405,19 +1456,19 @@ class SecurityBase(Node):
             self.now = date
 
             if self._prices_set:
-                self._price = self._prices.values[inow]
+                self._price = self._prices_arr[inow]
             # traditional data update
             elif data is not None:
                 prc = data[self.name]
                 self._price = prc
-                self._prices.values[inow] = prc
+                self._prices_arr[inow] = prc
 
             # update bid/offer
             if self._bidoffer_set:
-                self._bidoffer = self._bidoffers.values[inow]
+                self._bidoffer = self._bidoffers_arr[inow]
                 self._bidoffer_paid = 0.0
 
-        self._positions.values[inow] = self._position
+        self._positions_arr[inow] = self._position
         self._last_pos = self._position
 
         if np.isnan(self._price):
@@ -1430,20 +1481,20 @@ class SecurityBase(Node):
 
         self._notl_value = self._value
 
-        self._values.values[inow] = self._value
-        self._notl_values.values[inow] = self._notl_value
+        self._values_arr[inow] = self._value
+        self._notl_values_arr[inow] = self._notl_value
 
         if is_zero(self._weight) and is_zero(self._position):
             self._needupdate = False
 
         # save outlay to outlays
         if self._outlay != 0:
-            self._outlays.values[inow] += self._outlay
+            self._outlays_arr[inow] += self._outlay
             # reset outlay back to 0
             self._outlay = 0
 
         if self._bidoffer_set:
-            self._bidoffers_paid.values[inow] = self._bidoffer_paid
+            self._bidoffers_paid_arr[inow] = self._bidoffer_paid
 
     @cy.locals(amount=cy.double, update=cy.bint, q=cy.double, outlay=cy.double, i=cy.int)
     def allocate(self, amount, update=True):
@@ -1484,6 +1535,12 @@ class SecurityBase(Node):
         if is_zero(self._price) or np.isnan(self._price):
             raise Exception("Cannot allocate capital to " "%s because price is %s as of %s" % (self.name, self._price, self.parent.now))
 
+        # hand the order to the execution model, it will trade on later bars
+        execution_model = self.root.execution_model
+        if execution_model is not None:
+            execution_model.submit(self, amount)
+            return
+
         # buy/sell
         # determine quantity - must also factor in commission
         # closing out?
@@ -1494,10 +1551,10 @@ class SecurityBase(Node):
             if self.integer_positions:
                 if (self._position > 0) or (is_zero(self._position) and (amount > 0)):
                     # if we're going long or changing long position
-                    q = math.floor(q)
+                    q = math.floor(q / self.lot_size) * self.lot_size
                 else:
                     # if we're going short or changing short position
-                    q = math.ceil(q)
+                    q = math.ceil(q / self.lot_size) * self.lot_size
 
         # if q is 0 nothing to do
         if is_zero(q) or np.isnan(q):
@@ -1540,16 +1597,16 @@ class SecurityBase(Node):
                 q = q - dq_wout_considering_tx_costs
 
                 if self.integer_positions:
-                    q = math.floor(q)
+                    q = math.floor(q / self.lot_size) * self.lot_size
 
                 full_outlay, _, _, _ = self.outlay(q)
 
                 # if our q is too low and we have integer positions
                 # then we know that the correct quantity is the one  where
-                # the outlay of q + 1 < amount. i.e. if we bought one more
-                # position then we wouldn't have enough cash
+                # the outlay of q + 1 lot < amount. i.e. if we bought one more
+                # lot then we wouldn't have enough cash
                 if self.integer_positions:
-                    full_outlay_of_1_more, _, _, _ = self.outlay(q + 1)
+                    full_outlay_of_1_more, _, _, _ = self.outlay(q + self.lot_size)
 
                     if full_outlay < amount and full_outlay_of_1_more > amount:
                         break
@@ -1726,7 +1783,7 @@ class FixedIncomeSecurity(SecurityBase):
 
         # For fixed income securities (bonds, swaps), notional value is position size, not value!
         self._notl_value = self._position
-        self._notl_values.values[inow] = self._notl_value
+        self._notl_values_arr[inow] = self._notl_value
 
 
 class CouponPayingSecurity(FixedIncomeSecurity):
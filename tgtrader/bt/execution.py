@@ -0,0 +1,320 @@
+"""
+Execution models.
+
+By default bt fills every allocation immediately at the security's current
+price. An execution model attached to a Backtest intercepts
+SecurityBase.allocate, turns the allocation into an order and fills it on
+later bars according to its own rules.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from .core import is_zero
+
+
+class ExecutionModel(object):
+    """
+    Base class for execution models.
+
+    Lifecycle:
+        * setup is called once by the Backtest after the strategy has been
+          set up.
+        * submit is called by SecurityBase.allocate instead of trading
+          immediately.
+        * process is called by the Backtest on every bar, after the strategy
+          has been updated with the bar's prices and before its algos run.
+    """
+
+    def setup(self, strategy, universe, **kwargs):
+        self.strategy = strategy
+        strategy.execution_model = self
+
+    def submit(self, security, amount):
+        raise NotImplementedError()
+
+    def process(self, inow):
+        raise NotImplementedError()
+
+
+class NextBarExecution(ExecutionModel):
+    """
+    Fills orders on the bar after the decision, optionally capped by volume
+    and blocked at the daily price limits.
+
+    An allocation is converted into a target position using the decision
+    bar's price. From the next bar on, the order trades towards that target
+    at the fill price (the next bar's open by default):
+
+        * if participation_rate is set, at most participation_rate * volume
+          is traded per bar and the rest is carried to the following bars
+        * bars with no volume (suspensions) or no fill price are skipped
+        * if limit_pct is set, buys are blocked when the bar opens at the
+          limit up, and sells are blocked when it opens at the limit down
+        * buys are capped by the cash available in the parent strategy,
+          sells are processed first so their proceeds can fund buys
+        * an order whose capped quantity is less than one lot (or nothing,
+          without integer positions) is cancelled instead of being carried
+
+    A new allocation on a security replaces its pending order. Only pending
+    orders are visited on each bar, so the cost per bar is O(orders).
+
+    Args:
+        * fill_price (str): Key of the additional data DataFrame holding the
+          fill prices (e.g. "open"). If the key is not present the universe
+          (usually close) prices are used.
+        * volume (str): Key of the additional data DataFrame holding volume.
+        * participation_rate (float): Max fraction of a bar's volume that can
+          be traded. None means no cap.
+        * volume_unit (float): Number of shares per volume unit. Defaults to
+          100 as akshare reports A-share and ETF volume in lots of 100; use 1
+          for volume in shares.
+        * limit_pct (float, dict, Series): Daily price limit as a fraction of
+          the previous close, either one value for all securities or a
+          mapping by security name. None disables limit checks.
+        * limit_tolerance (float): Tolerance when comparing the open to the
+          limit price, to absorb the rounding of limit prices to ticks.
+        * max_bars (int): Cancel orders still unfilled after this many bars.
+          None keeps them until filled or replaced.
+
+    Attributes:
+        * orders (dict): Pending orders by security name.
+        * fills (list): (date, security, quantity, price, requested) tuples.
+        * cancels (list): (date, security, unfilled quantity) tuples.
+    """
+
+    def __init__(
+        self,
+        fill_price="open",
+        volume="volume",
+        participation_rate=None,
+        volume_unit=100.0,
+        limit_pct=None,
+        limit_tolerance=1e-3,
+        max_bars=None,
+    ):
+        self.fill_price = fill_price
+        self.volume = volume
+        self.participation_rate = participation_rate
+        self.volume_unit = volume_unit
+        self.limit_pct = limit_pct
+        self.limit_tolerance = limit_tolerance
+        self.max_bars = max_bars
+
+        self.orders = {}
+        self.fills = []
+        self.cancels = []
+
+    def setup(self, strategy, universe, **kwargs):
+        super(NextBarExecution, self).setup(strategy, universe, **kwargs)
+
+        self.dates = universe.index
+        self._columns = {c: i for i, c in enumerate(universe.columns)}
+
+        # plain 2d arrays aligned with the universe, looked up by (bar, column)
+        self._fill_prices = self._aligned_values(kwargs.get(self.fill_price), universe)
+        if self._fill_prices is None:
+            self._fill_prices = universe.values.astype(float)
+
+        self._volumes = None
+        if self.participation_rate is not None:
+            self._volumes = self._aligned_values(kwargs.get(self.volume), universe)
+            if self._volumes is None:
+                raise ValueError('participation_rate requires "%s" in additional data' % self.volume)
+
+        if self.limit_pct is None or isinstance(self.limit_pct, (dict, pd.Series)):
+            self._limits = self.limit_pct
+        else:
+            self._limits = {c: float(self.limit_pct) for c in universe.columns}
+
+        self.orders = {}
+        self.fills = []
+        self.cancels = []
+
+    @staticmethod
+    def _aligned_values(df, universe):
+        if df is None:
+            return None
+        return df.reindex(index=universe.index, columns=universe.columns).values.astype(float)
+
+    def submit(self, security, amount):
+        # target position computed with the decision bar's price
+        if is_zero(amount + security._value):
+            target = 0.0
+        else:
+            q = amount / (security._price * security.multiplier)
+            if security.integer_positions:
+                q = _round_lots(q, security.lot_size)
+            target = security._position + q
+
+        self.orders[security.name] = _Order(security, target, security.parent.inow)
+
+    def process(self, inow):
+        if not self.orders:
+            return
+
+        date = self.dates[inow]
+        # sells first so their proceeds are available to buys
+        orders = sorted(self.orders.values(), key=lambda o: o.target - o.security._position)
+
+        for order in orders:
+            self._process_order(order, inow, date)
+
+    def _process_order(self, order, inow, date):
+        security = order.security
+        name = security.name
+
+        remaining = order.target - security._position
+        if is_zero(remaining) or (security.integer_positions and abs(remaining) < 1):
+            del self.orders[name]
+            return
+
+        if inow <= order.inow:
+            return
+
+        if self.max_bars is not None and inow - order.inow > self.max_bars:
+            self.cancels.append((date, name, remaining))
+            del self.orders[name]
+            return
+
+        col = self._columns.get(name)
+        if col is None:
+            return
+
+        price = self._fill_prices[inow, col]
+        if np.isnan(price) or price <= 0:
+            return
+
+        if self._limits is not None and self._at_limit(security, name, price, remaining > 0, inow):
+            return
+
+        q = remaining
+        if self._volumes is not None:
+            volume = self._volumes[inow, col]
+            if np.isnan(volume) or volume <= 0:
+                return
+            cap = self.participation_rate * volume * self.volume_unit
+            if abs(q) > cap:
+                q = math.copysign(cap, q)
+
+        if q > 0:
+            capital = max(security.parent._capital, 0.0)
+            full_outlay = security.outlay(q, p=price)[0]
+            if full_outlay > capital:
+                q = q * capital / full_outlay
+
+        # partial fills trade whole lots, only the final fill may be an odd
+        # lot (e.g. selling out a position)
+        if security.integer_positions and not is_zero(q - remaining):
+            q = _round_lots(q, security.lot_size)
+
+        # capped below one lot: the order could only stay pending forever
+        if is_zero(q):
+            self.cancels.append((date, name, remaining))
+            del self.orders[name]
+            return
+
+        security.transact(q, price=price)
+        self.fills.append((date, name, q, price, order.target - order.start))
+
+        if is_zero(order.target - security._position):
+            del self.orders[name]
+
+    def _at_limit(self, security, name, price, buy, inow):
+        limit = self._limits.get(name)
+        if limit is None:
+            return False
+
+        prev_close = security._prices_arr[inow - 1]
+        if np.isnan(prev_close) or prev_close <= 0:
+            return False
+
+        change = price / prev_close - 1
+        if buy:
+            return change >= limit - self.limit_tolerance
+        return change <= -limit + self.limit_tolerance
+
+    @property
+    def pending(self):
+        """
+        Pending orders as a DataFrame (security, target, remaining).
+        """
+        return pd.DataFrame(
+            [(name, o.target, o.target - o.security._position) for name, o in self.orders.items()],
+            columns=["Security", "target", "remaining"],
+        )
+
+    def get_fills(self):
+        """
+        Fills as a DataFrame indexed by (Date, Security).
+        """
+        fills = pd.DataFrame(self.fills, columns=["Date", "Security", "quantity", "price", "requested"])
+        return fills.set_index(["Date", "Security"])
+
+
+def _round_lots(q, lot_size):
+    # towards zero, in multiples of the lot size
+    lots = math.floor(q / lot_size) if q > 0 else math.ceil(q / lot_size)
+    return lots * lot_size
+
+
+class _Order(object):
+    __slots__ = ("security", "target", "start", "inow")
+
+    def __init__(self, security, target, inow):
+        self.security = security
+        self.target = target
+        self.start = security._position
+        self.inow = inow
+
+
+def a_share_price_limits(codes, st_codes=None):
+    """
+    Daily price limits of A-share codes: 20% for ChiNext (300/301) and STAR
+    (688/689), 30% for the Beijing exchange (8xx/4xx/92x), 5% for ST codes and
+    10% otherwise.
+
+    Args:
+        * codes (list): six digit codes.
+        * st_codes (list): codes currently under special treatment.
+
+    Returns:
+        dict of code -> limit
+    """
+    st_codes = set(st_codes or [])
+    limits = {}
+    for code in codes:
+        code = str(code)
+        if code in st_codes:
+            limit = 0.05
+        elif code.startswith(("300", "301", "688", "689")):
+            limit = 0.2
+        elif code.startswith(("8", "4", "92")):
+            limit = 0.3
+        else:
+            limit = 0.1
+        limits[code] = limit
+    return limits
+
+
+def lot_sizes(codes, default=1, overrides=None):
+    """
+    Board lots for a list of codes, suitable for the ``lot_size`` setup
+    kwarg.
+
+    Args:
+        * codes (list): security names.
+        * default (int): lot used for codes not in overrides, e.g. 100 for
+          A-shares and ETFs.
+        * overrides (dict, Series): per-code lots, e.g. HK lot sizes from the
+          futu gateway.
+
+    Returns:
+        Series of lot sizes indexed by code
+    """
+    index = pd.Index(codes)
+    if overrides is None:
+        return pd.Series(default, index=index, dtype=float)
+    return pd.Series(overrides, dtype=float).reindex(index).fillna(default)
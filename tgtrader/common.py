@@ -15,6 +15,7 @@ class PriceAdjust(enum.Enum):
     QFQ = "qfq"
 
 class Period(enum.Enum):
+    Minute = "1min"
     Day = "1d"
     Week = "1w"
     Month = "1m"
@@ -37,12 +38,42 @@ class DataSource(enum.Enum):
     """数据源"""
     Akshare = 'akshare'
     Tushare = 'tushare'
+    File = 'file'
+
+class Exchange(enum.Enum):
+    """交易所，用于区分交易日历"""
+    SSE = 'sse'
+    SZSE = 'szse'
+    HKEX = 'hkex'
 
 
 class MetaType(enum.Enum):
     """元数据类型"""
     Stocks1dHfqKdata = 'stocks_1d_hfq_kdata'
     ETF1dHfqKdata = 'etf_1d_hfq_kdata'
+    # 日线不复权，配合复权因子计算前复权、后复权价格
+    Stocks1dNfqKdata = 'stocks_1d_nfq_kdata'
+    ETF1dNfqKdata = 'etf_1d_nfq_kdata'
+    # 分钟线数据源不提供复权
+    Stocks1minNfqKdata = 'stocks_1min_nfq_kdata'
+    ETF1minNfqKdata = 'etf_1min_nfq_kdata'
+    # 由本地日线聚合的周线、月线、年线
+    Stocks1wHfqKdata = 'stocks_1w_hfq_kdata'
+    Stocks1mHfqKdata = 'stocks_1m_hfq_kdata'
+    Stocks1yHfqKdata = 'stocks_1y_hfq_kdata'
+    Stocks1wNfqKdata = 'stocks_1w_nfq_kdata'
+    Stocks1mNfqKdata = 'stocks_1m_nfq_kdata'
+    Stocks1yNfqKdata = 'stocks_1y_nfq_kdata'
+    ETF1wHfqKdata = 'etf_1w_hfq_kdata'
+    ETF1mHfqKdata = 'etf_1m_hfq_kdata'
+    ETF1yHfqKdata = 'etf_1y_hfq_kdata'
+    ETF1wNfqKdata = 'etf_1w_nfq_kdata'
+    ETF1mNfqKdata = 'etf_1m_nfq_kdata'
+    ETF1yNfqKdata = 'etf_1y_nfq_kdata'
+    # 基本面数据，按标的记录同步水位
+    StocksValuation = 'stocks_valuation'
+    StocksFinancial = 'stocks_financial'
+    FundNav = 'fund_nav'
 
 class DataProvider:
     def __init__(self):
@@ -54,6 +85,9 @@ class DataProvider:
         if data_source == DataSource.Akshare:
             from tgtrader.data_provider.data_provider_akshare import AkshareDataProvider
             return AkshareDataProvider()
+        elif data_source == DataSource.File:
+            from tgtrader.data_provider.data_provider_file import FileDataProvider
+            return FileDataProvider()
         else:
             raise NotImplementedError(f'数据源 {data_source} 不支持')
 
@@ -95,7 +129,8 @@ class DataDbService(ABC):
     @classmethod
     def get_data_service(cls, data_source: DataSource) -> 'DataDbService':
         """获取数据服务"""
-        if data_source == DataSource.Akshare:
+        # 本地文件导入的数据与akshare同步的数据使用同一个本地K线库
+        if data_source in (DataSource.Akshare, DataSource.File):
             from tgtrader.data_provider.service.akshare_data_service import AkshareDataService
             return AkshareDataService()
         else:
@@ -107,7 +142,8 @@ class DataDbService(ABC):
                          security_type: SecurityType = SecurityType.Stocks,
                          adjust: Optional[PriceAdjust] = None,
                          source: str = 'akshare',
-                         batch_size: int = 100000) -> int:
+                         batch_size: int = 100000,
+                         period: Period = Period.Day) -> int:
         """批量保存K线数据
 
         Args:
@@ -116,6 +152,7 @@ class DataDbService(ABC):
             adjust: 复权方式，仅在传入data时需要
             source: 数据来源
             batch_size: 每批处理的数据量，默认1000条
+            period: 周期，分钟线保存到独立的表
 
         Returns:
             int: 成功保存的记录数
@@ -1,13 +1,38 @@
 # encoding: utf-8
+from typing import Dict, Optional
+
+import pandas as pd
+
 from tgtrader.common import Period, DataProvider, PriceAdjust, SecurityType
-from tgtrader.data_provider.data_provider_akshare import AkshareDataProvider
+from tgtrader.data_provider.data_provider_file import FileDataProvider
+from tgtrader.data_provider.data_provider_local import LocalFirstDataProvider
+from tgtrader.data_provider.data_provider_parquet import ParquetLakeDataProvider
+from tgtrader.data_provider.kdata_lake import KDataLake
+from tgtrader.data_provider.price_matrix import PriceMatrixStore
+from tgtrader.data_provider.universe import UniverseIndex
 
     
-DEFAULT_DATA_PROVIDER = AkshareDataProvider()
+# 优先读取本地K线库，缺失的数据从akshare获取并写回；
+# 环境变量KDATA_STORAGE=parquet时从K线Parquet数据湖读取，多个进程可以同时读取；
+# 环境变量DATA_SOURCE=file时只读取本地行情文件，用于离线回测和CI
+if FileDataProvider.enabled():
+    DEFAULT_DATA_PROVIDER = FileDataProvider()
+elif KDataLake.enabled():
+    DEFAULT_DATA_PROVIDER = ParquetLakeDataProvider()
+else:
+    DEFAULT_DATA_PROVIDER = LocalFirstDataProvider()
 
 class DataGetter:
-    def __init__(self, provider: DataProvider = DEFAULT_DATA_PROVIDER):
+    def __init__(self, provider: DataProvider = DEFAULT_DATA_PROVIDER, matrix_store: Optional[PriceMatrixStore] = None):
+        """
+        Args:
+            provider: 数据提供者
+            matrix_store: 价格矩阵快照，默认为PriceMatrixStore()
+        """
         self.provider = provider
+        self.matrix_store = matrix_store
+        # 各证券类型的按日证券池索引，首次查询时构建
+        self.universe_indexes: Dict[SecurityType, UniverseIndex] = {}
 
     def get_all_symbols(self, security_type: SecurityType):
         """获取所有证券代码
@@ -20,6 +45,26 @@ class DataGetter:
         ret = self.provider.get_all_symbols(security_type)
         return ret
 
+    def get_universe(self, security_type: SecurityType, date: str, active_only: bool = True) -> list[str]:
+        """
+        获取某天的证券池，包含之后已退市的证券
+
+        参数:
+        - security_type: 证券类型
+        - date: 日期，格式为"YYYY-MM-DD"，非交易日取之前最近的交易日
+        - active_only: 为True时只包含当天在本地K线数据区间内的证券，否则为当天已上市、未退市的证券
+
+        返回格式:
+        - 证券代码列表
+        """
+        return self.get_universe_index(security_type).members(date, active_only)
+
+    def get_universe_index(self, security_type: SecurityType, rebuild: bool = False) -> UniverseIndex:
+        """按日证券池索引，可传给SelectAll/SelectHasData的membership参数"""
+        if rebuild or security_type not in self.universe_indexes:
+            self.universe_indexes[security_type] = UniverseIndex.build(security_type)
+        return self.universe_indexes[security_type]
+
     def get_price(self, 
                  symbol_list: list[str], 
                  start_date: str, 
@@ -35,10 +80,10 @@ class DataGetter:
         - symbol_list: 股票代码列表
         - start_date: 开始日期，格式为"YYYY-MM-DD"
         - end_date: 结束日期，格式为"YYYY-MM-DD" 
-        - period: 周期，默认为日线数据
+        - period: 周期，默认为日线数据；Period.Minute为1分钟线，date包含时分秒
         - adjust: 复权方式，默认为"hfq"(后复权)
         - fields: 需要获取的字段列表，默认为["open", "high", "low", "close", "volume"]
-        - provider: 数据提供者，默认为AkshareDataProvider，可选其他provider，或者自定义provider
+        - provider: 数据提供者，默认为LocalFirstDataProvider(本地K线库+akshare)，可选其他provider，或者自定义provider
         
         返回格式:
         - 返回DataFrame，复合索引为(code, date)，列为字段名
@@ -55,3 +100,53 @@ class DataGetter:
         symbol_list = [self.provider.standardize_symbol(symbol) for symbol in symbol_list]
 
         return self.provider.get_price(symbol_list, start_date, end_date, security_type, period, adjust, fields)
+
+    def get_price_matrix(self,
+                         symbol_list: list[str],
+                         start_date: str,
+                         end_date: str,
+                         security_type: SecurityType,
+                         field: str = 'close',
+                         adjust: PriceAdjust = PriceAdjust.HFQ) -> pd.DataFrame:
+        """
+        获取日线价格矩阵
+
+        优先从内存映射的价格矩阵快照中切片，快照最后日期之后的数据通过get_price补齐；
+        快照不存在或不包含全部代码时，用get_price获取后透视。
+
+        参数:
+        - symbol_list: 股票代码列表
+        - start_date: 开始日期，格式为"YYYY-MM-DD"
+        - end_date: 结束日期，格式为"YYYY-MM-DD"
+        - field: 价格字段，默认为"close"
+        - adjust: 复权方式，默认为"hfq"(后复权)
+
+        返回格式:
+        - 返回DataFrame，index为date，columns为code，没有数据的位置为nan
+        """
+        symbol_list = [self.provider.standardize_symbol(symbol) for symbol in symbol_list]
+
+        if self.matrix_store is None:
+            self.matrix_store = PriceMatrixStore()
+        matrix = self.matrix_store.open(security_type, field, adjust)
+
+        if matrix is None or not matrix.has_codes(symbol_list) or start_date[:10] < matrix.start_date.strftime('%Y-%m-%d'):
+            df = self.get_price(symbol_list, start_date, end_date, security_type, Period.Day, adjust, [field])
+            return self.__pivot(df, symbol_list, field)
+
+        prices = matrix.slice(symbol_list, start_date, end_date)
+        if end_date[:10] > matrix.end_date.strftime('%Y-%m-%d'):
+            tail_start = (matrix.end_date + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+            tail = self.get_price(symbol_list, tail_start, end_date, security_type, Period.Day, adjust, [field])
+            if tail is not None and not tail.empty:
+                prices = pd.concat([prices, self.__pivot(tail, symbol_list, field)])
+
+        # 所选代码都没有数据的日期与长表透视的结果保持一致
+        return prices.dropna(how='all')
+
+    def __pivot(self, df: pd.DataFrame, symbol_list: list[str], field: str) -> pd.DataFrame:
+        if df is None or df.empty:
+            return pd.DataFrame(columns=pd.Index(symbol_list, name='code'), index=pd.DatetimeIndex([], name='date'))
+
+        prices = df[field].unstack(level='code')
+        return prices.reindex(columns=[s for s in symbol_list if s in prices.columns])
@@ -0,0 +1,34 @@
+# encoding: utf-8
+from peewee import *
+from tgtrader.common import DataSource
+from tgtrader.data_provider.dao.akshare.common import main_db
+from tgtrader.data_provider.dao.models.common import register_model
+from tgtrader.data_provider.dao.models.t_kdata_compact_model import T_KData_Compact_Model, T_KData_1Min_Compact_Model
+
+
+@register_model(DataSource.Akshare, 't_kdata_compact')
+class T_KData_Compact(T_KData_Compact_Model):
+    class Meta:
+        database = main_db
+        table_name = 't_kdata_compact'
+
+
+@register_model(DataSource.Akshare, 't_etf_kdata_compact')
+class T_ETF_KData_Compact(T_KData_Compact_Model):
+    class Meta:
+        database = main_db
+        table_name = 't_etf_kdata_compact'
+
+
+@register_model(DataSource.Akshare, 't_kdata_1min_compact')
+class T_KData_1Min_Compact(T_KData_1Min_Compact_Model):
+    class Meta:
+        database = main_db
+        table_name = 't_kdata_1min_compact'
+
+
+@register_model(DataSource.Akshare, 't_etf_kdata_1min_compact')
+class T_ETF_KData_1Min_Compact(T_KData_1Min_Compact_Model):
+    class Meta:
+        database = main_db
+        table_name = 't_etf_kdata_1min_compact'
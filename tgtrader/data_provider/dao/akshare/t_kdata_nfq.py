@@ -0,0 +1,18 @@
+# encoding: utf-8
+from peewee import *
+from tgtrader.common import DataSource
+from tgtrader.data_provider.dao.akshare.common import main_db
+from tgtrader.data_provider.dao.models.common import register_model
+from tgtrader.data_provider.dao.models.t_kdata_nfq_model import T_KData_Nfq_Model, T_ETF_KData_Nfq_Model
+
+
+@register_model(DataSource.Akshare, 't_kdata_nfq')
+class T_KData_Nfq(T_KData_Nfq_Model):
+    class Meta:
+        database = main_db
+
+
+@register_model(DataSource.Akshare, 't_etf_kdata_nfq')
+class T_ETF_KData_Nfq(T_ETF_KData_Nfq_Model):
+    class Meta:
+        database = main_db
@@ -0,0 +1,20 @@
+# encoding: utf-8
+from peewee import *
+from tgtrader.common import DataSource
+from tgtrader.data_provider.dao.akshare.common import main_db
+from tgtrader.data_provider.dao.models.common import register_model
+from tgtrader.data_provider.dao.models.t_kdata_watermark_model import T_KData_Watermark_Model
+
+
+@register_model(DataSource.Akshare, 't_kdata_watermark')
+class T_KData_Watermark(T_KData_Watermark_Model):
+    class Meta:
+        database = main_db
+
+    @classmethod
+    def init_table(cls):
+        # 初始化表
+        with main_db:
+            table_exists = T_KData_Watermark.table_exists()
+            if not table_exists:
+                main_db.create_tables([T_KData_Watermark])  # 如果表不存在，创建表
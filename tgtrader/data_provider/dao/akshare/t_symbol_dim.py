@@ -0,0 +1,12 @@
+# encoding: utf-8
+from peewee import *
+from tgtrader.common import DataSource
+from tgtrader.data_provider.dao.akshare.common import main_db
+from tgtrader.data_provider.dao.models.common import register_model
+from tgtrader.data_provider.dao.models.t_symbol_dim_model import T_Symbol_Dim_Model
+
+
+@register_model(DataSource.Akshare, 't_symbol_dim')
+class T_Symbol_Dim(T_Symbol_Dim_Model):
+    class Meta:
+        database = main_db
@@ -0,0 +1,16 @@
+from peewee import *
+from tgtrader.data_provider.dao.akshare.common import main_db
+
+class T_Adj_Factor_Model(Model):
+    # 证券类型
+    security_type = CharField()
+    # 证券代码
+    code = CharField()
+    # 因子生效日期，到下一个日期之前保持不变
+    date = DateField()
+    # 后复权因子，后复权价格 = 不复权价格 * factor
+    factor = DoubleField()
+
+    class Meta:
+        primary_key = CompositeKey('security_type', 'code', 'date')
+        table_name = 't_adj_factor'
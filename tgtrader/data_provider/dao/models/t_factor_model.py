@@ -0,0 +1,18 @@
+from peewee import *
+from tgtrader.data_provider.dao.akshare.common import main_db
+
+class T_Factor_Model(Model):
+    # 因子名称，如momentum_20
+    factor_name = CharField()
+    # 证券类型
+    security_type = CharField()
+    # 证券代码
+    code = CharField()
+    # 交易日期
+    date = DateField()
+    # 因子值
+    value = DoubleField()
+
+    class Meta:
+        primary_key = CompositeKey('factor_name', 'security_type', 'code', 'date')
+        table_name = 't_factor'
@@ -0,0 +1,20 @@
+from peewee import *
+from tgtrader.data_provider.dao.akshare.common import main_db
+
+class T_Fund_NAV_Model(Model):
+    # 基金代码
+    code = CharField()
+    # 净值日期
+    date = DateField()
+    # 单位净值
+    unit_nav = DoubleField(null=True)
+    # 累计净值
+    acc_nav = DoubleField(null=True)
+    # 创建时间
+    create_time = BigIntegerField()
+    # 更新时间
+    update_time = BigIntegerField()
+
+    class Meta:
+        primary_key = CompositeKey('code', 'date')
+        table_name = 't_fund_nav'
@@ -0,0 +1,47 @@
+from peewee import *
+from tgtrader.data_provider.dao.akshare.common import main_db
+
+class T_KData_Compact_Model(Model):
+    """紧凑存储的日线K线
+
+    证券代码以t_symbol_dim中的整数id存储，日期为DATE类型，价格为单精度浮点数。
+    复权方式和数据来源对整张表相同，记录在元数据中，不在每行重复存储。
+    """
+    # 标的id，对应t_symbol_dim.id
+    code_id = IntegerField()
+    # 日期
+    date = DateField()
+    # 开盘价
+    open = FloatField()
+    # 收盘价
+    close = FloatField()
+    # 最高价
+    high = FloatField()
+    # 最低价
+    low = FloatField()
+    # 成交量
+    volume = FloatField()
+
+    class Meta:
+        primary_key = CompositeKey('code_id', 'date')
+
+
+class T_KData_1Min_Compact_Model(Model):
+    """紧凑存储的分钟K线，时间为TIMESTAMP类型"""
+    # 标的id，对应t_symbol_dim.id
+    code_id = IntegerField()
+    # 时间
+    date = DateTimeField()
+    # 开盘价
+    open = FloatField()
+    # 收盘价
+    close = FloatField()
+    # 最高价
+    high = FloatField()
+    # 最低价
+    low = FloatField()
+    # 成交量
+    volume = FloatField()
+
+    class Meta:
+        primary_key = CompositeKey('code_id', 'date')
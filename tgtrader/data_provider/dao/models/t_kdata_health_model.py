@@ -0,0 +1,28 @@
+from peewee import *
+from tgtrader.data_provider.dao.akshare.common import main_db
+
+class T_KData_Health_Model(Model):
+    # 元数据名称，对应T_Meta的meta_name
+    meta_name = CharField()
+    # 证券代码
+    code = CharField()
+    # 累计校验的行数
+    checked_rows = BigIntegerField()
+    # 累计隔离的行数
+    quarantined_rows = BigIntegerField()
+    # 累计相邻收盘价异常跳变的次数，复权价出现跳变通常是复权错误
+    jump_count = IntegerField()
+    # 累计日期缺口的次数
+    gap_count = IntegerField()
+    # 最近一次发现的问题，多个问题以逗号分隔，没有问题时为空
+    issues = CharField(null=True)
+    # 最近一次发现问题的日期
+    last_issue_date = CharField(null=True)
+    # 创建时间
+    create_time = BigIntegerField()
+    # 更新时间(最近一次校验时间)
+    update_time = BigIntegerField()
+
+    class Meta:
+        primary_key = CompositeKey('meta_name', 'code')
+        table_name = 't_kdata_health'
@@ -0,0 +1,18 @@
+from peewee import *
+from tgtrader.data_provider.dao.akshare.common import main_db
+from tgtrader.data_provider.dao.models.t_kdata_model import T_KData_Model
+from tgtrader.data_provider.dao.models.t_etf_kdata_model import T_ETF_KData_Model
+
+
+class T_KData_Nfq_Model(T_KData_Model):
+    """股票日线不复权K线，复权价格由复权因子计算"""
+
+    class Meta:
+        table_name = 't_kdata_nfq'
+
+
+class T_ETF_KData_Nfq_Model(T_ETF_KData_Model):
+    """ETF日线不复权K线，复权价格由复权因子计算"""
+
+    class Meta:
+        table_name = 't_etf_kdata_nfq'
@@ -0,0 +1,30 @@
+from peewee import *
+from tgtrader.data_provider.dao.akshare.common import main_db
+
+class T_KData_Quarantine_Model(Model):
+    # 元数据名称，对应MetaType，区分K线表
+    meta_name = CharField()
+    # 证券代码
+    code = CharField()
+    # 日期，格式与K线表相同
+    date = CharField()
+    # 未通过校验的原因，多个原因以逗号分隔
+    reason = CharField()
+    # 开盘价
+    open = DoubleField(null=True)
+    # 最高价
+    high = DoubleField(null=True)
+    # 最低价
+    low = DoubleField(null=True)
+    # 收盘价
+    close = DoubleField(null=True)
+    # 成交量
+    volume = DoubleField(null=True)
+    # 复权类型
+    adjust_type = CharField()
+    # 创建时间
+    create_time = BigIntegerField()
+
+    class Meta:
+        primary_key = CompositeKey('meta_name', 'code', 'date', 'reason')
+        table_name = 't_kdata_quarantine'
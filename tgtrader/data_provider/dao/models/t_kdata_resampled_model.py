@@ -0,0 +1,34 @@
+from peewee import *
+from tgtrader.data_provider.dao.akshare.common import main_db
+
+class T_KData_Resampled_Model(Model):
+    # 证券类型
+    security_type = CharField()
+    # 周期，Period的值：1w周线 1m月线 1y年线
+    period = CharField()
+    # 复权方式
+    adjust_type = CharField()
+    # 证券代码
+    code = CharField()
+    # 周期的起始日期：周一、月初或年初
+    bucket = DateField()
+    # K线日期，周期内最后一个有数据的交易日
+    date = DateField()
+    # 开盘价，周期内第一个交易日的开盘价
+    open = DoubleField()
+    # 最高价
+    high = DoubleField()
+    # 最低价
+    low = DoubleField()
+    # 收盘价，周期内最后一个交易日的收盘价
+    close = DoubleField()
+    # 成交量
+    volume = DoubleField()
+    # 周期内有数据的交易日数量
+    days = IntegerField()
+    # 更新时间
+    update_time = BigIntegerField()
+
+    class Meta:
+        primary_key = CompositeKey('security_type', 'period', 'adjust_type', 'code', 'bucket')
+        table_name = 't_kdata_resampled'
@@ -0,0 +1,20 @@
+from peewee import *
+from tgtrader.data_provider.dao.akshare.common import main_db
+
+class T_KData_Watermark_Model(Model):
+    # 元数据名称，对应MetaType，区分K线表和基本面数据表
+    meta_name = CharField()
+    # 证券代码
+    code = CharField()
+    # 已同步区间的起始日期，格式为YYYY-MM-DD
+    start_time = CharField()
+    # 已同步区间的结束日期(水位)，格式为YYYY-MM-DD
+    end_time = CharField()
+    # 创建时间
+    create_time = BigIntegerField()
+    # 更新时间
+    update_time = BigIntegerField()
+
+    class Meta:
+        primary_key = CompositeKey('meta_name', 'code')
+        table_name = 't_kdata_watermark'
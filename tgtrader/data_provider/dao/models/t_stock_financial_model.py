@@ -0,0 +1,38 @@
+from peewee import *
+from tgtrader.data_provider.dao.akshare.common import main_db
+
+class T_Stock_Financial_Model(Model):
+    # 证券代码
+    code = CharField()
+    # 报告期，季度末日期
+    report_date = DateField()
+    # 最新公告日期，按该日期与行情对齐，避免使用未公布的数据
+    announce_date = DateField(null=True)
+    # 每股收益(元)
+    eps = DoubleField(null=True)
+    # 营业总收入(元)
+    revenue = DoubleField(null=True)
+    # 营业总收入同比增长(%)
+    revenue_yoy = DoubleField(null=True)
+    # 净利润(元)
+    net_profit = DoubleField(null=True)
+    # 净利润同比增长(%)
+    net_profit_yoy = DoubleField(null=True)
+    # 每股净资产(元)
+    bps = DoubleField(null=True)
+    # 净资产收益率(%)
+    roe = DoubleField(null=True)
+    # 每股经营现金流量(元)
+    ocfps = DoubleField(null=True)
+    # 销售毛利率(%)
+    gross_margin = DoubleField(null=True)
+    # 所处行业
+    industry = CharField(null=True)
+    # 创建时间
+    create_time = BigIntegerField()
+    # 更新时间
+    update_time = BigIntegerField()
+
+    class Meta:
+        primary_key = CompositeKey('code', 'report_date')
+        table_name = 't_stock_financial'
@@ -0,0 +1,36 @@
+from peewee import *
+from tgtrader.data_provider.dao.akshare.common import main_db
+
+class T_Stock_Valuation_Model(Model):
+    # 证券代码
+    code = CharField()
+    # 交易日期
+    date = DateField()
+    # 总市值(元)
+    total_mv = DoubleField(null=True)
+    # 流通市值(元)
+    circ_mv = DoubleField(null=True)
+    # 总股本(股)
+    total_shares = DoubleField(null=True)
+    # 流通股本(股)
+    circ_shares = DoubleField(null=True)
+    # 市盈率TTM
+    pe_ttm = DoubleField(null=True)
+    # 静态市盈率
+    pe = DoubleField(null=True)
+    # 市净率MRQ
+    pb = DoubleField(null=True)
+    # 市销率TTM
+    ps_ttm = DoubleField(null=True)
+    # 市现率TTM，经营现金流
+    pcf_ttm = DoubleField(null=True)
+    # PEG
+    peg = DoubleField(null=True)
+    # 创建时间
+    create_time = BigIntegerField()
+    # 更新时间
+    update_time = BigIntegerField()
+
+    class Meta:
+        primary_key = CompositeKey('code', 'date')
+        table_name = 't_stock_valuation'
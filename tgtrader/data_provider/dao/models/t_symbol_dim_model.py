@@ -0,0 +1,16 @@
+from peewee import *
+from tgtrader.data_provider.dao.akshare.common import main_db
+
+class T_Symbol_Dim_Model(Model):
+    # 标的整数id，紧凑K线表中以该id代替证券代码
+    id = IntegerField(primary_key=True)
+    # 证券类型
+    security_type = CharField()
+    # 证券代码
+    code = CharField()
+
+    class Meta:
+        table_name = 't_symbol_dim'
+        indexes = (
+            (('security_type', 'code'), True),
+        )
@@ -0,0 +1,22 @@
+from peewee import *
+from tgtrader.data_provider.dao.akshare.common import main_db
+
+class T_Symbol_Master_Model(Model):
+    # 证券类型
+    security_type = CharField()
+    # 证券代码
+    code = CharField()
+    # 证券名称
+    name = CharField()
+    # 上市日期，格式为YYYY-MM-DD，数据源不提供时为空
+    list_date = CharField(null=True)
+    # 退市日期，格式为YYYY-MM-DD，未退市时为空
+    delist_date = CharField(null=True)
+    # 创建时间
+    create_time = BigIntegerField()
+    # 更新时间，即最近一次从数据源刷新的时间
+    update_time = BigIntegerField()
+
+    class Meta:
+        primary_key = CompositeKey('security_type', 'code')
+        table_name = 't_symbol_master'
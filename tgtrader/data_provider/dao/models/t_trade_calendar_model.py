@@ -0,0 +1,14 @@
+from peewee import *
+from tgtrader.data_provider.dao.akshare.common import main_db
+
+class T_Trade_Calendar_Model(Model):
+    # 交易所，对应Exchange
+    exchange = CharField()
+    # 交易日
+    date = DateField()
+    # 更新时间
+    update_time = BigIntegerField()
+
+    class Meta:
+        primary_key = CompositeKey('exchange', 'date')
+        table_name = 't_trade_calendar'
@@ -1,28 +1,35 @@
 # encoding: utf-8
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
 import akshare as ak
-from more_itertools import chunked
+import numpy as np
 import pandas as pd
 from loguru import logger
-from tenacity import retry, stop_after_attempt, wait_exponential, wait_fixed
-from tqdm import tqdm
 from pydantic import validate_arguments
-import time
 
-from tgtrader.common import MetaType, Period, DataProvider, PriceAdjust, SecurityType
+from tgtrader.common import Exchange, MetaType, Period, DataProvider, PriceAdjust, SecurityType
+from tgtrader.data_provider.fetcher import BoundedFetcher
 from tgtrader.data_provider.service.akshare_data_service import AkshareDataService
+from tgtrader.service.symbol_service import SymbolService
 
 class AkshareDataProvider(DataProvider):
-    def __init__(self):
+    def __init__(self, max_workers: int = 4, rate_limit: float = 5.0, max_retries: int = 3):
         """
         初始化Akshare数据提供者
 
         Args:
-            directory_path: 存储Akshare数据文件的目录路径
+            max_workers: 默认最大并发请求数
+            rate_limit: 每秒最大请求数
+            max_retries: 单个标的请求失败后的最多重试次数
         """
         super().__init__()
         self.data_service = AkshareDataService()
+        self.max_workers = max_workers
+        self.rate_limit = rate_limit
+        self.max_retries = max_retries
+        # 最近一次get_price中重试后仍失败的标的，供增量同步判断哪些标的不能推进水位
+        self.last_fetch_errors = {}
 
         # 字段名映射：标准英文名到akshare中文列名的映射
         self.field_map = {
@@ -35,8 +42,12 @@ class AkshareDataProvider(DataProvider):
             "amount": "成交额"
         }
         
+        # 分钟线接口的时间列名
+        self.minute_field_map = dict(self.field_map, date="时间")
+
         # Period枚举到akshare的period字符串的映射
         self.period_map = {
+            Period.Minute: "1",
             Period.Day: "daily",
             Period.Week: "weekly",
             Period.Month: "monthly"
@@ -50,12 +61,41 @@ class AkshareDataProvider(DataProvider):
         }
         
     def get_all_symbols(self, security_type: SecurityType) -> pd.DataFrame:
-        """获取所有证券代码
+        """获取所有证券代码，从本地证券列表读取，列表为空或过期时先从数据源刷新
+
+        Args:
+            security_type: 证券类型
+            
+        Returns:
+            DataFrame with columns: [code, name, list_date, delist_date]，不包含已退市的证券
+        """
+        if SymbolService.needs_refresh(security_type):
+            self.refresh_symbols(security_type)
+        return SymbolService.get_all_symbols(security_type)
+
+    def refresh_symbols(self, security_type: SecurityType) -> int:
+        """从数据源刷新证券列表，获取失败时保留原有列表
+
+        Returns:
+            int: 写入的证券数量
+        """
+        df = self.fetch_symbol_master(security_type)
+        if df.empty:
+            logger.warning(f"Failed to refresh {security_type.value} symbols, using local symbol master")
+            return 0
+        return SymbolService.save_symbols(security_type, df)
+
+    def fetch_symbol_master(self, security_type: SecurityType) -> pd.DataFrame:
+        """从数据源获取证券列表
+
+        股票使用交易所的证券列表接口，包含上市日期，并合并已退市的股票；
+        交易所接口失败时退回到只有代码和名称的列表。ETF数据源不提供上市日期。
+
         Args:
             security_type: 证券类型
             
         Returns:
-            DataFrame with columns: [code, name]
+            DataFrame with columns: [code, name, list_date, delist_date]
         """
         try:
             if security_type == SecurityType.ETF:
@@ -65,15 +105,32 @@ class AkshareDataProvider(DataProvider):
                 df.columns = ['code', 'name']
                 # 去掉code前两位字符
                 df['code'] = df['code'].str[2:]
+                df['list_date'] = None
+                df['delist_date'] = None
                 return df
                 
             elif security_type == SecurityType.Stocks:
+                try:
+                    return self._fetch_stock_master()
+                except Exception as e:
+                    logger.warning(f"Failed to get stock listing dates, falling back to code list: {str(e)}")
+
                 # 获取A股上市公司列表
-                df = ak.stock_zh_a_spot_em()
-                df = df[['代码', '名称']]
-                df.columns = ['code', 'name']
+                df = ak.stock_info_a_code_name()
+                df = df[['code', 'name']]
+                df['list_date'] = None
+                df['delist_date'] = None
                 return df
                 
+            elif security_type == SecurityType.Fund:
+                # 开放式基金列表，数据源不提供成立日期
+                df = ak.fund_name_em()
+                df = df[['基金代码', '基金简称']]
+                df.columns = ['code', 'name']
+                df['list_date'] = None
+                df['delist_date'] = None
+                return df
+
             else:
                 logger.error(f"Unsupported security type: {security_type}")
                 return pd.DataFrame()
@@ -82,7 +139,63 @@ class AkshareDataProvider(DataProvider):
             logger.error(f"Error getting symbols: {str(e)}")
             return pd.DataFrame()
 
-    @retry(stop=stop_after_attempt(10), wait=wait_fixed(10))
+    def fetch_trade_calendar(self, exchange: Exchange) -> pd.DatetimeIndex:
+        """从数据源获取交易日
+
+        沪深交易所使用新浪的交易日历，包含当年剩余的交易日；港交所没有日历接口，
+        使用恒生指数的历史交易日，不包含未来的交易日。
+
+        Args:
+            exchange: 交易所
+
+        Returns:
+            pd.DatetimeIndex: 按日期排序的交易日，获取失败时为空
+        """
+        try:
+            if exchange in (Exchange.SSE, Exchange.SZSE):
+                dates = ak.tool_trade_date_hist_sina()['trade_date']
+            elif exchange == Exchange.HKEX:
+                dates = ak.stock_hk_index_daily_sina(symbol="HSI")['date']
+            else:
+                logger.error(f"Unsupported exchange: {exchange}")
+                return pd.DatetimeIndex([])
+            return pd.DatetimeIndex(pd.to_datetime(dates)).sort_values()
+        except Exception as e:
+            logger.error(f"Error getting trade calendar of {exchange.value}: {str(e)}")
+            return pd.DatetimeIndex([])
+
+    def _fetch_stock_master(self) -> pd.DataFrame:
+        """从上交所、深交所、北交所获取股票列表及上市日期，合并沪深两市已退市的股票"""
+        def normalize(df: pd.DataFrame, columns: dict) -> pd.DataFrame:
+            df = df.rename(columns=columns)[list(columns.values())].copy()
+            df['code'] = df['code'].astype(str).str.zfill(6)
+            for column in ['list_date', 'delist_date']:
+                if column in df.columns:
+                    df[column] = pd.to_datetime(df[column], errors='coerce').dt.strftime('%Y-%m-%d')
+            return df
+
+        listed = pd.concat([
+            normalize(ak.stock_info_sh_name_code(symbol="主板A股"),
+                      {'证券代码': 'code', '证券简称': 'name', '上市日期': 'list_date'}),
+            normalize(ak.stock_info_sh_name_code(symbol="科创板"),
+                      {'证券代码': 'code', '证券简称': 'name', '上市日期': 'list_date'}),
+            normalize(ak.stock_info_sz_name_code(symbol="A股列表"),
+                      {'A股代码': 'code', 'A股简称': 'name', 'A股上市日期': 'list_date'}),
+            normalize(ak.stock_info_bj_name_code(),
+                      {'证券代码': 'code', '证券简称': 'name', '上市日期': 'list_date'}),
+        ], ignore_index=True)
+        listed['delist_date'] = None
+
+        delisted = pd.concat([
+            normalize(ak.stock_info_sh_delist(symbol="全部"),
+                      {'公司代码': 'code', '公司简称': 'name', '上市日期': 'list_date', '暂停上市日期': 'delist_date'}),
+            normalize(ak.stock_info_sz_delist(symbol="终止上市公司"),
+                      {'证券代码': 'code', '证券简称': 'name', '上市日期': 'list_date', '终止上市日期': 'delist_date'}),
+        ], ignore_index=True)
+        delisted = delisted[~delisted['code'].isin(listed['code'])]
+
+        return pd.concat([listed, delisted], ignore_index=True).drop_duplicates('code', keep='first')
+
     @validate_arguments
     def get_price(self,
                   symbol_list: list[str],
@@ -94,130 +207,411 @@ class AkshareDataProvider(DataProvider):
                   fields: list[str] = [
                       "open", "high", "low", "close", "volume"],
                   multi_thread_cnt: int = -1):
-        """获取证券数据，支持ETF和股票"""
+        """获取证券数据，支持ETF和股票
+
+        每个标的是独立的请求任务，限流、并发获取，失败的标的单独重试
+
+        Args:
+            multi_thread_cnt: 最大并发数，-1表示使用默认并发数
+        """
         fields = ["date"] + fields
-        try:
-            if multi_thread_cnt != -1:
-                # 将symbol_list分块，每个并行任务处理一个块
-                chunk_size = max(1, len(symbol_list) // multi_thread_cnt)
-                symbol_chunks = list(chunked(symbol_list, chunk_size))
-                results = []
-
-                with ThreadPoolExecutor(max_workers=multi_thread_cnt) as executor:
-                    if security_type == SecurityType.ETF:
-                        futures = [
-                            executor.submit(self._get_etf_data, chunk, start_date, end_date, period, adjust, fields)
-                            for chunk in symbol_chunks
-                        ]
-                    elif security_type == SecurityType.Stocks:
-                        futures = [
-                            executor.submit(self._get_stock_data, chunk, start_date, end_date, period, adjust, fields)
-                            for chunk in symbol_chunks
-                        ]
-                    else:
-                        logger.error(f"Unsupported security type: {security_type}")
-                        return pd.DataFrame()
-
-                    # 获取所有future的结果
-                    for future in as_completed(futures):
-                        try:
-                            result = future.result()
-                            if not result.empty:
-                                results.append(result)
-                        except Exception as e:
-                            logger.error(f"Error in thread execution: {str(e)}")
-
-                # 合并所有结果
-                if not results:
-                    return pd.DataFrame()
-                return pd.concat(results, axis=0)
-            else:
-                if security_type == SecurityType.ETF:
-                    return self._get_etf_data(symbol_list, start_date, end_date,
-                                            period, adjust, fields)
-                elif security_type == SecurityType.Stocks:
-                    return self._get_stock_data(symbol_list, start_date, end_date,
-                                                period, adjust, fields)
-                else:
-                    logger.error(f"Unsupported security type: {security_type}")
-                    return pd.DataFrame()
-        except Exception as e:
-            logger.error(f"Error fetching data: {str(e)}")
+        if security_type == SecurityType.ETF:
+            return self._get_etf_data(symbol_list, start_date, end_date, period, adjust, fields, multi_thread_cnt)
+        elif security_type == SecurityType.Stocks:
+            return self._get_stock_data(symbol_list, start_date, end_date, period, adjust, fields, multi_thread_cnt)
+        else:
+            logger.error(f"Unsupported security type: {security_type}")
             return pd.DataFrame()
 
-    def _get_etf_data(self, symbol_list, start_date, end_date, period, adjust, fields):
+    def _get_etf_data(self, symbol_list, start_date, end_date, period, adjust, fields, multi_thread_cnt=-1):
         """获取ETF数据"""
-        all_dfs = []
-        
-        for symbol in tqdm(symbol_list, desc="Fetching ETF data"):
-            try:
-                df = ak.fund_etf_hist_em(
+        def fetch(symbol: str) -> pd.DataFrame:
+            if period == Period.Minute:
+                start_time, end_time = self._get_minute_time_range(start_date, end_date, adjust)
+                return ak.fund_etf_hist_min_em(
                     symbol=symbol,
                     period=self.period_map[period],
-                    start_date=start_date.replace("-", ""),
-                    end_date=end_date.replace("-", ""),
-                    adjust=self.adjust_map[adjust]
+                    start_date=start_time,
+                    end_date=end_time,
+                    adjust=""
                 )
-                
-                if df is None or df.empty:
-                    logger.warning(f"No data found for ETF: {symbol}")
-                    continue
-                    
-                # 重命名列并选择所需字段
-                df = df.rename(columns={v: k for k, v in self.field_map.items()})
-                df = df[fields]
-                df['code'] = symbol
-                all_dfs.append(df)
-                
-            except Exception as e:
-                logger.error(f"Error fetching ETF {symbol}: {str(e)}")
-                continue
-        
-        return self._process_combined_data(all_dfs)
+            return ak.fund_etf_hist_em(
+                symbol=symbol,
+                period=self.period_map[period],
+                start_date=start_date.replace("-", ""),
+                end_date=end_date.replace("-", ""),
+                adjust=self.adjust_map[adjust]
+            )
+
+        return self._fetch_symbols(symbol_list, fetch, period, fields, multi_thread_cnt, "Fetching ETF data")
 
-    def _get_stock_data(self, symbol_list, start_date, end_date, period, adjust, fields):
+    def _get_stock_data(self, symbol_list, start_date, end_date, period, adjust, fields, multi_thread_cnt=-1):
         """获取股票数据"""
-        all_dfs = []
-        
-        for symbol in tqdm(symbol_list, desc="Fetching stock data"):
-            try:
-                df = ak.stock_zh_a_hist(
+        def fetch(symbol: str) -> pd.DataFrame:
+            if period == Period.Minute:
+                start_time, end_time = self._get_minute_time_range(start_date, end_date, adjust)
+                return ak.stock_zh_a_hist_min_em(
                     symbol=symbol,
                     period=self.period_map[period],
-                    start_date=start_date.replace("-", ""),
-                    end_date=end_date.replace("-", ""),
-                    adjust=self.adjust_map[adjust]
+                    start_date=start_time,
+                    end_date=end_time,
+                    adjust=""
                 )
-                
-                if df is None or df.empty:
-                    logger.warning(f"No data found for stock: {symbol}")
-                    continue
-                    
-                df = df.rename(columns={v: k for k, v in self.field_map.items()})
-                df = df[fields]
-                df['code'] = symbol
-                all_dfs.append(df)
-                
-            except Exception as e:
-                logger.error(f"Error fetching stock {symbol}: {str(e)}")
-                continue
-        
-        return self._process_combined_data(all_dfs)
+            return ak.stock_zh_a_hist(
+                symbol=symbol,
+                period=self.period_map[period],
+                start_date=start_date.replace("-", ""),
+                end_date=end_date.replace("-", ""),
+                adjust=self.adjust_map[adjust]
+            )
 
-    def _process_combined_data(self, all_dfs):
-        """处理合并后的数据"""
-        if not all_dfs:
-            return pd.DataFrame()
-            
-        combined_df = pd.concat(all_dfs, ignore_index=True)
-        
-        if combined_df.empty:
+        return self._fetch_symbols(symbol_list, fetch, period, fields, multi_thread_cnt, "Fetching stock data")
+
+    def _fetch_symbols(self, symbol_list, fetch_fn, period, fields, multi_thread_cnt, desc):
+        """用BoundedFetcher逐个标的获取数据，并统一列名
+
+        每个标的的原始数据获取后立即转换为按列的定长数组，原始DataFrame随即释放，
+        全部获取后一次性拼装为结果，全市场获取时内存峰值接近结果本身的大小。
+
+        Args:
+            fetch_fn: 获取单个标的原始数据的函数
+        """
+        source_columns = self._get_field_map(period)
+        # 重复的标的只获取一次，拼装时每个标的的数组只能使用一次
+        symbol_list = list(dict.fromkeys(symbol_list))
+
+        def fetch(symbol: str) -> Optional[Dict[str, np.ndarray]]:
+            df = fetch_fn(symbol)
+            if df is None or df.empty:
+                return None
+            return self._to_columns(df, source_columns, fields)
+
+        fetcher = BoundedFetcher(fetch,
+                                 max_workers=multi_thread_cnt if multi_thread_cnt != -1 else self.max_workers,
+                                 rate=self.rate_limit,
+                                 max_retries=self.max_retries,
+                                 desc=desc)
+        result = fetcher.fetch(symbol_list)
+        self.last_fetch_errors = result.errors
+
+        for symbol in result.empty:
+            logger.warning(f"No data found for {symbol}")
+        if result.errors:
+            logger.error(f"Failed to fetch {len(result.errors)} symbols: {list(result.errors.keys())}")
+
+        return self._combine_columns([(s, result.data[s]) for s in symbol_list if s in result.data], fields)
+
+    def get_adj_factors(self,
+                        symbol_list: list[str],
+                        security_type: SecurityType,
+                        multi_thread_cnt: int = -1) -> pd.DataFrame:
+        """获取后复权因子，只保留因子变化的日期
+
+        股票使用新浪的后复权因子；ETF没有因子接口，用后复权收盘价与不复权收盘价之比计算。
+
+        Args:
+            symbol_list: 证券代码列表
+            security_type: 证券类型
+            multi_thread_cnt: 最大并发数，-1表示使用默认并发数
+
+        Returns:
+            DataFrame with columns: [code, date, factor]
+        """
+        def fetch_stock(symbol: str) -> pd.DataFrame:
+            df = ak.stock_zh_a_daily(symbol=self._get_sina_symbol(symbol), adjust="hfq-factor")
+            if df is None or df.empty:
+                return df
+            return df.rename(columns={"hfq_factor": "factor"})[["date", "factor"]]
+
+        def fetch_etf(symbol: str) -> pd.DataFrame:
+            kwargs = dict(symbol=symbol, period="daily", start_date="19900101", end_date="20500101")
+            hfq = ak.fund_etf_hist_em(adjust="hfq", **kwargs)
+            raw = ak.fund_etf_hist_em(adjust="", **kwargs)
+            if hfq is None or hfq.empty or raw is None or raw.empty:
+                return None
+            df = pd.merge(hfq[["日期", "收盘"]], raw[["日期", "收盘"]], on="日期", suffixes=("_hfq", "_raw"))
+            df = df[(df["收盘_hfq"] > 0) & (df["收盘_raw"] > 0)]
+            return self._ratio_factor_changes(df["日期"], df["收盘_hfq"], df["收盘_raw"])
+
+        if security_type == SecurityType.Stocks:
+            fetch_fn = fetch_stock
+        elif security_type == SecurityType.ETF:
+            fetch_fn = fetch_etf
+        else:
+            logger.error(f"Unsupported security type: {security_type}")
+            return pd.DataFrame(columns=["code", "date", "factor"])
+
+        symbol_list = list(dict.fromkeys(symbol_list))
+
+        def fetch(symbol: str) -> pd.DataFrame:
+            df = fetch_fn(symbol)
+            if df is None or df.empty:
+                return df
+            df = df.copy()
+            df["code"] = symbol
+            return df
+
+        fetcher = BoundedFetcher(fetch,
+                                 max_workers=multi_thread_cnt if multi_thread_cnt != -1 else self.max_workers,
+                                 rate=self.rate_limit,
+                                 max_retries=self.max_retries,
+                                 desc="Fetching adjust factors")
+        result = fetcher.fetch(symbol_list)
+        self.last_fetch_errors = result.errors
+        if result.errors:
+            logger.error(f"Failed to fetch adjust factors of {len(result.errors)} symbols: {list(result.errors.keys())}")
+
+        if not result.data:
+            return pd.DataFrame(columns=["code", "date", "factor"])
+
+        df = pd.concat([result.data[s] for s in symbol_list if s in result.data], ignore_index=True)
+        df["date"] = pd.to_datetime(df["date"])
+        df["factor"] = df["factor"].astype(float)
+        return df[["code", "date", "factor"]]
+
+    # 估值指标：akshare列名 -> 标准字段名
+    VALUATION_FIELD_MAP = {
+        "数据日期": "date",
+        "总市值": "total_mv",
+        "流通市值": "circ_mv",
+        "总股本": "total_shares",
+        "流通股本": "circ_shares",
+        "PE(TTM)": "pe_ttm",
+        "PE(静)": "pe",
+        "市净率": "pb",
+        "市销率": "ps_ttm",
+        "市现率": "pcf_ttm",
+        "PEG值": "peg",
+    }
+
+    # 业绩报表：akshare列名 -> 标准字段名
+    FINANCIAL_FIELD_MAP = {
+        "股票代码": "code",
+        "最新公告日期": "announce_date",
+        "每股收益": "eps",
+        "营业总收入-营业总收入": "revenue",
+        "营业总收入-同比增长": "revenue_yoy",
+        "净利润-净利润": "net_profit",
+        "净利润-同比增长": "net_profit_yoy",
+        "每股净资产": "bps",
+        "净资产收益率": "roe",
+        "每股经营现金流量": "ocfps",
+        "销售毛利率": "gross_margin",
+        "所处行业": "industry",
+    }
+
+    def fetch_valuation(self, symbol_list: list[str], multi_thread_cnt: int = -1) -> pd.DataFrame:
+        """获取股票的每日估值指标，数据源每次返回标的的全部历史
+
+        Args:
+            symbol_list: 股票代码列表
+            multi_thread_cnt: 最大并发数，-1表示使用默认并发数
+
+        Returns:
+            DataFrame with columns: [code, date, total_mv, circ_mv, total_shares, circ_shares,
+                                     pe_ttm, pe, pb, ps_ttm, pcf_ttm, peg]
+        """
+        def fetch(symbol: str) -> pd.DataFrame:
+            df = ak.stock_value_em(symbol=symbol)
+            if df is None or df.empty:
+                return df
+            return df[list(self.VALUATION_FIELD_MAP)].rename(columns=self.VALUATION_FIELD_MAP)
+
+        columns = ["code"] + list(self.VALUATION_FIELD_MAP.values())
+        df = self._fetch_frames(symbol_list, fetch, columns, multi_thread_cnt, "Fetching valuation")
+        df["date"] = pd.to_datetime(df["date"])
+        return df
+
+    def fetch_financial_report(self, report_date: str) -> pd.DataFrame:
+        """获取全部股票某个报告期的业绩报表
+
+        Args:
+            report_date: 报告期，季度末日期，格式为YYYY-MM-DD
+
+        Returns:
+            DataFrame with columns: [code, report_date, announce_date, eps, revenue, revenue_yoy, net_profit,
+                                     net_profit_yoy, bps, roe, ocfps, gross_margin, industry]
+        """
+        columns = ["code", "report_date"] + list(self.FINANCIAL_FIELD_MAP.values())[1:]
+        try:
+            df = ak.stock_yjbb_em(date=pd.Timestamp(report_date).strftime('%Y%m%d'))
+        except Exception as e:
+            logger.error(f"Error fetching financial report of {report_date}: {str(e)}")
+            return pd.DataFrame(columns=columns)
+        if df is None or df.empty:
+            return pd.DataFrame(columns=columns)
+
+        df = df[list(self.FINANCIAL_FIELD_MAP)].rename(columns=self.FINANCIAL_FIELD_MAP)
+        df["report_date"] = pd.Timestamp(report_date)
+        df["announce_date"] = pd.to_datetime(df["announce_date"])
+        return df[columns]
+
+    def fetch_fund_nav(self, symbol_list: list[str], multi_thread_cnt: int = -1) -> pd.DataFrame:
+        """获取开放式基金的单位净值和累计净值，数据源每次返回基金成立以来的全部净值
+
+        Args:
+            symbol_list: 基金代码列表
+            multi_thread_cnt: 最大并发数，-1表示使用默认并发数
+
+        Returns:
+            DataFrame with columns: [code, date, unit_nav, acc_nav]
+        """
+        def fetch(symbol: str) -> pd.DataFrame:
+            unit = ak.fund_open_fund_info_em(symbol=symbol, indicator="单位净值走势")
+            if unit is None or unit.empty:
+                return unit
+            acc = ak.fund_open_fund_info_em(symbol=symbol, indicator="累计净值走势")
+            df = unit[["净值日期", "单位净值"]]
+            if acc is not None and not acc.empty:
+                df = pd.merge(df, acc[["净值日期", "累计净值"]], on="净值日期", how="outer")
+            else:
+                df = df.assign(累计净值=np.nan)
+            return df.rename(columns={"净值日期": "date", "单位净值": "unit_nav", "累计净值": "acc_nav"})
+
+        df = self._fetch_frames(symbol_list, fetch, ["code", "date", "unit_nav", "acc_nav"],
+                                multi_thread_cnt, "Fetching fund NAV")
+        df["date"] = pd.to_datetime(df["date"])
+        return df
+
+    def _fetch_frames(self, symbol_list, fetch_fn, columns, multi_thread_cnt, desc) -> pd.DataFrame:
+        """逐个标的请求并合并为一个DataFrame，增加code列，失败的标的记录在last_fetch_errors"""
+        def fetch(symbol: str) -> pd.DataFrame:
+            df = fetch_fn(symbol)
+            if df is None or df.empty:
+                return df
+            return df.assign(code=symbol)
+
+        fetcher = BoundedFetcher(fetch,
+                                 max_workers=multi_thread_cnt if multi_thread_cnt != -1 else self.max_workers,
+                                 rate=self.rate_limit,
+                                 max_retries=self.max_retries,
+                                 desc=desc)
+        result = fetcher.fetch(symbol_list)
+        self.last_fetch_errors = result.errors
+        if result.errors:
+            logger.error(f"{desc} failed for {len(result.errors)} symbols: {list(result.errors.keys())}")
+
+        if not result.data:
+            return pd.DataFrame(columns=columns)
+        return pd.concat([result.data[s] for s in symbol_list if s in result.data], ignore_index=True)[columns]
+
+    def _get_sina_symbol(self, symbol: str) -> str:
+        """新浪接口的代码需要带交易所前缀"""
+        if symbol.startswith(("4", "8", "92")):
+            return f"bj{symbol}"
+        if symbol.startswith(("6", "9")):
+            return f"sh{symbol}"
+        return f"sz{symbol}"
+
+    def _get_field_map(self, period: Period) -> dict:
+        return self.minute_field_map if period == Period.Minute else self.field_map
+
+    def _get_minute_time_range(self, start_date: str, end_date: str, adjust: PriceAdjust):
+        """分钟线接口的时间范围，日期补全为当日的开盘和收盘时间"""
+        if adjust != PriceAdjust.NO:
+            logger.warning(f"Minute data does not support adjust {adjust}, fetching unadjusted prices")
+
+        return f"{start_date[:10]} 09:30:00", f"{end_date[:10]} 15:00:00"
+
+    @staticmethod
+    def _to_columns(df: pd.DataFrame, source_columns: dict, fields: list[str]) -> Dict[str, np.ndarray]:
+        """单个标的的原始数据转换为按列的数组，日期为datetime64[ns]，其余字段为float64
+
+        Args:
+            df: 接口返回的原始数据
+            source_columns: 标准字段名到接口列名的映射
+            fields: 需要的标准字段，包含date
+        """
+        columns = {}
+        for field in fields:
+            values = df[source_columns.get(field, field)]
+            if field == 'date':
+                columns[field] = pd.to_datetime(values).to_numpy(dtype='datetime64[ns]')
+            else:
+                columns[field] = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64)
+        return columns
+
+    @staticmethod
+    def _ratio_factor_changes(dates: pd.Series,
+                              hfq_close: pd.Series,
+                              raw_close: pd.Series,
+                              tick: float = 0.001) -> pd.DataFrame:
+        """由后复权收盘价与不复权收盘价之比计算复权因子，只保留因子变化的日期
+
+        两个价格都只有tick的精度，取整误差使比值每天都有小幅波动。
+        比值与当前因子的差异超过两侧取整误差之和时才认为发生了除权除息，
+        区间内的因子取取整误差最小(价格最高)那天的比值。
+
+        Args:
+            dates: 日期
+            hfq_close: 后复权收盘价
+            raw_close: 不复权收盘价
+            tick: 价格的最小变动单位
+
+        Returns:
+            DataFrame with columns: [date, factor]
+        """
+        hfq_close = hfq_close.to_numpy(dtype=np.float64)
+        raw_close = raw_close.to_numpy(dtype=np.float64)
+        ratios = hfq_close / raw_close
+        # 比值的相对误差上界
+        errors = tick / 2 / raw_close + tick / 2 / hfq_close
+
+        starts = []
+        factors = []
+        best = -1
+        for i in range(len(ratios)):
+            if best < 0 or abs(ratios[i] / ratios[best] - 1) > errors[i] + errors[best]:
+                if best >= 0:
+                    factors.append(ratios[best])
+                starts.append(i)
+                best = i
+            elif errors[i] < errors[best]:
+                best = i
+        if best >= 0:
+            factors.append(ratios[best])
+
+        return pd.DataFrame({"date": dates.to_numpy()[starts], "factor": factors})
+
+    @staticmethod
+    def _combine_columns(parts: List[Tuple[str, Dict[str, np.ndarray]]], fields: list[str]) -> pd.DataFrame:
+        """将各标的的按列数组拼装为结果
+
+        按总行数预先分配一个二维float64数组，各标的数据依次写入后释放，该数组直接作为结果DataFrame的数据块；
+        索引用标的序号和日期序号构造，不生成逐行的代码字符串。
+
+        Returns:
+            DataFrame with MultiIndex(code, date)，列为fields中除date外的字段
+        """
+        lengths = np.array([len(columns['date']) for _, columns in parts], dtype=np.int64)
+        total = int(lengths.sum())
+        if total == 0:
             return pd.DataFrame()
 
-        combined_df['date'] = pd.to_datetime(combined_df['date'])
-        combined_df = combined_df.set_index(['code', 'date'])
-        
-        return combined_df
+        value_fields = [f for f in fields if f != 'date']
+        values = np.empty((len(value_fields), total), dtype=np.float64)
+        dates = np.empty(total, dtype='datetime64[ns]')
+        offset = 0
+        for (_, columns), length in zip(parts, lengths):
+            dates[offset:offset + length] = columns['date']
+            for i, field in enumerate(value_fields):
+                values[i, offset:offset + length] = columns[field]
+            # 写入后立即释放该标的的数组
+            columns.clear()
+            offset += length
+
+        symbols = np.array([symbol for symbol, _ in parts], dtype=object)
+        symbol_order = np.argsort(symbols, kind='stable')
+        symbol_codes = np.empty(len(symbols), dtype=np.int64)
+        symbol_codes[symbol_order] = np.arange(len(symbols))
+        unique_dates, date_codes = np.unique(dates, return_inverse=True)
+
+        index = pd.MultiIndex(levels=[symbols[symbol_order], pd.DatetimeIndex(unique_dates)],
+                              codes=[np.repeat(symbol_codes, lengths), date_codes],
+                              names=['code', 'date'],
+                              verify_integrity=False)
+        # values.T是values的视图，DataFrame按列存储时直接使用values作为数据块
+        return pd.DataFrame(values.T, index=index, columns=value_fields, copy=False)
 
     def standardize_symbol(self, symbol: str):
         """标准化证券代码格式"""
@@ -237,19 +631,30 @@ class AkshareDataProvider(DataProvider):
             security_type: 证券类型
             period: 周期
             adjust: 复权方式
+
+        Returns:
+            bool: 是否保存成功
         """
         try:
             if data.empty:
                 logger.warning("No data to save")
-                return
+                return False
             
+            # 分钟线数据源不提供复权
+            if period == Period.Minute:
+                adjust = PriceAdjust.NO
+
+            # 未通过校验的行隔离到t_kdata_quarantine，不写入K线表
+            clean_data = self.data_service.validate_kdata(data, security_type, period, adjust)
+
             # 保存K线数据
             self.data_service.batch_save_kdata(
-                data=data,
+                data=clean_data,
                 security_type=security_type,
                 adjust=adjust,
                 source='akshare',
-                batch_size=100000
+                batch_size=100000,
+                period=period
             )
             
             # 更新元信息
@@ -264,6 +669,8 @@ class AkshareDataProvider(DataProvider):
                 end_time=end_time,
                 source='akshare'
             )
+            return True
             
         except Exception as e:
-            logger.exception(e)
\ No newline at end of file
+            logger.exception(e)
+            return False
\ No newline at end of file
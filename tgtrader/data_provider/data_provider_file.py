@@ -0,0 +1,289 @@
+# encoding: utf-8
+import glob
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import duckdb
+import pandas as pd
+from loguru import logger
+
+from tgtrader.common import DataSource, MetaType, Period, DataProvider, PriceAdjust, SecurityType
+from tgtrader.data_provider.kdata_validator import KDataValidator, ValidationResult
+from tgtrader.data_provider.service.akshare_data_service import AkshareDataService
+from tgtrader.utils.db_path_utils import get_file_data_dir
+
+
+class FileDataProvider(DataProvider):
+    """读取本地CSV/Parquet行情文件的数据提供者，不访问网络
+
+    每种K线对应一个数据集，默认目录为 {root}/{元数据类型}/，如 root/stocks_1d_hfq_kdata/*.csv，
+    也可以用datasets参数为(证券类型, 周期, 复权方式)指定文件或通配符。
+    文件用DuckDB读取，CSV按块多线程解析；列名通过field_map映射为标准字段名。
+
+    Example:
+        provider = FileDataProvider('fixtures', field_map={'code': 'ts_code', 'date': 'trade_date', 'volume': 'vol'},
+                                    date_format='%Y%m%d', code_regex=r'(\\d{6})')
+        df = provider.get_price(['000001'], '2024-01-01', '2024-06-30', SecurityType.Stocks)
+        provider.ingest(SecurityType.Stocks)
+    """
+
+    # 标准字段名，未在field_map中配置的字段按同名列读取
+    STANDARD_FIELDS = ["code", "date", "name", "open", "high", "low", "close", "volume", "amount"]
+
+    # 支持的文件格式
+    FILE_EXTENSIONS = ('.csv', '.csv.gz', '.parquet')
+
+    # 值为file时默认数据提供者只读取本地文件
+    SOURCE_ENV = 'DATA_SOURCE'
+
+    def __init__(self,
+                 root: Optional[str] = None,
+                 field_map: Optional[Dict[str, str]] = None,
+                 datasets: Optional[Dict[Tuple[SecurityType, Period, PriceAdjust], str]] = None,
+                 date_format: Optional[str] = None,
+                 code_regex: Optional[str] = None,
+                 threads: int = -1,
+                 data_service: Optional[AkshareDataService] = None):
+        """
+        Args:
+            root: 数据目录，默认为环境变量FILE_DATA_PATH或data/files
+            field_map: 标准字段名到文件列名的映射，如 {"date": "trade_date", "volume": "vol"}
+            datasets: (证券类型, 周期, 复权方式)到文件路径或通配符的映射，未配置的使用默认目录
+            date_format: 日期列为字符串或整数时的格式，如"%Y%m%d"，为None时由DuckDB自动识别
+            code_regex: 从代码列提取证券代码的正则表达式，取第一个分组，如 r"(\\d{6})" 去掉交易所后缀
+            threads: 读取文件的线程数，-1表示DuckDB默认值(CPU核数)
+            data_service: 本地K线库服务，用于导入
+        """
+        super().__init__()
+        self.root = root or get_file_data_dir()
+        self.field_map = {field: field for field in self.STANDARD_FIELDS}
+        self.field_map.update(field_map or {})
+        self.datasets = datasets or {}
+        self.date_format = date_format
+        self.code_regex = code_regex
+        self.threads = threads
+        self.data_service = data_service or AkshareDataService()
+
+    @classmethod
+    def enabled(cls) -> bool:
+        """是否使用本地行情文件作为默认数据源"""
+        return os.getenv(cls.SOURCE_ENV, '').lower() == DataSource.File.value
+
+    def dataset_files(self, security_type: SecurityType, period: Period, adjust: PriceAdjust) -> List[str]:
+        """数据集的文件列表"""
+        pattern = self.datasets.get((security_type, period, adjust))
+        if pattern is None:
+            pattern = os.path.join(self.root, f"{security_type.value}_{period.value}_{adjust.value}_kdata", '*')
+        return sorted(f for f in glob.glob(pattern) if f.lower().endswith(self.FILE_EXTENSIONS))
+
+    def _connect(self) -> duckdb.DuckDBPyConnection:
+        con = duckdb.connect()
+        if self.threads > 0:
+            con.execute(f"SET threads = {self.threads}")
+        return con
+
+    def _scan_sql(self, files: List[str]) -> str:
+        """读取文件的表达式，同一数据集的文件格式相同"""
+        file_list = "[" + ", ".join("'" + f.replace("'", "''") + "'" for f in files) + "]"
+        if files[0].lower().endswith('.parquet'):
+            return f"read_parquet({file_list}, union_by_name = true)"
+        # 代码列按字符串读取，避免丢失前导0
+        code_column = self.field_map['code'].replace("'", "''")
+        return f"read_csv({file_list}, union_by_name = true, parallel = true, types = {{'{code_column}': 'VARCHAR'}})"
+
+    def _column_sql(self, field: str) -> str:
+        """文件列转换为标准字段的表达式"""
+        column = '"' + self.field_map.get(field, field).replace('"', '""') + '"'
+        if field == 'code':
+            expr = f"CAST({column} AS VARCHAR)"
+            if self.code_regex:
+                expr = f"regexp_extract({expr}, '{self.code_regex}', 1)"
+            return expr
+        if field == 'date':
+            if self.date_format:
+                return f"strptime(CAST({column} AS VARCHAR), '{self.date_format}')"
+            return f"CAST({column} AS TIMESTAMP)"
+        if field == 'name':
+            return f"CAST({column} AS VARCHAR)"
+        return f"CAST({column} AS DOUBLE)"
+
+    def _select_sql(self, files: List[str], fields: List[str]) -> str:
+        """按标准字段读取文件的子查询"""
+        columns = ', '.join(f"{self._column_sql(f)} AS {f}" for f in ['code', 'date'] + fields)
+        return f"(SELECT {columns} FROM {self._scan_sql(files)})"
+
+    def get_all_symbols(self, security_type: SecurityType) -> pd.DataFrame:
+        """数据文件中的全部证券代码，文件没有名称列时名称为代码
+
+        Returns:
+            DataFrame with columns: [code, name]
+        """
+        for period in (Period.Day, Period.Minute):
+            for adjust in PriceAdjust:
+                files = self.dataset_files(security_type, period, adjust)
+                if not files:
+                    continue
+
+                con = self._connect()
+                try:
+                    columns = con.execute(f"DESCRIBE SELECT * FROM {self._scan_sql(files)}").df()['column_name'].tolist()
+                    name_sql = self._column_sql('name') if self.field_map['name'] in columns else self._column_sql('code')
+                    return con.execute(f"""
+                        SELECT {self._column_sql('code')} AS code, arg_max({name_sql}, {self._column_sql('date')}) AS name
+                        FROM {self._scan_sql(files)}
+                        GROUP BY 1
+                        ORDER BY 1
+                    """).df()
+                finally:
+                    con.close()
+
+        logger.warning(f"No data files for {security_type.value} in {self.root}")
+        return pd.DataFrame(columns=['code', 'name'])
+
+    def standardize_symbol(self, symbol: str):
+        return symbol
+
+    def get_price(self,
+                  symbol_list: list[str],
+                  start_date: str,
+                  end_date: str,
+                  security_type: SecurityType,
+                  period: Period = Period.Day,
+                  adjust: PriceAdjust = PriceAdjust.HFQ,
+                  fields: list[str] = ["open", "high", "low", "close", "volume"],
+                  multi_thread_cnt: int = -1):
+        """从数据文件读取K线，格式与其他DataProvider一致
+
+        Returns:
+            DataFrame with MultiIndex(code, date)，列为fields
+        """
+        security_type = SecurityType(security_type)
+        period = Period(period)
+        adjust = PriceAdjust(adjust)
+
+        files = self.dataset_files(security_type, period, adjust)
+        if not files:
+            logger.warning(f"No data files for {security_type.value} {period.value} {adjust.value}")
+            return pd.DataFrame(columns=fields, index=pd.MultiIndex.from_arrays([[], []], names=['code', 'date']))
+
+        end_next = (pd.Timestamp(end_date[:10]) + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+        sql = f"""
+            SELECT code, date, {', '.join(fields)}
+            FROM {self._select_sql(files, fields)}
+            WHERE code IN (SELECT UNNEST(?)) AND date >= CAST(? AS TIMESTAMP) AND date < CAST(? AS TIMESTAMP)
+            ORDER BY code, date
+        """
+        con = self._connect()
+        try:
+            df = con.execute(sql, [symbol_list, start_date[:10], end_next]).df()
+        finally:
+            con.close()
+
+        df['date'] = pd.to_datetime(df['date']).astype('datetime64[ns]')
+        return df.set_index(['code', 'date'])
+
+    def ingest(self,
+               security_type: SecurityType,
+               period: Period = Period.Day,
+               adjust: PriceAdjust = PriceAdjust.HFQ,
+               max_workers: int = 4,
+               validate: bool = True) -> int:
+        """将数据集导入本地K线库
+
+        每个文件由一个线程转换为Parquet暂存文件，再用copy_kdata_from_parquet批量导入，
+        与首次全量同步使用相同的导入方式；导入后更新元数据和同步水位，之后不会再向远程请求这些区间。
+
+        Args:
+            security_type: 证券类型
+            period: 周期
+            adjust: 复权方式
+            max_workers: 并行转换的文件数
+            validate: 是否校验数据，未通过校验的行隔离到t_kdata_quarantine；不校验时数据在DuckDB中直接转换，不经过pandas
+
+        Returns:
+            int: 导入的行数
+        """
+        files = self.dataset_files(security_type, period, adjust)
+        if not files:
+            logger.warning(f"No data files for {security_type.value} {period.value} {adjust.value}")
+            return 0
+
+        # 离线环境(如CI)中本地K线库可能尚未初始化
+        self.data_service.init_database()
+
+        meta_type = MetaType(f"{security_type.value}_{period.value}_{adjust.value}_kdata")
+        validator = KDataValidator()
+        with tempfile.TemporaryDirectory(prefix='kdata_file_ingest_') as staging_dir:
+            def stage(item: Tuple[int, str]) -> Tuple[str, Optional[ValidationResult]]:
+                i, file = item
+                path = os.path.join(staging_dir, f"{i:06d}.parquet")
+                relation = self._select_sql([file], AkshareDataService.KDATA_PRICE_FIELDS)
+                con = self._connect()
+                try:
+                    if not validate:
+                        # 本地K线库按(code, date)读取，文件数据与远程同步的数据写入同一来源，避免同一K线出现两条
+                        count = self.data_service.stage_kdata_relation(con, relation, path, adjust, period=period)
+                        logger.debug(f"Staged {count} rows from {file}")
+                        return path, None
+                    df = con.execute(f"SELECT * FROM {relation}").df()
+                finally:
+                    con.close()
+
+                df['date'] = df['date'].astype('datetime64[ns]')
+                result = validator.validate(df.set_index(['code', 'date']), period, adjust)
+                count = self.data_service.stage_kdata_parquet(result.clean, path, adjust, period=period)
+                logger.debug(f"Staged {count} rows from {file}, quarantined {len(result.quarantined)} rows")
+                return path, result
+
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                staged = list(executor.map(stage, enumerate(files)))
+
+            # 校验结果在全部文件转换后统一写入，本地库连接不在线程间共享
+            for _, result in staged:
+                if result is not None:
+                    self.data_service.save_validation_result(meta_type, period, adjust, result)
+
+            paths = [path for path, _ in staged if os.path.exists(path)]
+            if not paths:
+                logger.warning(f"No valid rows of {meta_type.value} in {len(files)} files")
+                return 0
+
+            total_count = self.data_service.copy_kdata_from_parquet(paths, security_type, period, adjust)
+
+            con = self._connect()
+            try:
+                coverage = con.execute(f"""
+                    SELECT code, substr(MIN(date), 1, 10) AS start_time, substr(MAX(date), 1, 10) AS end_time
+                    FROM read_parquet({paths})
+                    GROUP BY code
+                """).df()
+            finally:
+                con.close()
+
+        if not coverage.empty:
+            self.data_service.update_meta_info(meta_type, security_type, period,
+                                               coverage['start_time'].min(), coverage['end_time'].max(), source='file')
+            self.data_service.update_watermarks(meta_type, coverage)
+
+        logger.info(f"Ingested {total_count} rows of {meta_type.value} from {len(files)} files")
+        return total_count
+
+    def save_price_data(self,
+                        data: pd.DataFrame,
+                        security_type: SecurityType,
+                        period: Period,
+                        adjust: PriceAdjust):
+        """写入本地K线库"""
+        if data.empty:
+            return False
+
+        dates = data.index.get_level_values('date')
+        meta_type = MetaType(f"{security_type.value}_{period.value}_{adjust.value}_kdata")
+        data = self.data_service.validate_kdata(data, security_type, period, adjust)
+        self.data_service.batch_save_kdata(data, security_type, adjust, period=period)
+        self.data_service.update_meta_info(meta_type, security_type, period,
+                                           dates.min().strftime('%Y-%m-%d'), dates.max().strftime('%Y-%m-%d'),
+                                           source='file')
+        return True
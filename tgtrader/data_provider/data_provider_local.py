@@ -0,0 +1,317 @@
+# encoding: utf-8
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from loguru import logger
+
+from tgtrader.common import MetaType, Period, DataProvider, PriceAdjust, SecurityType
+from tgtrader.data_provider.data_provider_akshare import AkshareDataProvider
+from tgtrader.data_provider.kdata_validator import KDataValidator
+from tgtrader.data_provider.service.akshare_data_service import AkshareDataService
+from tgtrader.data_provider.service.kline_sync_service import KlineSyncService
+from tgtrader.data_provider.trading_calendar import TradingCalendar
+
+
+class LocalFirstDataProvider(DataProvider):
+    """优先读取本地K线库的数据提供者
+
+    本地已有的数据用一次DuckDB查询返回，只对缺失的(标的, 日期区间)调用远程接口，
+    获取到的数据写回本地库，下次直接读取。
+    本地库保存日线后复权、日线不复权和分钟线不复权数据；日线前复权由不复权数据和复权因子计算，
+    周线、月线、年线由本地日线聚合，其余组合直接请求远程接口。
+    """
+
+    # 本地库保存的(周期, 复权方式)
+    LOCAL_KDATA = {
+        (Period.Day, PriceAdjust.HFQ),
+        (Period.Day, PriceAdjust.NO),
+        (Period.Minute, PriceAdjust.NO),
+    }
+
+    # 写回本地库时获取完整字段
+    STORE_FIELDS = ["open", "high", "low", "close", "volume"]
+
+    def __init__(self,
+                 remote: Optional[AkshareDataProvider] = None,
+                 data_service: Optional[AkshareDataService] = None,
+                 adjust_from_factors: bool = False):
+        """
+        Args:
+            remote: 远程数据提供者，默认为AkshareDataProvider
+            data_service: 本地K线库服务，默认为AkshareDataService
+            adjust_from_factors: 日线后复权是否也由不复权数据和复权因子计算，不再单独保存后复权数据
+        """
+        super().__init__()
+        self.remote = remote or AkshareDataProvider()
+        self.data_service = data_service or self.remote.data_service
+        self.adjust_from_factors = adjust_from_factors
+
+    def get_all_symbols(self, security_type: SecurityType) -> pd.DataFrame:
+        return self.remote.get_all_symbols(security_type)
+
+    def standardize_symbol(self, symbol: str):
+        return self.remote.standardize_symbol(symbol)
+
+    def save_price_data(self,
+                        data: pd.DataFrame,
+                        security_type: SecurityType,
+                        period: Period,
+                        adjust: PriceAdjust):
+        self.remote.save_price_data(data, security_type, period, adjust)
+
+    def get_price(self,
+                  symbol_list: list[str],
+                  start_date: str,
+                  end_date: str,
+                  security_type: SecurityType,
+                  period: Period = Period.Day,
+                  adjust: PriceAdjust = PriceAdjust.HFQ,
+                  fields: list[str] = ["open", "high", "low", "close", "volume"],
+                  multi_thread_cnt: int = -1):
+        """获取证券数据，本地已覆盖的部分直接读取，缺失部分从远程获取并写回本地"""
+        period = Period(period)
+        adjust = PriceAdjust(adjust)
+        security_type = SecurityType(security_type)
+
+        # 本地K线表只保存开高低收和成交量，其他字段(如成交额、换手率)从远程获取
+        extra_fields = [f for f in fields if f not in AkshareDataService.KDATA_PRICE_FIELDS]
+        if extra_fields:
+            logger.debug(f"Fields {extra_fields} are not stored locally, fetching from remote")
+            return self.remote.get_price(symbol_list, start_date, end_date, security_type,
+                                         period, adjust, fields, multi_thread_cnt)
+
+        if self._use_adj_factors(security_type, period, adjust):
+            return self._get_adjusted_price(symbol_list, start_date, end_date, security_type,
+                                            adjust, fields, multi_thread_cnt)
+
+        if self._use_resampled(security_type, period, adjust):
+            return self._get_resampled_price(symbol_list, start_date, end_date, security_type,
+                                             period, adjust, fields, multi_thread_cnt)
+
+        if (period, adjust) not in self.LOCAL_KDATA or security_type not in (SecurityType.Stocks, SecurityType.ETF):
+            return self.remote.get_price(symbol_list, start_date, end_date, security_type,
+                                         period, adjust, fields, multi_thread_cnt)
+
+        # 不请求未来的数据
+        end_date = min(end_date[:10], pd.Timestamp.today().strftime('%Y-%m-%d'))
+
+        try:
+            gaps = self._find_gaps(symbol_list, start_date, end_date, security_type, period, adjust)
+        except Exception as e:
+            logger.warning(f"Failed to check local coverage, fetching from remote: {str(e)}")
+            return self.remote.get_price(symbol_list, start_date, end_date, security_type,
+                                         period, adjust, fields, multi_thread_cnt)
+
+        _, unsaved = self._fetch_gaps(gaps, security_type, period, adjust, multi_thread_cnt)
+
+        local = self.data_service.query_kdata(symbol_list, start_date, end_date, security_type,
+                                              period, adjust, fields)
+        logger.debug(f"Local kdata rows: {len(local)}, remote gaps: {sum(len(v) for v in gaps.values())}")
+
+        if unsaved.empty:
+            return local
+
+        # 写回失败时本地查询不包含新数据，以远程数据中通过校验的部分为准合并
+        unsaved = unsaved.loc[(unsaved.index.get_level_values('date') >= pd.Timestamp(start_date[:10]))
+                              & (unsaved.index.get_level_values('date') < pd.Timestamp(end_date) + pd.Timedelta(days=1)),
+                              fields]
+        combined = pd.concat([local, unsaved])
+        combined = combined[~combined.index.duplicated(keep='last')]
+        return combined.sort_index()
+
+    def _use_adj_factors(self, security_type: SecurityType, period: Period, adjust: PriceAdjust) -> bool:
+        if period != Period.Day or security_type not in (SecurityType.Stocks, SecurityType.ETF):
+            return False
+        return adjust == PriceAdjust.QFQ or (adjust == PriceAdjust.HFQ and self.adjust_from_factors)
+
+    def _get_adjusted_price(self,
+                            symbol_list: List[str],
+                            start_date: str,
+                            end_date: str,
+                            security_type: SecurityType,
+                            adjust: PriceAdjust,
+                            fields: List[str],
+                            multi_thread_cnt: int = -1) -> pd.DataFrame:
+        """补齐本地日线不复权数据和复权因子后，在查询中乘以因子得到复权价格"""
+        end_date = min(end_date[:10], pd.Timestamp.today().strftime('%Y-%m-%d'))
+
+        try:
+            gaps = self._find_gaps(symbol_list, start_date, end_date, security_type, Period.Day, PriceAdjust.NO)
+        except Exception as e:
+            logger.warning(f"Failed to check local coverage, fetching from remote: {str(e)}")
+            return self.remote.get_price(symbol_list, start_date, end_date, security_type,
+                                         Period.Day, adjust, fields, multi_thread_cnt)
+
+        self._fetch_gaps(gaps, security_type, Period.Day, PriceAdjust.NO, multi_thread_cnt)
+
+        # 新获取数据的标的可能发生了除权除息，和没有因子的标的一起刷新因子
+        refresh = {s for symbols in gaps.values() for s in symbols}
+        factors = self.data_service.get_adj_factors(symbol_list, security_type)
+        refresh |= set(symbol_list) - set(factors['code'])
+        if refresh:
+            factors = self.remote.get_adj_factors(sorted(refresh), security_type, multi_thread_cnt)
+            self.data_service.save_adj_factors(factors, security_type)
+
+        return self.data_service.query_adjusted_kdata(symbol_list, start_date, end_date, security_type,
+                                                      adjust, fields)
+
+    def _use_resampled(self, security_type: SecurityType, period: Period, adjust: PriceAdjust) -> bool:
+        """周线、月线、年线由本地保存的日线聚合"""
+        return (period in self.data_service.RESAMPLE_PERIODS
+                and security_type in (SecurityType.Stocks, SecurityType.ETF)
+                and (Period.Day, adjust) in self.LOCAL_KDATA
+                and not self._use_adj_factors(security_type, Period.Day, adjust))
+
+    def _get_resampled_price(self,
+                             symbol_list: List[str],
+                             start_date: str,
+                             end_date: str,
+                             security_type: SecurityType,
+                             period: Period,
+                             adjust: PriceAdjust,
+                             fields: List[str],
+                             multi_thread_cnt: int = -1) -> pd.DataFrame:
+        """补齐本地日线后从聚合表读取周线、月线、年线
+
+        本地日线有新数据时只重算新数据所在周期及之后的部分；日线已经完整时不请求远程接口，也不重算。
+        """
+        end_date = min(end_date[:10], pd.Timestamp.today().strftime('%Y-%m-%d'))
+        # 第一根K线包含所在周期内请求起始日期之前的日线
+        daily_start = self._period_start(start_date, period)
+
+        try:
+            gaps = self._find_gaps(symbol_list, daily_start, end_date, security_type, Period.Day, adjust)
+        except Exception as e:
+            logger.warning(f"Failed to check local coverage, fetching from remote: {str(e)}")
+            return self.remote.get_price(symbol_list, start_date, end_date, security_type,
+                                         period, adjust, fields, multi_thread_cnt)
+
+        fetched, _ = self._fetch_gaps(gaps, security_type, Period.Day, adjust, multi_thread_cnt)
+
+        resampled_meta = self.data_service.get_metadata(self._get_meta_type(security_type, period, adjust))
+        daily_meta = self.data_service.get_metadata(self._get_meta_type(security_type, Period.Day, adjust))
+        since = None
+        if not fetched.empty:
+            since = fetched.index.get_level_values('date').min().strftime('%Y-%m-%d')
+        if resampled_meta is None:
+            since = daily_meta.start_time[:10] if daily_meta else since
+        elif daily_meta is not None:
+            # 其他途径(定时同步、文件导入)写入的日线晚于或早于已聚合的范围
+            if daily_meta.end_time[:10] > resampled_meta.end_time[:10]:
+                since = min(since or resampled_meta.end_time[:10], resampled_meta.end_time[:10])
+            if self._period_start(daily_meta.start_time, period) < self._period_start(resampled_meta.start_time, period):
+                since = daily_meta.start_time[:10]
+        if since is not None:
+            self.data_service.refresh_resampled_kdata(security_type, adjust, [period], since)
+
+        return self.data_service.query_resampled_kdata(symbol_list, start_date, end_date, security_type,
+                                                       period, adjust, fields)
+
+    @staticmethod
+    def _period_start(date: str, period: Period) -> str:
+        """日期所在周期的起始日期：周一、月初或年初"""
+        freq = {Period.Week: 'W-SUN', Period.Month: 'M', Period.Year: 'Y'}[period]
+        return pd.Timestamp(date[:10]).to_period(freq).start_time.strftime('%Y-%m-%d')
+
+    def _find_gaps(self,
+                   symbol_list: List[str],
+                   start_date: str,
+                   end_date: str,
+                   security_type: SecurityType,
+                   period: Period,
+                   adjust: PriceAdjust) -> Dict[Tuple[str, str], List[str]]:
+        """计算需要从远程获取的区间
+
+        有同步水位的标的只请求水位外的区间。没有水位但本地有数据的标的，
+        如果元数据显示整张表已更新到请求的边界，则认为该标的在边界外没有数据(未上市或停牌)，不再请求远程。
+
+        Returns:
+            Dict[(start_date, end_date), symbol_list]，区间相同的标的合并为一次请求
+        """
+        meta_type = self._get_meta_type(security_type, period, adjust)
+        watermarks = self.data_service.get_watermarks(meta_type, symbol_list)
+        watermarks = {row.code: (row.start_time[:10], row.end_time[:10]) for row in watermarks.itertuples()}
+
+        start_date = start_date[:10]
+        gaps = defaultdict(list)
+        for (gap_start, gap_end), symbols in KlineSyncService.plan(
+                [s for s in symbol_list if s in watermarks], watermarks, start_date, end_date).items():
+            gaps[(gap_start, gap_end)].extend(symbols)
+
+        symbol_list = [s for s in symbol_list if s not in watermarks]
+        if not symbol_list:
+            return dict(gaps)
+
+        coverage = self.data_service.get_kdata_coverage(symbol_list, security_type, period, adjust)
+        coverage = {row.code: (row.start_time[:10], row.end_time[:10]) for row in coverage.itertuples()}
+
+        meta = self.data_service.get_metadata(meta_type)
+        meta_start = meta.start_time[:10] if meta else None
+        meta_end = meta.end_time[:10] if meta else None
+
+        for symbol in symbol_list:
+            if symbol not in coverage:
+                gaps[(start_date, end_date)].append(symbol)
+                continue
+
+            local_start, local_end = coverage[symbol]
+            if start_date < local_start and not (meta_start and meta_start <= start_date):
+                gap_end = (pd.Timestamp(local_start) - pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+                if self._has_trading_day(start_date, gap_end):
+                    gaps[(start_date, gap_end)].append(symbol)
+
+            if end_date > local_end and not (meta_end and meta_end >= end_date):
+                gap_start = (pd.Timestamp(local_end) + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+                if self._has_trading_day(gap_start, end_date):
+                    gaps[(gap_start, end_date)].append(symbol)
+
+        return dict(gaps)
+
+    def _get_meta_type(self, security_type: SecurityType, period: Period, adjust: PriceAdjust) -> MetaType:
+        return MetaType(f"{security_type.value}_{period.value}_{adjust.value}_kdata")
+
+    def _has_trading_day(self, start_date: str, end_date: str) -> bool:
+        return TradingCalendar.get().has_session(start_date, end_date)
+
+    def _fetch_gaps(self,
+                    gaps: Dict[Tuple[str, str], List[str]],
+                    security_type: SecurityType,
+                    period: Period,
+                    adjust: PriceAdjust,
+                    multi_thread_cnt: int = -1) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """从远程获取缺失的数据并写回本地库，写回成功后推进同步水位
+
+        Returns:
+            (获取到的全部数据, 写回失败的数据中通过校验的部分)，写回成功的数据之后从本地查询，
+            未通过校验的行已被隔离，不会返回
+        """
+        meta_type = self._get_meta_type(security_type, period, adjust)
+        dfs = []
+        unsaved = []
+        for (gap_start, gap_end), symbols in gaps.items():
+            logger.info(f"Fetching {len(symbols)} symbols from remote, {gap_start} ~ {gap_end}")
+            df = self.remote.get_price(symbols, gap_start, gap_end, security_type,
+                                       period, adjust, self.STORE_FIELDS, multi_thread_cnt)
+            errors = getattr(self.remote, 'last_fetch_errors', {}) or {}
+
+            if df is not None and not df.empty:
+                dfs.append(df)
+                if not self.remote.save_price_data(df, security_type, period, adjust):
+                    unsaved.append(KDataValidator().validate(df, period, adjust).clean)
+                    continue
+
+            # 当天的数据在收盘前不完整，不推进到当天
+            synced_end = min(gap_end, KlineSyncService._latest_closed_date())
+            synced = [s for s in symbols if s not in errors]
+            if synced and gap_start <= synced_end:
+                self.data_service.update_watermarks(meta_type, pd.DataFrame({
+                    'code': synced,
+                    'start_time': gap_start,
+                    'end_time': synced_end
+                }))
+
+        if not dfs:
+            return pd.DataFrame(), pd.DataFrame()
+
+        return pd.concat(dfs), pd.concat(unsaved) if unsaved else pd.DataFrame()
@@ -0,0 +1,67 @@
+# encoding: utf-8
+from typing import Optional
+
+import pandas as pd
+
+from tgtrader.common import MetaType, Period, DataProvider, PriceAdjust, SecurityType
+from tgtrader.data_provider.data_provider_akshare import AkshareDataProvider
+from tgtrader.data_provider.kdata_lake import KDataLake
+
+
+class ParquetLakeDataProvider(DataProvider):
+    """从K线Parquet数据湖读取数据的数据提供者
+
+    只读取数据湖中已有的数据，不请求远程接口；数据湖由KlineSyncService同步后刷新，
+    或用KDataLake.export_from_db从本地K线库导出。
+    """
+
+    def __init__(self,
+                 lake: Optional[KDataLake] = None,
+                 symbol_provider: Optional[DataProvider] = None):
+        """
+        Args:
+            lake: K线数据湖，默认为KDataLake()
+            symbol_provider: 提供证券列表的数据提供者，默认为AkshareDataProvider
+        """
+        super().__init__()
+        self.lake = lake or KDataLake()
+        self.symbol_provider = symbol_provider or AkshareDataProvider()
+
+    def get_all_symbols(self, security_type: SecurityType) -> pd.DataFrame:
+        return self.symbol_provider.get_all_symbols(security_type)
+
+    def standardize_symbol(self, symbol: str):
+        return symbol
+
+    def get_price(self,
+                  symbol_list: list[str],
+                  start_date: str,
+                  end_date: str,
+                  security_type: SecurityType,
+                  period: Period = Period.Day,
+                  adjust: PriceAdjust = PriceAdjust.HFQ,
+                  fields: list[str] = ["open", "high", "low", "close", "volume"],
+                  multi_thread_cnt: int = -1):
+        return self.lake.query(symbol_list, start_date, end_date, SecurityType(security_type),
+                               Period(period), PriceAdjust(adjust), fields)
+
+    def save_price_data(self,
+                        data: pd.DataFrame,
+                        security_type: SecurityType,
+                        period: Period,
+                        adjust: PriceAdjust):
+        """写入本地K线库，再重建涉及的年份分区"""
+        if data.empty:
+            return False
+
+        dates = data.index.get_level_values('date')
+        start_time = dates.min().strftime('%Y-%m-%d')
+        end_time = dates.max().strftime('%Y-%m-%d')
+        meta_type = MetaType(f"{security_type.value}_{period.value}_{adjust.value}_kdata")
+
+        data_service = self.lake.data_service
+        data = data_service.validate_kdata(data, security_type, period, adjust)
+        data_service.batch_save_kdata(data, security_type, adjust, period=period)
+        data_service.update_meta_info(meta_type, security_type, period, start_time, end_time)
+        self.lake.refresh(meta_type, start_time, end_time)
+        return True
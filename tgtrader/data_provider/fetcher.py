@@ -0,0 +1,244 @@
+# encoding: utf-8
+import heapq
+import itertools
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+from loguru import logger
+from tqdm import tqdm
+
+
+class TokenBucket:
+    """令牌桶限流器，线程安全
+
+    Args:
+        rate: 每秒补充的令牌数，即平均请求速率
+        capacity: 桶容量，允许的突发请求数
+    """
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.clock = clock
+        self._tokens = self.capacity
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def try_acquire(self) -> float:
+        """尝试获取一个令牌
+
+        Returns:
+            float: 0表示获取成功，否则为需要等待的秒数
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, stop: Optional[threading.Event] = None):
+        """阻塞直到获取一个令牌"""
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return
+            if stop is not None:
+                stop.wait(wait)
+            else:
+                time.sleep(wait)
+
+
+class AdaptiveLimit:
+    """自适应并发上限(AIMD)
+
+    连续成功时并发数加1，出错时减半，在[min_limit, max_limit]之间调整。
+    """
+    def __init__(self, max_limit: int, min_limit: int = 1, increase_every: int = 10):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.increase_every = increase_every
+        self.limit = self.max_limit
+        self._in_flight = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self, success: bool):
+        with self._cond:
+            self._in_flight -= 1
+            if success:
+                self._successes += 1
+                if self._successes >= self.increase_every and self.limit < self.max_limit:
+                    self.limit += 1
+                    self._successes = 0
+            else:
+                self._successes = 0
+                self.limit = max(self.min_limit, self.limit // 2)
+            self._cond.notify_all()
+
+
+@dataclass(order=True)
+class _Task:
+    # 可执行时间，重试任务需要等待退避时间
+    ready_time: float
+    seq: int
+    symbol: str = field(compare=False)
+    attempt: int = field(compare=False, default=0)
+
+
+@dataclass
+class FetchResult:
+    """批量获取结果"""
+    # 成功获取的数据，key为标的代码，无数据的标的不在其中
+    data: Dict[str, Any]
+    # 重试后仍失败的标的及最后一次异常
+    errors: Dict[str, Exception]
+    # 返回空数据的标的
+    empty: List[str]
+
+
+class BoundedFetcher:
+    """按标的并发获取数据
+
+    每个标的是独立任务：请求前从令牌桶获取令牌限制请求速率，失败后按指数退避单独重试，
+    并发数根据错误情况自适应调整。单个标的出错不影响其他标的。
+
+    Args:
+        fetch_fn: 获取单个标的数据的函数，返回DataFrame(或其他格式的数据)，None或空DataFrame表示无数据，可替换为本地stub用于测试
+        max_workers: 最大并发数
+        min_workers: 出错时并发数的下限
+        rate: 每秒最大请求数
+        burst: 令牌桶容量，默认与rate相同
+        max_retries: 单个标的最多重试次数
+        backoff_base: 第一次重试的等待秒数，之后每次翻倍
+        backoff_max: 重试等待的上限(秒)
+        desc: 进度条描述，为None时不显示进度条
+    """
+    def __init__(self,
+                 fetch_fn: Callable[[str], Any],
+                 max_workers: int = 4,
+                 min_workers: int = 1,
+                 rate: float = 5.0,
+                 burst: Optional[float] = None,
+                 max_retries: int = 3,
+                 backoff_base: float = 1.0,
+                 backoff_max: float = 30.0,
+                 desc: Optional[str] = None):
+        self.fetch_fn = fetch_fn
+        self.max_workers = max(1, max_workers)
+        self.min_workers = min_workers
+        self.rate_limiter = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.desc = desc
+
+    def fetch(self, symbols: List[str]) -> FetchResult:
+        """获取所有标的的数据
+
+        Args:
+            symbols: 标的代码列表
+
+        Returns:
+            FetchResult
+        """
+        result = FetchResult(data={}, errors={}, empty=[])
+        if not symbols:
+            return result
+
+        seq = itertools.count()
+        queue = [_Task(0.0, next(seq), symbol) for symbol in symbols]
+        heapq.heapify(queue)
+        remaining = len(queue)
+
+        lock = threading.Condition()
+        stop = threading.Event()
+        limit = AdaptiveLimit(self.max_workers, self.min_workers)
+        progress = tqdm(total=len(symbols), desc=self.desc, disable=self.desc is None)
+
+        def next_task() -> Optional[_Task]:
+            nonlocal remaining
+            with lock:
+                while True:
+                    if remaining == 0:
+                        return None
+                    if queue:
+                        delay = queue[0].ready_time - time.monotonic()
+                        if delay <= 0:
+                            return heapq.heappop(queue)
+                        lock.wait(delay)
+                    else:
+                        # 其他线程的任务可能失败后重新入队
+                        lock.wait()
+
+        def finish(task: _Task):
+            nonlocal remaining
+            with lock:
+                remaining -= 1
+                progress.update(1)
+                lock.notify_all()
+
+        def retry(task: _Task, e: Exception) -> bool:
+            if task.attempt >= self.max_retries:
+                return False
+            backoff = min(self.backoff_max, self.backoff_base * (2 ** task.attempt))
+            # 加入随机抖动，避免重试请求同时到达
+            backoff *= random.uniform(0.5, 1.0)
+            logger.warning(f"Fetch {task.symbol} failed (attempt {task.attempt + 1}), retry in {backoff:.1f}s: {str(e)}")
+            with lock:
+                heapq.heappush(queue, _Task(time.monotonic() + backoff, next(seq), task.symbol, task.attempt + 1))
+                lock.notify_all()
+            return True
+
+        def worker():
+            while True:
+                task = next_task()
+                if task is None:
+                    return
+
+                limit.acquire()
+                self.rate_limiter.acquire(stop)
+                try:
+                    df = self.fetch_fn(task.symbol)
+                except Exception as e:
+                    limit.release(success=False)
+                    if not retry(task, e):
+                        logger.error(f"Fetch {task.symbol} failed after {task.attempt + 1} attempts: {str(e)}")
+                        with lock:
+                            result.errors[task.symbol] = e
+                        finish(task)
+                    continue
+
+                limit.release(success=True)
+                with lock:
+                    if df is None or (isinstance(df, pd.DataFrame) and df.empty):
+                        result.empty.append(task.symbol)
+                    else:
+                        result.data[task.symbol] = df
+                finish(task)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(min(self.max_workers, len(symbols)))]
+        try:
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            stop.set()
+            progress.close()
+
+        return result
@@ -0,0 +1,248 @@
+# encoding: utf-8
+import glob
+import os
+import shutil
+import tempfile
+from typing import List, Optional, Tuple
+
+import duckdb
+import pandas as pd
+from loguru import logger
+
+from tgtrader.common import MetaType, Period, PriceAdjust, SecurityType
+from tgtrader.data_provider.service.akshare_data_service import AkshareDataService
+from tgtrader.utils.db_path_utils import get_kdata_lake_dir
+from tgtrader.utils.duckdb_peewee import DuckDBDatabase
+
+
+class KDataLake:
+    """按security_type/year分区的K线Parquet数据湖
+
+    目录结构为 {root}/kdata_{period}_{adjust}/security_type={type}/year={year}/*.parquet，
+    通过DuckDB的Parquet扫描直接查询，按分区列过滤时只读取相关年份的文件。
+    读取不需要打开akshare_data.db，多个进程可以同时查询；每个年份分区可以单独重建。
+
+    Example:
+        lake = KDataLake()
+        lake.export_from_db(MetaType.Stocks1dHfqKdata)
+        df = lake.query(['000001'], '2024-01-01', '2024-06-30', SecurityType.Stocks)
+    """
+
+    # 设置为parquet时，默认数据提供者从数据湖读取K线，定时同步后刷新数据湖
+    STORAGE_ENV = 'KDATA_STORAGE'
+
+    def __init__(self, root: Optional[str] = None, data_service: Optional[AkshareDataService] = None):
+        """
+        Args:
+            root: 数据湖根目录，默认为环境变量KDATA_LAKE_PATH或data/kdata_lake
+            data_service: 本地K线库服务，用于导入导出
+        """
+        self.root = root or get_kdata_lake_dir()
+        os.makedirs(self.root, exist_ok=True)
+        self.data_service = data_service or AkshareDataService()
+
+    @classmethod
+    def enabled(cls) -> bool:
+        """是否使用数据湖作为K线存储"""
+        return os.getenv(cls.STORAGE_ENV, '').lower() == 'parquet'
+
+    @staticmethod
+    def parse_meta_type(meta_type: MetaType) -> Tuple[SecurityType, Period, PriceAdjust]:
+        security_value, period_value, adjust_value, _ = meta_type.value.split('_')
+        return SecurityType(security_value), Period(period_value), PriceAdjust(adjust_value)
+
+    def dataset_dir(self, period: Period, adjust: PriceAdjust) -> str:
+        return os.path.join(self.root, f"kdata_{period.value}_{adjust.value}")
+
+    def partition_dir(self, security_type: SecurityType, period: Period, adjust: PriceAdjust, year: int) -> str:
+        return os.path.join(self.dataset_dir(period, adjust), f"security_type={security_type.value}", f"year={year}")
+
+    def years(self, meta_type: MetaType) -> List[int]:
+        """数据湖中已有的年份分区"""
+        security_type, period, adjust = self.parse_meta_type(meta_type)
+        pattern = os.path.join(self.dataset_dir(period, adjust), f"security_type={security_type.value}", "year=*")
+        return sorted(int(os.path.basename(d).split('=')[1]) for d in glob.glob(pattern))
+
+    def export_from_db(self, meta_type: MetaType, years: Optional[List[int]] = None) -> int:
+        """从本地K线库导出到数据湖
+
+        Args:
+            meta_type: 元数据类型，对应K线表
+            years: 导出的年份，None表示本地库中的全部年份
+
+        Returns:
+            int: 导出的行数
+        """
+        security_type, period, adjust = self.parse_meta_type(meta_type)
+        if years is None:
+            years = self.data_service.get_kdata_years(security_type, period, adjust)
+
+        total_count = 0
+        for year in years:
+            total_count += self.rebuild_partition(meta_type, year)
+        return total_count
+
+    def rebuild_partition(self, meta_type: MetaType, year: int) -> int:
+        """用本地K线库的数据重建一个年份分区
+
+        先导出到临时目录，完成后替换原分区，其他年份不受影响。
+
+        Returns:
+            int: 分区的行数
+        """
+        security_type, period, adjust = self.parse_meta_type(meta_type)
+        target = self.partition_dir(security_type, period, adjust, year)
+
+        tmp_dir = tempfile.mkdtemp(prefix='.export_', dir=self.root)
+        try:
+            count = self.data_service.export_kdata_parquet(tmp_dir, security_type, period, adjust, year)
+            exported = os.path.join(tmp_dir, f"security_type={security_type.value}", f"year={year}")
+
+            old_dir = f"{target}.old"
+            shutil.rmtree(old_dir, ignore_errors=True)
+            if os.path.exists(target):
+                os.rename(target, old_dir)
+            if count > 0:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.rename(exported, target)
+            shutil.rmtree(old_dir, ignore_errors=True)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        logger.info(f"Rebuilt kdata lake partition {meta_type.value} {year}: {count} rows")
+        return count
+
+    def refresh(self, meta_type: MetaType, start_date: str, end_date: str) -> int:
+        """重建日期范围涉及的年份分区，用于增量同步之后更新数据湖"""
+        years = list(range(int(start_date[:4]), int(end_date[:4]) + 1))
+        return self.export_from_db(meta_type, years)
+
+    def import_to_db(self, meta_type: MetaType, years: Optional[List[int]] = None) -> int:
+        """将数据湖中的数据导入本地K线库，已有的数据按主键更新
+
+        Args:
+            meta_type: 元数据类型
+            years: 导入的年份，None表示数据湖中的全部年份
+
+        Returns:
+            int: 导入的行数
+        """
+        security_type, period, adjust = self.parse_meta_type(meta_type)
+        total_count = 0
+        for year in years if years is not None else self.years(meta_type):
+            files = glob.glob(os.path.join(self.partition_dir(security_type, period, adjust, year), '*.parquet'))
+            if not files:
+                continue
+
+            con = duckdb.connect()
+            try:
+                df = con.execute("SELECT * FROM read_parquet(?)", [files]).df()
+            finally:
+                con.close()
+
+            df = df.set_index(['code', 'date'])
+            total_count += self.data_service.batch_save_kdata(df, security_type, adjust, period=period)
+            self.data_service.update_meta_info(meta_type, security_type, period,
+                                               df.index.get_level_values('date').min().strftime('%Y-%m-%d'),
+                                               df.index.get_level_values('date').max().strftime('%Y-%m-%d'))
+        return total_count
+
+    def scan_sql(self, period: Period, adjust: PriceAdjust) -> Optional[str]:
+        """数据集的Parquet扫描表达式，数据集没有文件时返回None"""
+        dataset_dir = self.dataset_dir(period, adjust)
+        pattern = os.path.join(dataset_dir, '*', '*', '*.parquet')
+        if not glob.glob(pattern):
+            return None
+        return f"read_parquet('{pattern}', hive_partitioning = true)"
+
+    def query(self,
+              symbol_list: List[str],
+              start_date: str,
+              end_date: str,
+              security_type: SecurityType,
+              period: Period = Period.Day,
+              adjust: PriceAdjust = PriceAdjust.HFQ,
+              fields: List[str] = ["open", "high", "low", "close", "volume"]) -> pd.DataFrame:
+        """查询K线数据，格式与DataProvider.get_price一致
+
+        Args:
+            symbol_list: 证券代码列表
+            start_date: 开始日期，格式为YYYY-MM-DD
+            end_date: 结束日期，格式为YYYY-MM-DD，包含当天
+
+        Returns:
+            DataFrame with MultiIndex(code, date)，列为fields
+        """
+        scan = self.scan_sql(period, adjust)
+        if scan is None:
+            return pd.DataFrame(columns=fields, index=pd.MultiIndex.from_arrays([[], []], names=['code', 'date']))
+
+        date_type = 'TIMESTAMP' if period == Period.Minute else 'DATE'
+        end_next = (pd.Timestamp(end_date[:10]) + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+        # 分区列过滤只读取相关年份的文件
+        sql = f"""
+            SELECT code, CAST(date AS TIMESTAMP) AS date, {', '.join(fields)}
+            FROM {scan}
+            WHERE security_type = ? AND year BETWEEN ? AND ?
+              AND code IN (SELECT UNNEST(?))
+              AND date >= CAST(? AS {date_type}) AND date < CAST(? AS {date_type})
+            ORDER BY code, date
+        """
+        params = [security_type.value, int(start_date[:4]), int(end_date[:4]), symbol_list, start_date[:10], end_next]
+
+        con = duckdb.connect()
+        try:
+            df = con.execute(sql, params).df()
+        finally:
+            con.close()
+
+        df['date'] = pd.to_datetime(df['date']).astype('datetime64[ns]')
+        return df.set_index(['code', 'date'])
+
+    def get_codes(self, security_type: SecurityType, period: Period = Period.Day, adjust: PriceAdjust = PriceAdjust.HFQ) -> List[str]:
+        """数据湖中某证券类型的全部代码"""
+        scan = self.scan_sql(period, adjust)
+        if scan is None:
+            return []
+
+        con = duckdb.connect()
+        try:
+            rows = con.execute(f"SELECT DISTINCT code FROM {scan} WHERE security_type = ? ORDER BY code",
+                               [security_type.value]).fetchall()
+        finally:
+            con.close()
+        return [row[0] for row in rows]
+
+    def register_views(self, conn):
+        """在DuckDB连接中为每种K线创建视图，视图名与元数据类型相同，如stocks_1d_hfq_kdata"""
+        for meta_type in MetaType:
+            # 基本面数据不在数据湖中
+            if not meta_type.value.endswith('_kdata'):
+                continue
+            security_type, period, adjust = self.parse_meta_type(meta_type)
+            scan = self.scan_sql(period, adjust)
+            if scan is None:
+                continue
+            conn.execute(f"""
+                CREATE OR REPLACE VIEW {meta_type.value} AS
+                SELECT code, date, open, high, low, close, volume, year
+                FROM {scan}
+                WHERE security_type = '{security_type.value}'
+            """)
+
+    def database(self) -> 'KDataLakeDatabase':
+        """用于DuckDBQuery的内存数据库，连接时注册数据湖视图"""
+        return KDataLakeDatabase(self)
+
+
+class KDataLakeDatabase(DuckDBDatabase):
+    """查询数据湖的DuckDB内存数据库，每次连接时注册数据湖视图"""
+
+    def __init__(self, lake: KDataLake, *args, **kwargs):
+        super(KDataLakeDatabase, self).__init__(':memory:', *args, **kwargs)
+        self.lake = lake
+
+    def _connect(self):
+        conn = super(KDataLakeDatabase, self)._connect()
+        self.lake.register_views(conn)
+        return conn
@@ -0,0 +1,170 @@
+# encoding: utf-8
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from tgtrader.common import Period, PriceAdjust
+
+
+@dataclass
+class ValidationResult:
+    """K线数据校验结果"""
+    # 通过校验的数据，MultiIndex(code, date)，列与输入相同
+    clean: pd.DataFrame
+    # 隔离的数据，columns: [code, date, open, high, low, close, volume, reason]
+    quarantined: pd.DataFrame
+    # 各标的的数据质量，columns: [code, checked_rows, quarantined_rows, jump_count, gap_count, issues, last_issue_date]
+    health: pd.DataFrame
+
+
+class KDataValidator:
+    """K线数据校验
+
+    每批写入本地库的数据先按整列做向量化检查，不逐行处理：
+    - 价格缺失或不为正、最高价/最低价与开盘价收盘价矛盾、成交量为负、同一标的日期重复(保留最后一条)的行隔离，不写入K线表；
+    - 复权价相邻收盘价涨跌幅超过JUMP_THRESHOLD(通常是除权未复权)、日线相邻日期间隔超过GAP_DAYS的次数记入数据质量。
+      这两类问题无法通过删除单行修正，数据保留。
+    """
+
+    # 隔离原因，按位组合
+    REASONS = {
+        1: 'invalid_price',
+        2: 'ohlc_inconsistent',
+        4: 'negative_volume',
+        8: 'duplicate_date',
+    }
+
+    # 价格比较的相对误差，避免数据源四舍五入造成误判
+    PRICE_TOLERANCE = 1e-4
+
+    # 复权价相邻收盘价的最大涨跌幅，A股涨跌停限制最大为30%
+    JUMP_THRESHOLD = 0.35
+
+    # 日线相邻日期的最大间隔(自然日)，春节、国庆长假不超过12天，更长的间隔为停牌或缺失
+    GAP_DAYS = 15
+
+    def __init__(self, jump_threshold: Optional[float] = None, gap_days: Optional[int] = None):
+        """
+        Args:
+            jump_threshold: 复权价相邻收盘价的最大涨跌幅，默认JUMP_THRESHOLD
+            gap_days: 日线相邻日期的最大间隔(自然日)，默认GAP_DAYS
+        """
+        self.jump_threshold = jump_threshold or self.JUMP_THRESHOLD
+        self.gap_days = gap_days or self.GAP_DAYS
+
+    def validate(self, data: pd.DataFrame, period: Period, adjust: PriceAdjust) -> ValidationResult:
+        """校验一批K线数据
+
+        Args:
+            data: DataFrame with MultiIndex(code, date)，至少包含open, high, low, close, volume列
+            period: 周期
+            adjust: 复权方式，只有复权价检查收盘价跳变
+
+        Returns:
+            ValidationResult，clean按(code, date)排序
+        """
+        df = data.reset_index()
+        n = len(df)
+        if n == 0:
+            return ValidationResult(data, self.__empty_quarantined(), self.__empty_health())
+
+        # 按(标的, 日期, 原始顺序)排序，重复日期中原始顺序靠后的数据排在最后
+        code_ids, codes = pd.factorize(df['code'], sort=True)
+        dates = pd.to_datetime(df['date']).to_numpy(dtype='datetime64[ns]')
+        order = np.lexsort((np.arange(n), dates, code_ids))
+        # 数据源返回的数据通常已经有序，此时不需要重排
+        if (np.diff(order) != 1).any():
+            df = df.iloc[order].reset_index(drop=True)
+            code_ids = code_ids[order]
+            dates = dates[order]
+
+        o, h, l, c, v = (df[f].to_numpy(dtype=np.float64, na_value=np.nan)
+                         for f in ['open', 'high', 'low', 'close', 'volume'])
+
+        flags = np.zeros(n, dtype=np.int8)
+        # NaN与0比较为False，缺失的价格同样视为无效
+        flags |= np.where((o > 0) & (h > 0) & (l > 0) & (c > 0), 0, 1).astype(np.int8)
+        tolerance = np.abs(c) * self.PRICE_TOLERANCE
+        ohlc = (h < np.maximum(np.maximum(o, c), l) - tolerance) | (l > np.minimum(o, c) + tolerance)
+        flags |= np.where(ohlc, 2, 0).astype(np.int8)
+        flags |= np.where(v < 0, 4, 0).astype(np.int8)
+        duplicated = np.zeros(n, dtype=bool)
+        duplicated[:-1] = (code_ids[1:] == code_ids[:-1]) & (dates[1:] == dates[:-1])
+        flags |= np.where(duplicated, 8, 0).astype(np.int8)
+
+        bad = flags != 0
+        good = ~bad
+
+        # 在保留的数据上检查相邻两行，只比较同一标的
+        good_ids = code_ids[good]
+        same_code = good_ids[1:] == good_ids[:-1]
+        jumps = np.zeros(len(same_code), dtype=bool)
+        if adjust in (PriceAdjust.HFQ, PriceAdjust.QFQ) and period != Period.Minute:
+            good_close = c[good]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                jumps = same_code & (np.abs(good_close[1:] / good_close[:-1] - 1) > self.jump_threshold)
+        gaps = np.zeros(len(same_code), dtype=bool)
+        if period == Period.Day:
+            good_dates = dates[good]
+            gaps = same_code & (good_dates[1:] - good_dates[:-1] > np.timedelta64(self.gap_days, 'D'))
+
+        quarantined = df.loc[bad, ['code', 'date', 'open', 'high', 'low', 'close', 'volume']].copy()
+        quarantined['reason'] = self.__reason_names()[flags[bad]]
+
+        health = self.__health(codes, code_ids, dates, bad, good_ids, same_code, jumps, gaps, flags)
+
+        clean = df[good]
+        return ValidationResult(clean.set_index(['code', 'date']), quarantined.reset_index(drop=True), health)
+
+    def __health(self, codes, code_ids, dates, bad, good_ids, same_code, jumps, gaps, flags) -> pd.DataFrame:
+        """按标的汇总数据质量"""
+        size = len(codes)
+        # 相邻两行的问题计在后一行的标的上
+        next_ids = good_ids[1:]
+        health = pd.DataFrame({
+            'code': np.asarray(codes),
+            'checked_rows': np.bincount(code_ids, minlength=size),
+            'quarantined_rows': np.bincount(code_ids[bad], minlength=size),
+            'jump_count': np.bincount(next_ids[jumps], minlength=size),
+            'gap_count': np.bincount(next_ids[gaps], minlength=size),
+        })
+
+        # 只为有问题的标的生成问题描述，多数标的没有问题
+        issue_flags = np.zeros(size, dtype=np.int8)
+        np.bitwise_or.at(issue_flags, code_ids[bad], flags[bad])
+        # fmax忽略NaT，取各标的最近一次出现问题的日期
+        issue_date = np.full(size, np.datetime64('NaT'), dtype='datetime64[ns]')
+        np.fmax.at(issue_date, code_ids[bad], dates[bad])
+        good_dates = dates[~bad][1:]
+        for mask in (jumps, gaps):
+            np.fmax.at(issue_date, next_ids[mask], good_dates[mask])
+
+        reason_names = self.__reason_names()
+        issues = [None] * size
+        for i in np.flatnonzero(issue_flags | (health['jump_count'].to_numpy() > 0) | (health['gap_count'].to_numpy() > 0)):
+            names = [] if issue_flags[i] == 0 else [reason_names[issue_flags[i]]]
+            if health.at[i, 'jump_count'] > 0:
+                names.append('price_jump')
+            if health.at[i, 'gap_count'] > 0:
+                names.append('date_gap')
+            issues[i] = ','.join(names)
+        health['issues'] = issues
+        health['last_issue_date'] = [None if pd.isna(d) else str(d)[:10] for d in issue_date]
+        return health
+
+    @classmethod
+    def __reason_names(cls) -> np.ndarray:
+        """各种原因组合对应的描述，下标为按位组合的原因"""
+        return np.array([','.join(name for bit, name in cls.REASONS.items() if flag & bit)
+                         for flag in range(2 * max(cls.REASONS))], dtype=object)
+
+    @staticmethod
+    def __empty_quarantined() -> pd.DataFrame:
+        return pd.DataFrame(columns=['code', 'date', 'open', 'high', 'low', 'close', 'volume', 'reason'])
+
+    @staticmethod
+    def __empty_health() -> pd.DataFrame:
+        return pd.DataFrame(columns=['code', 'checked_rows', 'quarantined_rows', 'jump_count', 'gap_count',
+                                     'issues', 'last_issue_date'])
@@ -0,0 +1,218 @@
+# encoding: utf-8
+import os
+import shutil
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from tgtrader.common import Period, PriceAdjust, SecurityType
+from tgtrader.data_provider.service.akshare_data_service import AkshareDataService
+from tgtrader.utils.db_path_utils import get_price_matrix_dir
+
+
+@dataclass
+class PriceMatrix:
+    """date x code 的价格矩阵，values为只读的内存映射数组"""
+    # 交易日期，升序
+    dates: np.ndarray
+    # 证券代码
+    codes: np.ndarray
+    # shape为(len(dates), len(codes))，没有数据的位置为nan
+    values: np.ndarray
+
+    def __post_init__(self):
+        self._code_index = pd.Index(self.codes)
+
+    @property
+    def start_date(self) -> pd.Timestamp:
+        return pd.Timestamp(self.dates[0])
+
+    @property
+    def end_date(self) -> pd.Timestamp:
+        return pd.Timestamp(self.dates[-1])
+
+    def has_codes(self, symbol_list: List[str]) -> bool:
+        return bool((self._code_index.get_indexer(symbol_list) >= 0).all())
+
+    def slice(self, symbol_list: List[str], start_date: str, end_date: str) -> pd.DataFrame:
+        """按日期范围和证券代码取子矩阵，只复制选中的行列
+
+        Args:
+            symbol_list: 证券代码列表，矩阵中没有的代码不在结果中
+            start_date: 开始日期，格式为YYYY-MM-DD
+            end_date: 结束日期，格式为YYYY-MM-DD，包含当天
+
+        Returns:
+            DataFrame，index为date，columns为code
+        """
+        start = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start_date[:10])), side='left')
+        end = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end_date[:10])), side='right')
+
+        columns = self._code_index.get_indexer(symbol_list)
+        symbols = [s for s, i in zip(symbol_list, columns) if i >= 0]
+        columns = columns[columns >= 0]
+
+        df = pd.DataFrame(self.values[start:end][:, columns],
+                          index=pd.DatetimeIndex(self.dates[start:end], name='date'),
+                          columns=pd.Index(symbols, name='code'))
+        return df
+
+
+class PriceMatrixStore:
+    """按(security_type, field, adjust)保存的日线价格矩阵快照
+
+    每个矩阵保存为一个目录，包含values.npy(float64矩阵)、dates.npy和codes.npy，
+    读取时用内存映射打开values，不需要解析和透视长表。矩阵由定时同步任务在K线同步后更新，
+    新的交易日追加到末尾，整个目录写入临时目录后替换，已打开的矩阵不受影响。
+
+    Example:
+        store = PriceMatrixStore()
+        store.update(SecurityType.Stocks, 'close')
+        prices = store.open(SecurityType.Stocks, 'close').slice(['000001'], '2024-01-01', '2024-06-30')
+    """
+
+    def __init__(self, root: Optional[str] = None, data_service: Optional[AkshareDataService] = None):
+        """
+        Args:
+            root: 快照根目录，默认为环境变量PRICE_MATRIX_PATH或data/price_matrix
+            data_service: 本地K线库服务，用于构建矩阵
+        """
+        self.root = root or get_price_matrix_dir()
+        self.data_service = data_service or AkshareDataService()
+
+    def matrix_dir(self, security_type: SecurityType, field: str, adjust: PriceAdjust = PriceAdjust.HFQ) -> str:
+        return os.path.join(self.root, f"{security_type.value}_{field}_{adjust.value}")
+
+    def open(self,
+             security_type: SecurityType,
+             field: str = 'close',
+             adjust: PriceAdjust = PriceAdjust.HFQ) -> Optional[PriceMatrix]:
+        """以内存映射方式打开矩阵，矩阵不存在时返回None"""
+        matrix_dir = self.matrix_dir(security_type, field, adjust)
+        if not os.path.exists(os.path.join(matrix_dir, 'values.npy')):
+            return None
+
+        return PriceMatrix(dates=np.load(os.path.join(matrix_dir, 'dates.npy')),
+                           codes=np.load(os.path.join(matrix_dir, 'codes.npy')),
+                           values=np.load(os.path.join(matrix_dir, 'values.npy'), mmap_mode='r'))
+
+    def build(self,
+              security_type: SecurityType,
+              field: str = 'close',
+              adjust: PriceAdjust = PriceAdjust.HFQ) -> int:
+        """用本地K线库的全部数据重建矩阵
+
+        Returns:
+            int: 写入矩阵的行数(K线条数)
+        """
+        coverage = self.__get_coverage(security_type, adjust)
+        if coverage.empty:
+            logger.warning(f"No local kdata for price matrix {security_type.value} {field} {adjust.value}")
+            return 0
+
+        df = self.__query(list(coverage['code']), str(coverage['start_time'].min())[:10],
+                          str(coverage['end_time'].max())[:10], security_type, field, adjust)
+        dates = np.unique(df['date'].to_numpy())
+        codes = np.sort(df['code'].unique().astype(str))
+        values = np.full((len(dates), len(codes)), np.nan)
+        self.__scatter(values, dates, codes, df, field)
+
+        self.__write(security_type, field, adjust, dates, codes, values)
+        logger.info(f"Built price matrix {security_type.value} {field} {adjust.value}: {values.shape}")
+        return len(df)
+
+    def update(self,
+               security_type: SecurityType,
+               field: str = 'close',
+               adjust: PriceAdjust = PriceAdjust.HFQ) -> int:
+        """增量更新矩阵：已有代码追加最后日期之后的数据，新代码补齐矩阵日期范围内的数据
+
+        前复权价格在除权后整体变化，以及新数据不能追加到末尾时，重建整个矩阵。
+
+        Returns:
+            int: 写入矩阵的行数(K线条数)
+        """
+        matrix = self.open(security_type, field, adjust)
+        if matrix is None or adjust == PriceAdjust.QFQ:
+            return self.build(security_type, field, adjust)
+
+        coverage = self.__get_coverage(security_type, adjust)
+        end_date = str(coverage['end_time'].max())[:10]
+        new_codes = sorted(set(coverage['code']) - set(matrix.codes))
+        next_date = (matrix.end_date + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+
+        dfs = [self.__query(list(matrix.codes), next_date, end_date, security_type, field, adjust)]
+        if new_codes:
+            dfs.append(self.__query(new_codes, matrix.start_date.strftime('%Y-%m-%d'), end_date,
+                                    security_type, field, adjust))
+        df = pd.concat(dfs)
+        if df.empty:
+            return 0
+
+        dates = np.union1d(matrix.dates, df['date'].to_numpy())
+        if not np.array_equal(dates[:len(matrix.dates)], matrix.dates):
+            # 新代码有矩阵中没有的历史日期，不能只追加
+            return self.build(security_type, field, adjust)
+
+        codes = np.concatenate([matrix.codes, np.array(new_codes, dtype=str)])
+        values = np.full((len(dates), len(codes)), np.nan)
+        values[:len(matrix.dates), :len(matrix.codes)] = matrix.values
+        self.__scatter(values, dates, codes, df, field)
+
+        self.__write(security_type, field, adjust, dates, codes, values)
+        logger.info(f"Updated price matrix {security_type.value} {field} {adjust.value}: "
+                    f"{len(dates) - len(matrix.dates)} new dates, {len(new_codes)} new codes")
+        return len(df)
+
+    def __get_coverage(self, security_type: SecurityType, adjust: PriceAdjust) -> pd.DataFrame:
+        # 前复权由日线不复权数据和复权因子计算
+        stored_adjust = PriceAdjust.NO if adjust == PriceAdjust.QFQ else adjust
+        return self.data_service.get_kdata_coverage(None, security_type, Period.Day, stored_adjust)
+
+    def __query(self,
+                symbol_list: List[str],
+                start_date: str,
+                end_date: str,
+                security_type: SecurityType,
+                field: str,
+                adjust: PriceAdjust) -> pd.DataFrame:
+        if adjust == PriceAdjust.QFQ:
+            df = self.data_service.query_adjusted_kdata(symbol_list, start_date, end_date, security_type,
+                                                        adjust, [field])
+        else:
+            df = self.data_service.query_kdata(symbol_list, start_date, end_date, security_type,
+                                               Period.Day, adjust, [field])
+        return df.reset_index()
+
+    def __scatter(self, values: np.ndarray, dates: np.ndarray, codes: np.ndarray, df: pd.DataFrame, field: str):
+        """将长表数据按(date, code)写入矩阵"""
+        rows = np.searchsorted(dates, df['date'].to_numpy())
+        columns = pd.Index(codes).get_indexer(df['code'].astype(str))
+        values[rows, columns] = df[field].to_numpy(dtype=np.float64)
+
+    def __write(self,
+                security_type: SecurityType,
+                field: str,
+                adjust: PriceAdjust,
+                dates: np.ndarray,
+                codes: np.ndarray,
+                values: np.ndarray):
+        """写入临时目录后替换原矩阵"""
+        target = self.matrix_dir(security_type, field, adjust)
+        tmp_dir = f"{target}.tmp"
+        old_dir = f"{target}.old"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        np.save(os.path.join(tmp_dir, 'dates.npy'), dates.astype('datetime64[ns]'))
+        np.save(os.path.join(tmp_dir, 'codes.npy'), codes.astype(str))
+        np.save(os.path.join(tmp_dir, 'values.npy'), values)
+
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.exists(target):
+            os.rename(target, old_dir)
+        os.rename(tmp_dir, target)
+        shutil.rmtree(old_dir, ignore_errors=True)
@@ -1,36 +1,104 @@
 # encoding: utf-8
+import os
 from typing import List, Optional, Tuple
+import duckdb
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 from loguru import logger
 import time
-from peewee import SQL
+from peewee import SQL, CompositeKey
 
 from tgtrader.data_provider.dao.akshare.common import main_db
 from tgtrader.data_provider.dao.akshare.t_kdata import T_KData
 from tgtrader.data_provider.dao.akshare.t_etf_kdata import T_ETF_KData
+from tgtrader.data_provider.dao.akshare.t_kdata_1min import T_KData_1Min
+from tgtrader.data_provider.dao.akshare.t_etf_kdata_1min import T_ETF_KData_1Min
+from tgtrader.data_provider.dao.akshare.t_kdata_nfq import T_KData_Nfq, T_ETF_KData_Nfq
+from tgtrader.data_provider.dao.akshare.t_adj_factor import T_Adj_Factor
+from tgtrader.data_provider.dao.akshare.t_symbol_master import T_Symbol_Master
 from tgtrader.data_provider.dao.akshare.t_meta import T_Meta
-from tgtrader.common import DataSource, MetaType, SecurityType, Period, PriceAdjust
+from tgtrader.data_provider.dao.akshare.t_kdata_watermark import T_KData_Watermark
+from tgtrader.data_provider.dao.akshare.t_kdata_quarantine import T_KData_Quarantine
+from tgtrader.data_provider.dao.akshare.t_kdata_health import T_KData_Health
+from tgtrader.data_provider.dao.akshare.t_trade_calendar import T_Trade_Calendar
+from tgtrader.data_provider.dao.akshare.t_stock_valuation import T_Stock_Valuation
+from tgtrader.data_provider.dao.akshare.t_stock_financial import T_Stock_Financial
+from tgtrader.data_provider.dao.akshare.t_fund_nav import T_Fund_NAV
+from tgtrader.data_provider.dao.akshare.t_kdata_resampled import T_KData_Resampled
+from tgtrader.data_provider.dao.akshare.t_factor import T_Factor
+from tgtrader.data_provider.dao.akshare.t_kdata_compact import T_KData_Compact, T_ETF_KData_Compact, T_KData_1Min_Compact, T_ETF_KData_1Min_Compact
+from tgtrader.data_provider.dao.akshare.t_symbol_dim import T_Symbol_Dim
+from tgtrader.common import DataSource, Exchange, MetaType, SecurityType, Period, PriceAdjust
 from tgtrader.common import DataDbService
 from tgtrader.data_provider.dao.models.common import ModelRegister
+from tgtrader.data_provider.kdata_validator import KDataValidator, ValidationResult
 from tgtrader.data_provider.dao.models.t_meta_model import T_Meta_Model
 from tgtrader.utils.model_inspector import FieldInfo, get_model_info
 
 
 class AkshareDataService(DataDbService):
     """Akshare数据服务实现类"""
+
+    # 基本面数据表：元数据类型 -> (模型类, 证券类型, 数据日期列, 与行情对齐的日期列)
+    # 财务数据按公告日期对齐，回测时只使用当时已经公布的报告
+    FUNDAMENTAL_TABLES = {
+        MetaType.StocksValuation: (T_Stock_Valuation, SecurityType.Stocks, 'date', 'date'),
+        MetaType.StocksFinancial: (T_Stock_Financial, SecurityType.Stocks, 'report_date', 'announce_date'),
+        MetaType.FundNav: (T_Fund_NAV, SecurityType.Fund, 'date', 'date'),
+    }
+
+    # 由日线聚合的周期及time_bucket的间隔
+    RESAMPLE_PERIODS = {
+        Period.Week: '1 week',
+        Period.Month: '1 month',
+        Period.Year: '1 year',
+    }
+
+    # peewee字段类型到DuckDB类型，批量写入时按目标列类型转换
+    COLUMN_TYPES = {
+        'DATE': 'DATE',
+        'DATETIME': 'TIMESTAMP',
+        'DOUBLE': 'DOUBLE',
+        'FLOAT': 'DOUBLE',
+        'BIGINT': 'BIGINT',
+        'INT': 'INTEGER',
+    }
     
     @classmethod
     def init_database(cls):
         """初始化数据"""
         with main_db:
-            main_db.create_tables([T_Meta, T_KData, T_ETF_KData])
+            models = [T_Meta, T_KData, T_ETF_KData, T_KData_1Min, T_ETF_KData_1Min, T_KData_Watermark, T_Symbol_Dim,
+                      T_KData_Nfq, T_ETF_KData_Nfq, T_Adj_Factor, T_Symbol_Master, T_KData_Quarantine, T_KData_Health,
+                      T_Trade_Calendar, T_Stock_Valuation, T_Stock_Financial, T_Fund_NAV, T_KData_Resampled,
+                      T_Factor]
+            # 迁移为紧凑存储的K线表已替换为同名视图，不能再建表
+            main_db.create_tables([model for model in models if not model.table_exists()])
 
     @classmethod
     def get_table_names(cls) -> list[str]:
-        return ['t_kdata', 't_etf_kdata']
+        return ['t_kdata', 't_etf_kdata', 't_kdata_1min', 't_etf_kdata_1min', 't_kdata_nfq', 't_etf_kdata_nfq',
+                't_kdata_resampled', 't_stock_valuation', 't_stock_financial', 't_fund_nav']
+
+    def __get_kdata_model_cls(self, security_type: SecurityType, period: Period = Period.Day, adjust: Optional[PriceAdjust] = None):
+        """K线表的模型类，日线不复权数据单独保存，其余组合每个周期一张表"""
+        if period == Period.Day and adjust == PriceAdjust.NO:
+            if security_type == SecurityType.Stocks:
+                return T_KData_Nfq
+            elif security_type == SecurityType.ETF:
+                return T_ETF_KData_Nfq
+            else:
+                raise ValueError(f"Unsupported security type: {security_type}")
+
+        if period == Period.Minute:
+            if security_type == SecurityType.Stocks:
+                return T_KData_1Min
+            elif security_type == SecurityType.ETF:
+                return T_ETF_KData_1Min
+            else:
+                raise ValueError(f"Unsupported security type: {security_type}")
 
-    def __get_kdata_model_cls(self, security_type: SecurityType):
         if security_type == SecurityType.Stocks:
             return T_KData
         elif security_type == SecurityType.ETF:
@@ -43,82 +111,278 @@ class AkshareDataService(DataDbService):
             return T_KData
         elif meta_type == MetaType.ETF1dHfqKdata:
             return T_ETF_KData
+        elif meta_type == MetaType.Stocks1minNfqKdata:
+            return T_KData_1Min
+        elif meta_type == MetaType.ETF1minNfqKdata:
+            return T_ETF_KData_1Min
+        elif meta_type == MetaType.Stocks1dNfqKdata:
+            return T_KData_Nfq
+        elif meta_type == MetaType.ETF1dNfqKdata:
+            return T_ETF_KData_Nfq
+        elif meta_type in self.FUNDAMENTAL_TABLES:
+            return self.FUNDAMENTAL_TABLES[meta_type][0]
+        elif Period(meta_type.value.split('_')[1]) in self.RESAMPLE_PERIODS:
+            return T_KData_Resampled
         else:
             raise ValueError(f"Unsupported meta type: {meta_type}")
         
+    def __count_meta_rows(self, conn, meta_type: MetaType, db_model_cls) -> int:
+        """元数据对应的数据行数
+
+        周线、月线、年线共用聚合表，K线表可能包含其他复权方式的数据，紧凑存储的K线按证券类型关联代码维表，
+        只统计与元数据的证券类型、周期、复权方式相同的行
+        """
+        table_name = db_model_cls._meta.table_name
+        if meta_type in self.FUNDAMENTAL_TABLES:
+            return conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+
+        security_value, period_value, adjust_value, _ = meta_type.value.split('_')
+        security_type = SecurityType(security_value)
+        period = Period(period_value)
+        adjust = PriceAdjust(adjust_value)
+
+        if db_model_cls is T_KData_Resampled:
+            sql = f"SELECT COUNT(*) FROM {table_name} WHERE security_type = ? AND period = ? AND adjust_type = ?"
+            return conn.execute(sql, [security_type.value, period.value, adjust.value]).fetchone()[0]
+
+        if self.__is_compact(conn, security_type, period, adjust):
+            if adjust != self.__stored_adjust(security_type, period):
+                return 0
+            sql = f"SELECT COUNT(*) FROM {self.__compact_relation(security_type, period)} WHERE d.security_type = ?"
+            return conn.execute(sql, [security_type.value]).fetchone()[0]
+
+        sql = f"SELECT COUNT(*) FROM {table_name} WHERE adjust_type = ?"
+        return conn.execute(sql, [adjust.value]).fetchone()[0]
+
     def __get_data_model_by_table_name(self, table_name: str):
         if table_name.lower() == 't_kdata':
             return T_KData
         elif table_name.lower() == 't_etf_kdata':
             return T_ETF_KData
-        else:
-            raise ValueError(f"Unsupported table name: {table_name}")
+        elif table_name.lower() == 't_kdata_1min':
+            return T_KData_1Min
+        elif table_name.lower() == 't_etf_kdata_1min':
+            return T_ETF_KData_1Min
+        elif table_name.lower() == 't_kdata_nfq':
+            return T_KData_Nfq
+        elif table_name.lower() == 't_etf_kdata_nfq':
+            return T_ETF_KData_Nfq
+        elif table_name.lower() == 't_kdata_resampled':
+            return T_KData_Resampled
+
+        for model_cls, _, _, _ in self.FUNDAMENTAL_TABLES.values():
+            if table_name.lower() == model_cls._meta.table_name:
+                return model_cls
+        raise ValueError(f"Unsupported table name: {table_name}")
+
+    def __get_compact_model_cls(self, security_type: SecurityType, period: Period = Period.Day, adjust: Optional[PriceAdjust] = None):
+        """紧凑存储的模型类，日线不复权表不支持紧凑存储，返回None"""
+        return {
+            T_KData: T_KData_Compact,
+            T_ETF_KData: T_ETF_KData_Compact,
+            T_KData_1Min: T_KData_1Min_Compact,
+            T_ETF_KData_1Min: T_ETF_KData_1Min_Compact,
+        }.get(self.__get_kdata_model_cls(security_type, period, adjust))
+
+    def __is_compact(self, conn, security_type: SecurityType, period: Period, adjust: Optional[PriceAdjust] = None) -> bool:
+        compact_cls = self.__get_compact_model_cls(security_type, period, adjust)
+        if compact_cls is None:
+            return False
+        table_name = compact_cls._meta.table_name
+        sql = "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = ?"
+        return conn.execute(sql, [table_name]).fetchone()[0] > 0
+
+    def is_compact_storage(self, security_type: SecurityType, period: Period = Period.Day) -> bool:
+        """K线表是否已迁移为紧凑存储"""
+        with main_db:
+            return self.__is_compact(main_db.connection(), security_type, period)
+
+    def migrate_kdata_to_compact(self, meta_type: MetaType, source: str = 'akshare') -> int:
+        """将K线表迁移为紧凑存储
+
+        证券代码写入t_symbol_dim并以整数id代替，日期转换为DATE/TIMESTAMP，数据按日期排序写入，
+        DuckDB的zone map可以跳过日期范围之外的行组。原表删除后以同名视图代替，
+        按原表结构读取的代码(SQL查询、元数据统计)不受影响；写入和query_kdata直接使用紧凑表。
+        DuckDB不会自动缩小数据库文件，迁移后调用rewrite_database_file回收原表占用的空间。
+
+        Args:
+            meta_type: 元数据类型，对应要迁移的K线表
+            source: 数据来源，迁移后对整张表相同
+
+        Returns:
+            int: 迁移的行数，已迁移过时为0
+        """
+        security_value, period_value, adjust_value, _ = meta_type.value.split('_')
+        security_type = SecurityType(security_value)
+        period = Period(period_value)
+        adjust = PriceAdjust(adjust_value)
+
+        legacy_table = self.__get_kdata_model_cls(security_type, period, adjust)._meta.table_name
+        compact_cls = self.__get_compact_model_cls(security_type, period, adjust)
+        if compact_cls is None:
+            raise ValueError(f"{legacy_table} does not support compact storage")
+        compact_table = compact_cls._meta.table_name
+
+        with main_db:
+            conn = main_db.connection()
+            if self.__is_compact(conn, security_type, period, adjust):
+                logger.info(f"{legacy_table} is already in compact storage")
+                return 0
+
+            main_db.create_tables([T_Symbol_Dim, compact_cls])
+            conn.execute("BEGIN TRANSACTION")
+            try:
+                other_count = conn.execute(f"SELECT COUNT(*) FROM {legacy_table} WHERE adjust_type != ? OR source != ?",
+                                           [adjust.value, source]).fetchone()[0]
+                if other_count > 0:
+                    logger.warning(f"Dropping {other_count} rows of {legacy_table} with other adjust type or source")
+
+                # 按日期排序写入，同一日期的数据集中在相邻的行组中
+                relation = f"(SELECT * FROM {legacy_table} WHERE adjust_type = '{adjust.value}' AND source = '{source}' ORDER BY date, code)"
+                self.__upsert_compact(conn, relation, security_type, period)
+                total_count = conn.execute(f"SELECT COUNT(*) FROM {compact_table}").fetchone()[0]
+
+                conn.execute(f"DROP TABLE {legacy_table}")
+                conn.execute(self.__compact_view_sql(legacy_table, compact_table, security_type, period, adjust, source))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            conn.execute("CHECKPOINT")
+
+        logger.info(f"Migrated {total_count} rows of {legacy_table} to {compact_table}")
+        return total_count
+
+    def rewrite_database_file(self) -> Tuple[int, int]:
+        """重写数据库文件，回收删除的表和数据占用的空间
+
+        将整个数据库复制到新文件后替换原文件，执行期间不能有其他进程打开数据库。
+
+        Returns:
+            (重写前的文件大小, 重写后的文件大小)，单位为字节
+        """
+        db_file = main_db.database
+        tmp_file = f"{db_file}.rewrite"
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+        size_before = os.path.getsize(db_file)
+        with main_db:
+            conn = main_db.connection()
+            db_name = conn.execute("SELECT current_database()").fetchone()[0]
+            conn.execute(f"ATTACH '{tmp_file}' AS rewrite_db")
+            try:
+                conn.execute(f"COPY FROM DATABASE {db_name} TO rewrite_db")
+            finally:
+                conn.execute("DETACH rewrite_db")
+
+        os.replace(tmp_file, db_file)
+        size_after = os.path.getsize(db_file)
+        logger.info(f"Rewrote database file {db_file}: {size_before / 1e6:.1f}MB -> {size_after / 1e6:.1f}MB")
+        return size_before, size_after
+
+    def __compact_view_sql(self,
+                           view_name: str,
+                           compact_table: str,
+                           security_type: SecurityType,
+                           period: Period,
+                           adjust: PriceAdjust,
+                           source: str) -> str:
+        """按原K线表结构读取紧凑表的视图"""
+        date_format = '%Y-%m-%d %H:%M:%S' if period == Period.Minute else '%Y-%m-%d'
+        current_time = int(time.time() * 1000)
+        return f"""
+            CREATE VIEW {view_name} AS
+            SELECT d.code, strftime(k.date, '{date_format}') AS date,
+                   k.open, k.close, k.high, k.low, k.volume,
+                   '{adjust.value}' AS adjust_type, '{source}' AS source,
+                   CAST({current_time} AS BIGINT) AS create_time, CAST({current_time} AS BIGINT) AS update_time
+            FROM {compact_table} k
+            JOIN {T_Symbol_Dim._meta.table_name} d ON k.code_id = d.id
+        """
+
+    def __upsert_compact(self, conn, relation: str, security_type: SecurityType, period: Period):
+        """将原始K线数据(code, date, open...)写入紧凑表，新出现的证券代码先分配id
+
+        Args:
+            conn: DuckDB连接
+            relation: 数据来源的表名或子查询
+        """
+        dim_table = T_Symbol_Dim._meta.table_name
+        compact_table = self.__get_compact_model_cls(security_type, period)._meta.table_name
+        date_type = 'TIMESTAMP' if period == Period.Minute else 'DATE'
+
+        conn.execute(f"""
+            INSERT INTO {dim_table} (id, security_type, code)
+            SELECT (SELECT COALESCE(MAX(id), 0) FROM {dim_table}) + ROW_NUMBER() OVER (ORDER BY code), ?, code
+            FROM (SELECT DISTINCT CAST(code AS VARCHAR) AS code FROM {relation} r) s
+            WHERE code NOT IN (SELECT code FROM {dim_table} WHERE security_type = ?)
+        """, [security_type.value, security_type.value])
+
+        prices = ', '.join(f"CAST(r.{f} AS FLOAT)" for f in self.KDATA_PRICE_FIELDS)
+        updates = ', '.join(f"{f} = EXCLUDED.{f}" for f in self.KDATA_PRICE_FIELDS)
+        conn.execute(f"""
+            INSERT INTO {compact_table} (code_id, date, {', '.join(self.KDATA_PRICE_FIELDS)})
+            SELECT d.id, CAST(r.date AS {date_type}), {prices}
+            FROM {relation} r
+            JOIN {dim_table} d ON d.security_type = ? AND d.code = CAST(r.code AS VARCHAR)
+            ON CONFLICT (code_id, date) DO UPDATE SET {updates}
+        """, [security_type.value])
+
+    # 写入K线表的列，open等价格字段统一转换为DOUBLE
+    KDATA_PRICE_FIELDS = ['open', 'high', 'low', 'close', 'volume']
 
     def batch_save_kdata(self,
                         data: Optional[pd.DataFrame] = None,
                         security_type: SecurityType = SecurityType.Stocks,
                         adjust: Optional[PriceAdjust] = None,
                         source: str = 'akshare',
-                        batch_size: int = 100000) -> int:
-        """批量保存K线数据"""
+                        batch_size: int = 1000000,
+                        period: Period = Period.Day) -> int:
+        """批量保存K线数据
+
+        DataFrame直接注册到DuckDB连接，日期格式化和类型转换在SQL中完成，
+        每批数据用一条 INSERT ... SELECT ... ON CONFLICT DO UPDATE 写入。
+
+        Args:
+            data: DataFrame with MultiIndex(code, date)，包含open, high, low, close, volume列
+            security_type: 证券类型
+            adjust: 复权方式
+            source: 数据来源
+            batch_size: 每条INSERT语句写入的最大行数
+            period: 周期
+
+        Returns:
+            int: 写入的行数
+        """
         try:
-            # 如果传入DataFrame，转换为data_list
-            if data is not None:
-                if data.empty:
-                    logger.warning("Empty DataFrame provided")
-                    return 0
-                    
-                # 重置索引,将MultiIndex转换为普通列
-                df = data.reset_index()
-                
-                # 准备数据列表
-                current_time = int(time.time() * 1000)
-                data_list = []
-                
-                for _, row in df.iterrows():
-                    kdata = {
-                        'code': row['code'],
-                        'date': row['date'].strftime('%Y-%m-%d'),
-                        'open': float(row['open']),
-                        'high': float(row['high']),
-                        'low': float(row['low']),
-                        'close': float(row['close']),
-                        'volume': float(row['volume']),
-                        'adjust_type': adjust.value,
-                        'source': source,
-                        'create_time': current_time,
-                        'update_time': current_time
-                    }
-                    data_list.append(kdata)
-            
-            if not data_list:
-                logger.warning("No data to save")
+            if data is None or data.empty:
+                logger.warning("Empty DataFrame provided")
                 return 0
 
-            total_count = 0
+            df = self.__prepare_kdata_frame(data)
 
-            db_model_cls = self.__get_kdata_model_cls(security_type)
-            
+            db_model_cls = self.__get_kdata_model_cls(security_type, period, adjust)
+            sql = self.__upsert_kdata_sql(db_model_cls._meta.table_name, 'kdata_df', period)
+            current_time = int(time.time() * 1000)
+            params = [adjust.value, source, current_time, current_time]
+
+            total_count = 0
             with main_db:
-                # 使用tqdm显示进度
-                for i in tqdm(range(0, len(data_list), batch_size), 
-                            desc="Saving kdata"):
-                    batch = data_list[i:i + batch_size]
-                    rows = db_model_cls.insert_many(batch).on_conflict(
-                        conflict_target=[db_model_cls.code, db_model_cls.date, db_model_cls.source],
-                        action='UPDATE',
-                        update={
-                            db_model_cls.open: SQL('EXCLUDED.open'),
-                            db_model_cls.high: SQL('EXCLUDED.high'),
-                            db_model_cls.low: SQL('EXCLUDED.low'),
-                            db_model_cls.close: SQL('EXCLUDED.close'),
-                            db_model_cls.volume: SQL('EXCLUDED.volume'),
-                            db_model_cls.adjust_type: SQL('EXCLUDED.adjust_type'),
-                            db_model_cls.update_time: SQL('EXCLUDED.update_time')
-                        }
-                    ).execute()
-                    total_count += len(batch)
-                    
+                conn = main_db.connection()
+                compact = self.__is_compact(conn, security_type, period, adjust)
+                for i in tqdm(range(0, len(df), batch_size), desc="Saving kdata"):
+                    conn.register('kdata_df', df.iloc[i:i + batch_size])
+                    try:
+                        if compact:
+                            self.__upsert_compact(conn, 'kdata_df', security_type, period)
+                        else:
+                            conn.execute(sql, params)
+                    finally:
+                        conn.unregister('kdata_df')
+                    total_count += min(batch_size, len(df) - i)
+
             logger.info(f"Successfully saved {total_count} kdata records")
             return total_count
             
@@ -126,6 +390,1314 @@ class AkshareDataService(DataDbService):
             logger.error(f"Error in batch saving kdata: {str(e)}")
             raise
 
+    def stage_kdata_parquet(self,
+                            data: pd.DataFrame,
+                            path: str,
+                            adjust: Optional[PriceAdjust] = None,
+                            source: str = 'akshare',
+                            period: Period = Period.Day) -> int:
+        """将K线数据按K线表的列写入Parquet暂存文件，用于首次全量导入
+
+        全量导入时先把各批数据写成暂存文件，最后用copy_kdata_from_parquet一次性导入，
+        避免逐批写入数据库。
+
+        Args:
+            data: DataFrame with MultiIndex(code, date)，包含open, high, low, close, volume列
+            path: 暂存文件路径
+            adjust: 复权方式
+            source: 数据来源
+            period: 周期
+
+        Returns:
+            int: 写入的行数
+        """
+        if data is None or data.empty:
+            return 0
+
+        df = self.__prepare_kdata_frame(data)
+        current_time = int(time.time() * 1000)
+
+        con = duckdb.connect()
+        try:
+            con.register('kdata_df', df)
+            con.execute(f"COPY ({self.__kdata_select_sql('kdata_df', period)}) TO '{path}' (FORMAT PARQUET)",
+                        [adjust.value, source, current_time, current_time])
+        finally:
+            con.close()
+
+        return len(df)
+
+    def stage_kdata_relation(self,
+                             conn,
+                             relation: str,
+                             path: str,
+                             adjust: Optional[PriceAdjust] = None,
+                             source: str = 'akshare',
+                             period: Period = Period.Day) -> int:
+        """将DuckDB连接中的K线数据写入Parquet暂存文件，格式与stage_kdata_parquet相同
+
+        数据在DuckDB中流式转换，不经过pandas，适合直接读取大文件导入。
+
+        Args:
+            conn: DuckDB连接
+            relation: 包含code, date, open, high, low, close, volume列的表名或子查询
+            path: 暂存文件路径
+
+        Returns:
+            int: 写入的行数
+        """
+        current_time = int(time.time() * 1000)
+        return conn.execute(f"COPY ({self.__kdata_select_sql(relation, period)}) TO '{path}' (FORMAT PARQUET)",
+                            [adjust.value, source, current_time, current_time]).fetchone()[0]
+
+    def copy_kdata_from_parquet(self,
+                                paths: list[str],
+                                security_type: SecurityType = SecurityType.Stocks,
+                                period: Period = Period.Day,
+                                adjust: Optional[PriceAdjust] = None) -> int:
+        """从stage_kdata_parquet写入的暂存文件导入K线数据
+
+        K线表为空时直接用 COPY ... FROM 追加写入；已有数据或暂存文件之间有重复的行时，
+        按主键合并更新，重复的行以后面的文件为准。紧凑存储的表转换后合并写入。
+
+        Args:
+            paths: 暂存文件路径
+            security_type: 证券类型
+            period: 周期
+            adjust: 复权方式，日线不复权数据导入单独的表
+
+        Returns:
+            int: 导入的行数
+        """
+        if not paths:
+            return 0
+
+        table_name = self.__get_kdata_model_cls(security_type, period, adjust)._meta.table_name
+        columns = ', '.join(self.__kdata_columns())
+        files = "[" + ", ".join("'" + p.replace("'", "''") + "'" for p in paths) + "]"
+
+        staged = f"""(
+            SELECT {columns} FROM read_parquet({files}, filename = true)
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY code, date, source ORDER BY list_position({files}, filename) DESC) = 1
+        )"""
+
+        with main_db:
+            conn = main_db.connection()
+            compact = self.__is_compact(conn, security_type, period, adjust)
+            if compact:
+                self.__upsert_compact(conn, staged, security_type, period)
+
+            copied = compact
+            if not compact and conn.execute(f"SELECT COUNT(*) FROM (SELECT 1 FROM {table_name} LIMIT 1)").fetchone()[0] == 0:
+                # 空表直接追加，不需要合并
+                try:
+                    for path in paths:
+                        conn.execute(f"COPY {table_name} ({columns}) FROM '{path}' (FORMAT PARQUET)")
+                    copied = True
+                except duckdb.ConstraintException:
+                    logger.warning("Duplicated rows in staging files, merging instead of COPY")
+                    conn.execute(f"DELETE FROM {table_name}")
+
+            if not copied:
+                updates = ', '.join(f"{f} = EXCLUDED.{f}" for f in self.KDATA_PRICE_FIELDS + ['adjust_type', 'update_time'])
+                conn.execute(f"""
+                    INSERT INTO {table_name} ({columns})
+                    SELECT * FROM {staged}
+                    ON CONFLICT (code, date, source) DO UPDATE SET {updates}
+                """)
+
+            total_count = conn.execute(f"SELECT COUNT(*) FROM read_parquet({files})").fetchone()[0]
+
+        logger.info(f"Successfully copied {total_count} kdata records from {len(paths)} staging files")
+        return total_count
+
+    def __prepare_kdata_frame(self, data: pd.DataFrame) -> pd.DataFrame:
+        """整理待写入的K线数据：展开索引，同一(code, date)只保留最后一条"""
+        df = data.reset_index()[['code', 'date'] + self.KDATA_PRICE_FIELDS]
+        if not pd.api.types.is_datetime64_any_dtype(df['date']):
+            df['date'] = pd.to_datetime(df['date'])
+        # 同一条INSERT语句中不能重复更新同一行
+        return df.drop_duplicates(['code', 'date'], keep='last')
+
+    def __kdata_columns(self) -> list[str]:
+        return ['code', 'date'] + self.KDATA_PRICE_FIELDS + ['adjust_type', 'source', 'create_time', 'update_time']
+
+    def __kdata_select_sql(self, relation: str, period: Period) -> str:
+        """从原始K线数据(code, date, open...)转换为K线表各列的SELECT语句，参数为adjust_type, source, create_time, update_time"""
+        date_format = '%Y-%m-%d %H:%M:%S' if period == Period.Minute else '%Y-%m-%d'
+        prices = ', '.join(f"CAST({f} AS DOUBLE) AS {f}" for f in self.KDATA_PRICE_FIELDS)
+        return f"""
+            SELECT CAST(code AS VARCHAR) AS code,
+                   strftime(CAST(date AS TIMESTAMP), '{date_format}') AS date,
+                   {prices},
+                   ? AS adjust_type, ? AS source, ? AS create_time, ? AS update_time
+            FROM {relation}
+        """
+
+    def __upsert_kdata_sql(self, table_name: str, relation: str, period: Period) -> str:
+        updates = ', '.join(f"{f} = EXCLUDED.{f}" for f in self.KDATA_PRICE_FIELDS + ['adjust_type', 'update_time'])
+        return f"""
+            INSERT INTO {table_name} ({', '.join(self.__kdata_columns())})
+            {self.__kdata_select_sql(relation, period)}
+            ON CONFLICT (code, date, source) DO UPDATE SET {updates}
+        """
+
+    def get_kdata_coverage(self,
+                           symbol_list: Optional[list[str]],
+                           security_type: SecurityType,
+                           period: Period = Period.Day,
+                           adjust: PriceAdjust = PriceAdjust.HFQ) -> pd.DataFrame:
+        """查询各标的在本地K线表中的数据范围
+
+        Args:
+            symbol_list: 证券代码列表，None表示表中所有标的
+            security_type: 证券类型
+            period: 周期
+            adjust: 复权方式
+
+        Returns:
+            DataFrame with columns: [code, start_time, end_time]，本地无数据的标的不在结果中
+        """
+        db_model_cls = self.__get_kdata_model_cls(security_type, period, adjust)
+        table_name = db_model_cls._meta.table_name
+
+        with main_db:
+            conn = main_db.connection()
+            if self.__is_compact(conn, security_type, period, adjust):
+                return self.__get_compact_coverage(conn, symbol_list, security_type, period, adjust)
+
+            where = "adjust_type = ?"
+            params = [adjust.value]
+            if symbol_list is not None:
+                where += " AND code IN (SELECT UNNEST(?))"
+                params.append(symbol_list)
+
+            sql = f"""
+                SELECT code, MIN(date) AS start_time, MAX(date) AS end_time
+                FROM {table_name}
+                WHERE {where}
+                GROUP BY code
+            """
+            return conn.execute(sql, params).df()
+
+    def __stored_adjust(self, security_type: SecurityType, period: Period) -> PriceAdjust:
+        """紧凑存储的K线表保存的复权方式，紧凑存储不在每行记录复权方式"""
+        return PriceAdjust.NO if period == Period.Minute else PriceAdjust.HFQ
+
+    def __compact_relation(self, security_type: SecurityType, period: Period) -> str:
+        compact_table = self.__get_compact_model_cls(security_type, period)._meta.table_name
+        return f"{compact_table} k JOIN {T_Symbol_Dim._meta.table_name} d ON k.code_id = d.id"
+
+    def __get_compact_coverage(self, conn, symbol_list, security_type, period, adjust) -> pd.DataFrame:
+        if adjust != self.__stored_adjust(security_type, period):
+            return pd.DataFrame(columns=['code', 'start_time', 'end_time'])
+
+        date_format = '%Y-%m-%d %H:%M:%S' if period == Period.Minute else '%Y-%m-%d'
+        where = "d.security_type = ?"
+        params = [security_type.value]
+        if symbol_list is not None:
+            where += " AND d.code IN (SELECT UNNEST(?))"
+            params.append(symbol_list)
+
+        sql = f"""
+            SELECT d.code, strftime(MIN(k.date), '{date_format}') AS start_time,
+                   strftime(MAX(k.date), '{date_format}') AS end_time
+            FROM {self.__compact_relation(security_type, period)}
+            WHERE {where}
+            GROUP BY d.code
+        """
+        return conn.execute(sql, params).df()
+
+    def __kdata_source_sql(self, conn, security_type: SecurityType, period: Period, adjust: PriceAdjust) -> str:
+        """K线数据(code, date, open, high, low, close, volume)的子查询，date为DATE/TIMESTAMP类型"""
+        date_type = 'TIMESTAMP' if period == Period.Minute else 'DATE'
+        prices = ', '.join(self.KDATA_PRICE_FIELDS)
+        if self.__is_compact(conn, security_type, period, adjust):
+            stored_adjust = self.__stored_adjust(security_type, period)
+            if adjust != stored_adjust:
+                raise ValueError(f"Compact kline table of {security_type.value} {period.value} stores {stored_adjust.value} prices only")
+            columns = ', '.join(f"k.{f}" for f in self.KDATA_PRICE_FIELDS)
+            return f"(SELECT d.code, k.date, {columns} FROM {self.__compact_relation(security_type, period)})"
+
+        table_name = self.__get_kdata_model_cls(security_type, period, adjust)._meta.table_name
+        return f"""(SELECT code, CAST(date AS {date_type}) AS date, {prices}
+                   FROM {table_name} WHERE adjust_type = '{adjust.value}')"""
+
+    def get_kdata_years(self,
+                        security_type: SecurityType,
+                        period: Period = Period.Day,
+                        adjust: PriceAdjust = PriceAdjust.HFQ) -> list[int]:
+        """本地K线表中有数据的年份"""
+        with main_db:
+            conn = main_db.connection()
+            source = self.__kdata_source_sql(conn, security_type, period, adjust)
+            rows = conn.execute(f"SELECT DISTINCT year(date) AS y FROM {source} ORDER BY y").fetchall()
+        return [row[0] for row in rows]
+
+    def get_kdata_dates(self,
+                        security_type: SecurityType,
+                        period: Period = Period.Day,
+                        adjust: PriceAdjust = PriceAdjust.HFQ) -> pd.DatetimeIndex:
+        """本地K线表中有数据的日期，升序"""
+        with main_db:
+            conn = main_db.connection()
+            source = self.__kdata_source_sql(conn, security_type, period, adjust)
+            df = conn.execute(f"SELECT DISTINCT CAST(date AS TIMESTAMP) AS date FROM {source} ORDER BY date").df()
+        return pd.DatetimeIndex(pd.to_datetime(df['date']).astype('datetime64[ns]'), name='date')
+
+    def export_kdata_parquet(self,
+                             target_dir: str,
+                             security_type: SecurityType,
+                             period: Period = Period.Day,
+                             adjust: PriceAdjust = PriceAdjust.HFQ,
+                             year: Optional[int] = None) -> int:
+        """将K线数据导出为按security_type/year分区的Parquet文件
+
+        Args:
+            target_dir: 导出目录，文件写入 target_dir/security_type=.../year=.../
+            security_type: 证券类型
+            period: 周期
+            adjust: 复权方式
+            year: 只导出该年的数据，None表示全部
+
+        Returns:
+            int: 导出的行数
+        """
+        with main_db:
+            conn = main_db.connection()
+            source = self.__kdata_source_sql(conn, security_type, period, adjust)
+            where = ""
+            if year is not None:
+                date_type = 'TIMESTAMP' if period == Period.Minute else 'DATE'
+                where = f"WHERE date >= CAST('{year}-01-01' AS {date_type}) AND date < CAST('{year + 1}-01-01' AS {date_type})"
+
+            select_sql = f"""
+                SELECT code, date, {', '.join(self.KDATA_PRICE_FIELDS)},
+                       '{security_type.value}' AS security_type, year(date) AS year
+                FROM {source} s
+                {where}
+                ORDER BY date, code
+            """
+            total_count = conn.execute(f"SELECT COUNT(*) FROM ({select_sql})").fetchone()[0]
+            if total_count > 0:
+                conn.execute(f"""
+                    COPY ({select_sql}) TO '{target_dir}'
+                    (FORMAT PARQUET, PARTITION_BY (security_type, year), OVERWRITE_OR_IGNORE)
+                """)
+
+        return total_count
+
+    def get_watermarks(self, meta_type: MetaType, symbol_list: Optional[list[str]] = None) -> pd.DataFrame:
+        """查询各标的的同步水位
+
+        水位记录已经从远程同步过的区间，区间内没有数据(未上市、停牌)的日期也不需要再次请求
+
+        Args:
+            meta_type: 元数据类型，对应K线表
+            symbol_list: 证券代码列表，None表示所有标的
+
+        Returns:
+            DataFrame with columns: [code, start_time, end_time]
+        """
+        where = "meta_name = ?"
+        params = [meta_type.value]
+        if symbol_list is not None:
+            where += " AND code IN (SELECT UNNEST(?))"
+            params.append(symbol_list)
+
+        sql = f"""
+            SELECT code, start_time, end_time
+            FROM {T_KData_Watermark._meta.table_name}
+            WHERE {where}
+        """
+        with main_db:
+            return main_db.connection().execute(sql, params).df()
+
+    def update_watermarks(self, meta_type: MetaType, watermarks: pd.DataFrame) -> int:
+        """合并同步水位，已有记录的区间取并集
+
+        Args:
+            meta_type: 元数据类型
+            watermarks: DataFrame with columns: [code, start_time, end_time]，日期格式为YYYY-MM-DD
+
+        Returns:
+            int: 更新的标的数量
+        """
+        if watermarks is None or watermarks.empty:
+            return 0
+
+        current_time = int(time.time() * 1000)
+        df = watermarks[['code', 'start_time', 'end_time']].copy()
+        df['meta_name'] = meta_type.value
+        df['create_time'] = current_time
+        df['update_time'] = current_time
+
+        table_name = T_KData_Watermark._meta.table_name
+        sql = f"""
+            INSERT INTO {table_name} (meta_name, code, start_time, end_time, create_time, update_time)
+            SELECT meta_name, code, start_time, end_time, create_time, update_time FROM watermark_df
+            ON CONFLICT (meta_name, code) DO UPDATE SET
+                start_time = LEAST({table_name}.start_time, EXCLUDED.start_time),
+                end_time = GREATEST({table_name}.end_time, EXCLUDED.end_time),
+                update_time = EXCLUDED.update_time
+        """
+        with main_db:
+            conn = main_db.connection()
+            conn.register('watermark_df', df)
+            try:
+                conn.execute(sql)
+            finally:
+                conn.unregister('watermark_df')
+
+        return len(df)
+
+    def detect_adjust_changes(self,
+                              data: pd.DataFrame,
+                              before_date: str,
+                              security_type: SecurityType,
+                              period: Period = Period.Day,
+                              adjust: PriceAdjust = PriceAdjust.HFQ,
+                              tolerance: float = 1e-3,
+                              min_price_diff: float = 0.011) -> pd.DataFrame:
+        """比较新获取的数据与本地已有数据的重叠部分，找出复权基准发生变化的标的
+
+        复权价格在除权除息后可能整体变化，同一天新获取的收盘价与本地保存的收盘价之比即为历史数据需要调整的比例。
+
+        Args:
+            data: 新获取的数据，MultiIndex(code, date)，包含close列
+            before_date: 只比较该日期之前的重叠数据，即本次需要新增的区间之前本地已有的部分
+            security_type: 证券类型
+            period: 周期
+            adjust: 复权方式
+            tolerance: 比例偏离1超过该值视为变化
+            min_price_diff: 收盘价的差异不超过该值时视为价格精度误差
+
+        Returns:
+            DataFrame with columns: [code, ratio, overlap_rows]，只包含发生变化的标的
+        """
+        if data is None or data.empty:
+            return pd.DataFrame(columns=['code', 'ratio', 'overlap_rows'])
+
+        df = data.reset_index()[['code', 'date', 'close']]
+        date_type = 'TIMESTAMP' if period == Period.Minute else 'DATE'
+        with main_db:
+            conn = main_db.connection()
+            source = self.__kdata_source_sql(conn, security_type, period, adjust)
+            conn.register('fetched_df', df)
+            try:
+                return conn.execute(f"""
+                    WITH f AS (
+                        SELECT CAST(code AS VARCHAR) AS code, CAST(date AS {date_type}) AS date, CAST(close AS DOUBLE) AS close
+                        FROM fetched_df
+                        WHERE CAST(date AS {date_type}) < CAST(? AS {date_type}) AND close > 0
+                    )
+                    SELECT f.code, median(f.close / s.close) AS ratio, COUNT(*) AS overlap_rows
+                    FROM f
+                    JOIN {source} s ON s.code = f.code AND s.date = f.date
+                    WHERE s.close > 0
+                    GROUP BY f.code
+                    HAVING abs(median(f.close / s.close) - 1) > ? AND max(abs(f.close - s.close)) > ?
+                """, [before_date, tolerance, min_price_diff]).df()
+            finally:
+                conn.unregister('fetched_df')
+
+    def rebase_kdata(self,
+                     ratios: pd.DataFrame,
+                     before_date: str,
+                     security_type: SecurityType,
+                     period: Period = Period.Day,
+                     adjust: PriceAdjust = PriceAdjust.HFQ) -> int:
+        """按比例调整标的的历史价格，所有标的用一条UPDATE语句完成，成交量不变
+
+        Args:
+            ratios: DataFrame with columns: [code, ratio]，新价格 = 原价格 * ratio
+            before_date: 只调整该日期之前的数据
+            security_type: 证券类型
+            period: 周期
+            adjust: 复权方式
+
+        Returns:
+            int: 调整的行数
+        """
+        if ratios is None or ratios.empty:
+            return 0
+
+        df = ratios[['code', 'ratio']].copy()
+        df['code'] = df['code'].astype(str)
+        prices = [f for f in self.KDATA_PRICE_FIELDS if f != 'volume']
+        current_time = int(time.time() * 1000)
+
+        with main_db:
+            conn = main_db.connection()
+            conn.register('ratio_df', df)
+            try:
+                if self.__is_compact(conn, security_type, period, adjust):
+                    compact_table = self.__get_compact_model_cls(security_type, period)._meta.table_name
+                    date_type = 'TIMESTAMP' if period == Period.Minute else 'DATE'
+                    updates = ', '.join(f"{f} = k.{f} * r.ratio" for f in prices)
+                    sql = f"""
+                        UPDATE {compact_table} AS k SET {updates}
+                        FROM ratio_df r JOIN {T_Symbol_Dim._meta.table_name} d
+                            ON d.security_type = ? AND d.code = r.code
+                        WHERE k.code_id = d.id AND k.date < CAST(? AS {date_type})
+                    """
+                    params = [security_type.value, before_date]
+                else:
+                    table_name = self.__get_kdata_model_cls(security_type, period, adjust)._meta.table_name
+                    updates = ', '.join(f"{f} = k.{f} * r.ratio" for f in prices)
+                    sql = f"""
+                        UPDATE {table_name} AS k SET {updates}, update_time = ?
+                        FROM ratio_df r
+                        WHERE k.code = r.code AND k.adjust_type = ? AND k.date < ?
+                    """
+                    params = [current_time, adjust.value, before_date]
+                count = conn.execute(sql, params).fetchone()[0]
+            finally:
+                conn.unregister('ratio_df')
+
+        logger.info(f"Rebased {count} rows of {len(df)} {security_type.value} symbols before {before_date}")
+        return count
+
+    def validate_kdata(self,
+                       data: pd.DataFrame,
+                       security_type: SecurityType,
+                       period: Period,
+                       adjust: PriceAdjust,
+                       validator: Optional[KDataValidator] = None) -> pd.DataFrame:
+        """校验写入本地库前的一批K线数据，隔离未通过校验的行并更新各标的数据质量
+
+        Args:
+            data: DataFrame with MultiIndex(code, date)，包含open, high, low, close, volume列
+            security_type: 证券类型
+            period: 周期
+            adjust: 复权方式
+            validator: 校验器，默认使用默认阈值
+
+        Returns:
+            DataFrame: 通过校验的数据，MultiIndex(code, date)
+        """
+        if data is None or data.empty:
+            return data
+
+        result = (validator or KDataValidator()).validate(data, period, adjust)
+        meta_type = MetaType(f"{security_type.value}_{period.value}_{adjust.value}_kdata")
+        self.save_validation_result(meta_type, period, adjust, result)
+        if not result.quarantined.empty:
+            logger.warning(f"Quarantined {len(result.quarantined)} rows of {meta_type.value}, "
+                           f"symbols: {result.quarantined['code'].nunique()}")
+        return result.clean
+
+    def save_validation_result(self,
+                               meta_type: MetaType,
+                               period: Period,
+                               adjust: PriceAdjust,
+                               result: ValidationResult):
+        """保存隔离的K线数据，并累加各标的的数据质量统计"""
+        current_time = int(time.time() * 1000)
+        date_format = '%Y-%m-%d %H:%M:%S' if period == Period.Minute else '%Y-%m-%d'
+
+        quarantined = result.quarantined.copy()
+        quarantined['date'] = pd.to_datetime(quarantined['date']).dt.strftime(date_format)
+        quarantined = quarantined.drop_duplicates(['code', 'date', 'reason'], keep='last')
+        health = result.health
+
+        quarantine_table = T_KData_Quarantine._meta.table_name
+        health_table = T_KData_Health._meta.table_name
+        T_KData_Quarantine.init_table()
+        T_KData_Health.init_table()
+        with main_db:
+            conn = main_db.connection()
+            conn.register('quarantine_df', quarantined)
+            conn.register('health_df', health)
+            conn.execute("BEGIN TRANSACTION")
+            try:
+                if not quarantined.empty:
+                    conn.execute(f"""
+                        INSERT INTO {quarantine_table}
+                            (meta_name, code, date, reason, open, high, low, close, volume, adjust_type, create_time)
+                        SELECT ?, CAST(code AS VARCHAR), date, reason,
+                               CAST(open AS DOUBLE), CAST(high AS DOUBLE), CAST(low AS DOUBLE),
+                               CAST(close AS DOUBLE), CAST(volume AS DOUBLE), ?, ?
+                        FROM quarantine_df
+                        ON CONFLICT (meta_name, code, date, reason) DO UPDATE SET
+                            open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+                            close = EXCLUDED.close, volume = EXCLUDED.volume, create_time = EXCLUDED.create_time
+                    """, [meta_type.value, adjust.value, current_time])
+
+                conn.execute(f"""
+                    INSERT INTO {health_table}
+                        (meta_name, code, checked_rows, quarantined_rows, jump_count, gap_count,
+                         issues, last_issue_date, create_time, update_time)
+                    SELECT ?, CAST(code AS VARCHAR), checked_rows, quarantined_rows, jump_count, gap_count,
+                           issues, last_issue_date, ?, ?
+                    FROM health_df
+                    ON CONFLICT (meta_name, code) DO UPDATE SET
+                        checked_rows = {health_table}.checked_rows + EXCLUDED.checked_rows,
+                        quarantined_rows = {health_table}.quarantined_rows + EXCLUDED.quarantined_rows,
+                        jump_count = {health_table}.jump_count + EXCLUDED.jump_count,
+                        gap_count = {health_table}.gap_count + EXCLUDED.gap_count,
+                        issues = COALESCE(EXCLUDED.issues, {health_table}.issues),
+                        last_issue_date = COALESCE(EXCLUDED.last_issue_date, {health_table}.last_issue_date),
+                        update_time = EXCLUDED.update_time
+                """, [meta_type.value, current_time, current_time])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.unregister('quarantine_df')
+                conn.unregister('health_df')
+
+    def get_kdata_health(self, meta_type: MetaType, only_issues: bool = False) -> pd.DataFrame:
+        """各标的的数据质量
+
+        Args:
+            meta_type: 元数据类型
+            only_issues: 是否只返回有问题的标的
+
+        Returns:
+            DataFrame with columns: [code, checked_rows, quarantined_rows, jump_count, gap_count,
+                                     issues, last_issue_date, update_time]
+        """
+        where = "AND (quarantined_rows > 0 OR jump_count > 0 OR gap_count > 0)" if only_issues else ""
+        T_KData_Health.init_table()
+        with main_db:
+            return main_db.connection().execute(f"""
+                SELECT code, checked_rows, quarantined_rows, jump_count, gap_count, issues, last_issue_date, update_time
+                FROM {T_KData_Health._meta.table_name}
+                WHERE meta_name = ? {where}
+                ORDER BY quarantined_rows + jump_count + gap_count DESC, code
+            """, [meta_type.value]).df()
+
+    def get_quarantined_kdata(self, meta_type: MetaType, symbol_list: Optional[list[str]] = None) -> pd.DataFrame:
+        """被隔离的K线数据
+
+        Returns:
+            DataFrame with columns: [code, date, reason, open, high, low, close, volume, create_time]
+        """
+        params = [meta_type.value]
+        where = ""
+        if symbol_list:
+            where = "AND code IN (SELECT UNNEST(?))"
+            params.append(symbol_list)
+        T_KData_Quarantine.init_table()
+        with main_db:
+            return main_db.connection().execute(f"""
+                SELECT code, date, reason, open, high, low, close, volume, create_time
+                FROM {T_KData_Quarantine._meta.table_name}
+                WHERE meta_name = ? {where}
+                ORDER BY code, date
+            """, params).df()
+
+    def refresh_resampled_kdata(self,
+                                security_type: SecurityType,
+                                adjust: PriceAdjust = PriceAdjust.HFQ,
+                                periods: Optional[list[Period]] = None,
+                                start_date: Optional[str] = None) -> int:
+        """由本地日线聚合周线、月线、年线并保存，只重算start_date所在周期及之后的部分
+
+        每个周期用time_bucket分组，开盘价、收盘价取周期内第一个、最后一个交易日的价格，
+        K线日期为周期内最后一个有数据的交易日。
+
+        Args:
+            security_type: 证券类型
+            adjust: 复权方式，日线表中保存的复权方式
+            periods: 需要聚合的周期，默认为RESAMPLE_PERIODS中的全部周期
+            start_date: 重算的起始日期，None时从上次聚合的最后日期所在周期开始，没有聚合过时全部重算
+
+        Returns:
+            int: 写入的K线数量
+        """
+        periods = periods or list(self.RESAMPLE_PERIODS)
+        table_name = T_KData_Resampled._meta.table_name
+        T_KData_Resampled.init_table()
+
+        total_count = 0
+        for period in periods:
+            interval = self.RESAMPLE_PERIODS[period]
+            meta_type = MetaType(f"{security_type.value}_{period.value}_{adjust.value}_kdata")
+            since = start_date
+            if since is None:
+                meta = self.get_metadata(meta_type)
+                since = meta.end_time if meta else None
+
+            keys = [security_type.value, period.value, adjust.value]
+            bucket_filter = ""
+            date_filter = ""
+            params = []
+            if since is not None:
+                bucket_filter = f"AND bucket >= time_bucket(INTERVAL '{interval}', CAST(? AS DATE))"
+                date_filter = f"WHERE date >= time_bucket(INTERVAL '{interval}', CAST(? AS DATE))"
+                params = [since[:10]]
+
+            current_time = int(time.time() * 1000)
+            with main_db:
+                conn = main_db.connection()
+                source = self.__kdata_source_sql(conn, security_type, Period.Day, adjust)
+                conn.execute("BEGIN TRANSACTION")
+                try:
+                    # DuckDB不允许同一事务中删除后再插入相同主键，先写入或更新，再删除没有被更新的周期
+                    count = conn.execute(f"""
+                        INSERT INTO {table_name}
+                            (security_type, period, adjust_type, code, bucket, date,
+                             open, high, low, close, volume, days, update_time)
+                        SELECT ?, ?, ?, code, CAST(time_bucket(INTERVAL '{interval}', date) AS DATE) AS bucket,
+                               CAST(max(date) AS DATE), arg_min(open, date), max(high), min(low),
+                               arg_max(close, date), sum(volume), COUNT(*), ?
+                        FROM {source}
+                        {date_filter}
+                        GROUP BY code, bucket
+                        ON CONFLICT (security_type, period, adjust_type, code, bucket) DO UPDATE SET
+                            date = EXCLUDED.date, open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+                            close = EXCLUDED.close, volume = EXCLUDED.volume, days = EXCLUDED.days,
+                            update_time = EXCLUDED.update_time
+                    """, keys + [current_time] + params).fetchone()[0]
+                    conn.execute(f"""
+                        DELETE FROM {table_name}
+                        WHERE security_type = ? AND period = ? AND adjust_type = ? {bucket_filter}
+                          AND update_time <> ?
+                    """, keys + params + [current_time])
+                    min_date, max_date = conn.execute(f"""
+                        SELECT strftime(min(date), '%Y-%m-%d'), strftime(max(date), '%Y-%m-%d')
+                        FROM {table_name}
+                        WHERE security_type = ? AND period = ? AND adjust_type = ?
+                    """, keys).fetchone()
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+
+            total_count += count
+            if max_date is not None:
+                self.update_meta_info(meta_type, security_type, period, min_date, max_date, source='resample')
+            logger.info(f"Resampled {count} {meta_type.value} bars since {since or 'the beginning'}")
+
+        return total_count
+
+    def query_resampled_kdata(self,
+                              symbol_list: list[str],
+                              start_date: str,
+                              end_date: str,
+                              security_type: SecurityType,
+                              period: Period = Period.Week,
+                              adjust: PriceAdjust = PriceAdjust.HFQ,
+                              fields: list[str] = ["open", "high", "low", "close", "volume"]) -> pd.DataFrame:
+        """查询由日线聚合的周线、月线、年线
+
+        Args:
+            symbol_list: 证券代码列表
+            start_date: 开始日期，格式为YYYY-MM-DD，按K线日期过滤
+            end_date: 结束日期，格式为YYYY-MM-DD，包含当天
+            security_type: 证券类型
+            period: 周期，RESAMPLE_PERIODS中的一种
+            adjust: 复权方式
+            fields: 字段列表
+
+        Returns:
+            DataFrame with MultiIndex(code, date)，date为周期内最后一个交易日，与DataProvider.get_price格式一致
+        """
+        with main_db:
+            df = main_db.connection().execute(f"""
+                SELECT code, CAST(date AS TIMESTAMP) AS date, {', '.join(fields)}
+                FROM {T_KData_Resampled._meta.table_name}
+                WHERE security_type = ? AND period = ? AND adjust_type = ? AND code IN (SELECT UNNEST(?))
+                  AND date >= CAST(? AS DATE) AND date <= CAST(? AS DATE)
+                ORDER BY code, date
+            """, [security_type.value, period.value, adjust.value, symbol_list, start_date[:10], end_date[:10]]).df()
+
+        df['date'] = pd.to_datetime(df['date']).astype('datetime64[ns]')
+        return df.set_index(['code', 'date'])
+
+    def query_kdata(self,
+                    symbol_list: list[str],
+                    start_date: str,
+                    end_date: str,
+                    security_type: SecurityType,
+                    period: Period = Period.Day,
+                    adjust: PriceAdjust = PriceAdjust.HFQ,
+                    fields: list[str] = ["open", "high", "low", "close", "volume"]) -> pd.DataFrame:
+        """从本地K线表查询数据，一次查询返回所有标的
+
+        Args:
+            symbol_list: 证券代码列表
+            start_date: 开始日期，格式为YYYY-MM-DD
+            end_date: 结束日期，格式为YYYY-MM-DD，包含当天
+            security_type: 证券类型
+            period: 周期
+            adjust: 复权方式
+            fields: 字段列表
+
+        Returns:
+            DataFrame with MultiIndex(code, date)，列为fields，与DataProvider.get_price格式一致
+        """
+        unknown = [f for f in fields if f not in self.KDATA_PRICE_FIELDS]
+        if unknown:
+            raise ValueError(f"Fields {unknown} are not stored in local kdata, available: {self.KDATA_PRICE_FIELDS}")
+
+        db_model_cls = self.__get_kdata_model_cls(security_type, period, adjust)
+        table_name = db_model_cls._meta.table_name
+
+        # 用次日作为开区间上界，分钟线也能取到当天全部数据
+        end_next = (pd.Timestamp(end_date[:10]) + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+        with main_db:
+            conn = main_db.connection()
+            if self.__is_compact(conn, security_type, period, adjust):
+                if adjust != self.__stored_adjust(security_type, period):
+                    return pd.DataFrame(columns=fields, index=pd.MultiIndex.from_arrays([[], []], names=['code', 'date']))
+
+                # 日期为DATE/TIMESTAMP类型，范围过滤可以利用zone map
+                date_type = 'TIMESTAMP' if period == Period.Minute else 'DATE'
+                columns = ', '.join(f"k.{f}" for f in fields)
+                sql = f"""
+                    SELECT d.code, CAST(k.date AS TIMESTAMP) AS date, {columns}
+                    FROM {self.__compact_relation(security_type, period)}
+                    WHERE d.security_type = ? AND d.code IN (SELECT UNNEST(?))
+                      AND k.date >= CAST(? AS {date_type}) AND k.date < CAST(? AS {date_type})
+                    ORDER BY d.code, k.date
+                """
+                params = [security_type.value, symbol_list, start_date[:10], end_next]
+            else:
+                columns = ', '.join(fields)
+                sql = f"""
+                    SELECT code, date, {columns}
+                    FROM {table_name}
+                    WHERE code IN (SELECT UNNEST(?)) AND adjust_type = ? AND date >= ? AND date < ?
+                    ORDER BY code, date
+                """
+                params = [symbol_list, adjust.value, start_date[:10], end_next]
+
+            df = conn.execute(sql, params).df()
+
+        df['date'] = pd.to_datetime(df['date']).astype('datetime64[ns]')
+        return df.set_index(['code', 'date'])
+
+    def save_adj_factors(self, data: pd.DataFrame, security_type: SecurityType) -> int:
+        """保存复权因子，数据中出现的标的先删除原有因子再写入
+
+        除权除息后数据源会重新计算历史因子，因此按标的整体替换而不是按日期合并。
+
+        Args:
+            data: DataFrame with columns: [code, date, factor]，factor为后复权因子
+            security_type: 证券类型
+
+        Returns:
+            int: 写入的行数
+        """
+        if data is None or data.empty:
+            return 0
+
+        df = data[['code', 'date', 'factor']].copy()
+        df['date'] = pd.to_datetime(df['date'])
+        df = df.drop_duplicates(['code', 'date'], keep='last')
+
+        table_name = T_Adj_Factor._meta.table_name
+        with main_db:
+            conn = main_db.connection()
+            conn.register('factor_df', df)
+            conn.execute("BEGIN TRANSACTION")
+            try:
+                conn.execute(f"""
+                    DELETE FROM {table_name}
+                    WHERE security_type = ? AND code IN (SELECT DISTINCT CAST(code AS VARCHAR) FROM factor_df)
+                """, [security_type.value])
+                conn.execute(f"""
+                    INSERT INTO {table_name} (security_type, code, date, factor)
+                    SELECT ?, CAST(code AS VARCHAR), CAST(date AS DATE), CAST(factor AS DOUBLE) FROM factor_df
+                """, [security_type.value])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.unregister('factor_df')
+
+        logger.info(f"Successfully saved {len(df)} adjust factors of {df['code'].nunique()} symbols")
+        return len(df)
+
+    def get_adj_factors(self, symbol_list: Optional[list[str]], security_type: SecurityType) -> pd.DataFrame:
+        """查询复权因子
+
+        Args:
+            symbol_list: 证券代码列表，None表示所有标的
+            security_type: 证券类型
+
+        Returns:
+            DataFrame with columns: [code, date, factor]
+        """
+        where = "security_type = ?"
+        params = [security_type.value]
+        if symbol_list is not None:
+            where += " AND code IN (SELECT UNNEST(?))"
+            params.append(symbol_list)
+
+        sql = f"""
+            SELECT code, date, factor
+            FROM {T_Adj_Factor._meta.table_name}
+            WHERE {where}
+            ORDER BY code, date
+        """
+        with main_db:
+            df = main_db.connection().execute(sql, params).df()
+
+        df['date'] = pd.to_datetime(df['date']).astype('datetime64[ns]')
+        return df
+
+    def query_adjusted_kdata(self,
+                             symbol_list: list[str],
+                             start_date: str,
+                             end_date: str,
+                             security_type: SecurityType,
+                             adjust: PriceAdjust = PriceAdjust.QFQ,
+                             fields: list[str] = ["open", "high", "low", "close", "volume"]) -> pd.DataFrame:
+        """由日线不复权数据和复权因子计算复权价格，一次查询返回所有标的
+
+        每条K线用ASOF JOIN取日期之前最近的因子，后复权价格 = 不复权价格 * 因子，
+        前复权价格 = 不复权价格 * 因子 / 最新因子。成交量不复权。没有因子的标的返回不复权价格。
+
+        Args:
+            symbol_list: 证券代码列表
+            start_date: 开始日期，格式为YYYY-MM-DD
+            end_date: 结束日期，格式为YYYY-MM-DD，包含当天
+            security_type: 证券类型
+            adjust: 复权方式
+            fields: 字段列表
+
+        Returns:
+            DataFrame with MultiIndex(code, date)，列为fields，与DataProvider.get_price格式一致
+        """
+        table_name = self.__get_kdata_model_cls(security_type, Period.Day, PriceAdjust.NO)._meta.table_name
+        factor_table = T_Adj_Factor._meta.table_name
+
+        if adjust == PriceAdjust.HFQ:
+            scale = "COALESCE(f.factor, 1.0)"
+        elif adjust == PriceAdjust.QFQ:
+            scale = "COALESCE(f.factor / l.factor, 1.0)"
+        else:
+            scale = "1.0"
+        columns = ', '.join(f"k.{f}" if f == 'volume' else f"k.{f} * {scale} AS {f}" for f in fields)
+
+        end_next = (pd.Timestamp(end_date[:10]) + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+        sql = f"""
+            WITH f AS (
+                SELECT code, date, factor FROM {factor_table}
+                WHERE security_type = ? AND code IN (SELECT UNNEST(?))
+            ), l AS (
+                SELECT code, arg_max(factor, date) AS factor FROM f GROUP BY code
+            ), k AS (
+                SELECT code, CAST(date AS DATE) AS date, {', '.join(self.KDATA_PRICE_FIELDS)}
+                FROM {table_name}
+                WHERE code IN (SELECT UNNEST(?)) AND adjust_type = ? AND date >= ? AND date < ?
+            )
+            SELECT k.code, CAST(k.date AS TIMESTAMP) AS date, {columns}
+            FROM k
+            ASOF LEFT JOIN f ON k.code = f.code AND k.date >= f.date
+            LEFT JOIN l ON k.code = l.code
+            ORDER BY k.code, k.date
+        """
+        params = [security_type.value, symbol_list, symbol_list, PriceAdjust.NO.value, start_date[:10], end_next]
+
+        with main_db:
+            df = main_db.connection().execute(sql, params).df()
+
+        df['date'] = pd.to_datetime(df['date']).astype('datetime64[ns]')
+        return df.set_index(['code', 'date'])
+
+    def save_symbol_master(self, data: pd.DataFrame, security_type: SecurityType) -> int:
+        """保存证券列表
+
+        数据中的证券按代码更新名称和上市、退市日期；表中已有、本次列表中没有且未记录退市日期的证券，
+        视为已退市，退市日期记为当天。
+
+        Args:
+            data: DataFrame with columns: [code, name]，可选列list_date, delist_date，日期格式为YYYY-MM-DD
+            security_type: 证券类型
+
+        Returns:
+            int: 写入的证券数量
+        """
+        if data is None or data.empty:
+            return 0
+
+        df = data.copy()
+        for column in ['list_date', 'delist_date']:
+            if column not in df.columns:
+                df[column] = None
+        df = df[['code', 'name', 'list_date', 'delist_date']].drop_duplicates('code', keep='last')
+        df['code'] = df['code'].astype(str)
+        df['name'] = df['name'].astype(str)
+
+        current_time = int(time.time() * 1000)
+        table_name = T_Symbol_Master._meta.table_name
+        T_Symbol_Master.init_table()
+        with main_db:
+            conn = main_db.connection()
+            conn.register('symbol_df', df)
+            conn.execute("BEGIN TRANSACTION")
+            try:
+                conn.execute(f"""
+                    UPDATE {table_name}
+                    SET delist_date = strftime(current_date, '%Y-%m-%d'), update_time = ?
+                    WHERE security_type = ? AND delist_date IS NULL
+                      AND code NOT IN (SELECT code FROM symbol_df)
+                """, [current_time, security_type.value])
+                conn.execute(f"""
+                    INSERT INTO {table_name} (security_type, code, name, list_date, delist_date, create_time, update_time)
+                    SELECT ?, code, name, CAST(list_date AS VARCHAR), CAST(delist_date AS VARCHAR), ?, ?
+                    FROM symbol_df
+                    ON CONFLICT (security_type, code) DO UPDATE SET
+                        name = EXCLUDED.name,
+                        list_date = COALESCE(EXCLUDED.list_date, {table_name}.list_date),
+                        delist_date = EXCLUDED.delist_date,
+                        update_time = EXCLUDED.update_time
+                """, [security_type.value, current_time, current_time])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.unregister('symbol_df')
+
+        logger.info(f"Successfully saved {len(df)} {security_type.value} symbols")
+        return len(df)
+
+    def get_symbol_master(self, security_type: SecurityType) -> pd.DataFrame:
+        """查询证券列表，包括已退市的证券
+
+        Returns:
+            DataFrame with columns: [code, name, list_date, delist_date, update_time]，按code排序
+        """
+        sql = f"""
+            SELECT code, name, list_date, delist_date, update_time
+            FROM {T_Symbol_Master._meta.table_name}
+            WHERE security_type = ?
+            ORDER BY code
+        """
+        # 证券列表可能在初始化数据库之前被读取
+        T_Symbol_Master.init_table()
+        with main_db:
+            return main_db.connection().execute(sql, [security_type.value]).df()
+
+    def save_trade_calendar(self, exchange: Exchange, dates: pd.DatetimeIndex) -> int:
+        """保存交易所的全部交易日，替换原有日历
+
+        Args:
+            exchange: 交易所
+            dates: 交易日
+
+        Returns:
+            int: 写入的交易日数量
+        """
+        if dates is None or len(dates) == 0:
+            return 0
+
+        df = pd.DataFrame({'date': pd.DatetimeIndex(dates).normalize().unique()})
+        table_name = T_Trade_Calendar._meta.table_name
+        T_Trade_Calendar.init_table()
+        with main_db:
+            conn = main_db.connection()
+            conn.register('calendar_df', df)
+            conn.execute("BEGIN TRANSACTION")
+            try:
+                conn.execute(f"DELETE FROM {table_name} WHERE exchange = ?", [exchange.value])
+                conn.execute(f"""
+                    INSERT INTO {table_name} (exchange, date, update_time)
+                    SELECT ?, CAST(date AS DATE), ? FROM calendar_df
+                """, [exchange.value, int(time.time() * 1000)])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.unregister('calendar_df')
+
+        return len(df)
+
+    def get_trade_calendar(self, exchange: Exchange) -> Tuple[pd.DatetimeIndex, Optional[int]]:
+        """交易所的全部交易日
+
+        Returns:
+            Tuple[pd.DatetimeIndex, Optional[int]]: (按日期排序的交易日, 更新时间)，没有数据时更新时间为None
+        """
+        T_Trade_Calendar.init_table()
+        with main_db:
+            df = main_db.connection().execute(f"""
+                SELECT CAST(date AS TIMESTAMP) AS date, update_time
+                FROM {T_Trade_Calendar._meta.table_name}
+                WHERE exchange = ?
+                ORDER BY date
+            """, [exchange.value]).df()
+
+        if df.empty:
+            return pd.DatetimeIndex([]), None
+        return pd.DatetimeIndex(df['date'].astype('datetime64[ns]')), int(df['update_time'].max())
+
+    def bulk_upsert(self, model_cls, data: pd.DataFrame) -> int:
+        """按主键批量写入或更新任意表，整批数据注册为DataFrame后用一条INSERT ... ON CONFLICT语句完成
+
+        数据中的列按模型字段类型转换；没有提供的可空列写入NULL，已有记录只更新数据中提供的列。
+        create_time、update_time列由本方法填写。同一主键重复时保留最后一条。
+
+        Args:
+            model_cls: peewee模型类，需要有主键
+            data: DataFrame，列名与模型字段名相同，至少包含主键列
+
+        Returns:
+            int: 写入的行数
+        """
+        if data is None or data.empty:
+            return 0
+
+        key_columns = list(model_cls._meta.primary_key.field_names) \
+            if isinstance(model_cls._meta.primary_key, CompositeKey) else [model_cls._meta.primary_key.name]
+        missing = [c for c in key_columns if c not in data.columns]
+        if missing:
+            raise ValueError(f"Missing key columns {missing} for {model_cls._meta.table_name}")
+
+        time_columns = ['create_time', 'update_time']
+        fields = [f for f in model_cls._meta.sorted_fields if f.name in data.columns and f.name not in time_columns]
+        columns = [f.name for f in fields]
+        df = data[columns].drop_duplicates(key_columns, keep='last')
+
+        current_time = int(time.time() * 1000)
+        selects = [f"CAST({f.name} AS {self.COLUMN_TYPES.get(f.field_type, 'VARCHAR')})" for f in fields]
+        timestamps = [c for c in time_columns if c in model_cls._meta.fields]
+        selects += [str(current_time)] * len(timestamps)
+        updates = [f"{c} = EXCLUDED.{c}" for c in columns if c not in key_columns]
+        if 'update_time' in timestamps:
+            updates.append("update_time = EXCLUDED.update_time")
+        action = f"DO UPDATE SET {', '.join(updates)}" if updates else "DO NOTHING"
+
+        table_name = model_cls._meta.table_name
+        sql = f"""
+            INSERT INTO {table_name} ({', '.join(columns + timestamps)})
+            SELECT {', '.join(selects)} FROM upsert_df
+            ON CONFLICT ({', '.join(key_columns)}) {action}
+        """
+        model_cls.init_table()
+        with main_db:
+            conn = main_db.connection()
+            conn.register('upsert_df', df)
+            try:
+                conn.execute(sql)
+            finally:
+                conn.unregister('upsert_df')
+
+        logger.info(f"Successfully upserted {len(df)} rows into {table_name}")
+        return len(df)
+
+    def save_fundamentals(self, meta_type: MetaType, data: pd.DataFrame, source: str = 'akshare') -> int:
+        """保存基本面数据并更新元数据
+
+        Args:
+            meta_type: 元数据类型，FUNDAMENTAL_TABLES中的一种
+            data: DataFrame with columns: [code, 数据日期列, 数据字段...]
+            source: 数据来源
+
+        Returns:
+            int: 写入的行数
+        """
+        model_cls, security_type, date_column, _ = self.FUNDAMENTAL_TABLES[meta_type]
+        count = self.bulk_upsert(model_cls, data)
+        if count > 0:
+            dates = pd.to_datetime(data[date_column])
+            # 基本面数据按日期与日线行情对齐
+            self.update_meta_info(meta_type, security_type, Period.Day,
+                                  dates.min().strftime('%Y-%m-%d'), dates.max().strftime('%Y-%m-%d'), source)
+        return count
+
+    def query_fundamentals(self,
+                           meta_type: MetaType,
+                           symbol_list: Optional[list[str]],
+                           start_date: str,
+                           end_date: str,
+                           fields: Optional[list[str]] = None) -> pd.DataFrame:
+        """查询基本面数据
+
+        Args:
+            meta_type: 元数据类型，FUNDAMENTAL_TABLES中的一种
+            symbol_list: 证券代码列表，None表示所有标的
+            start_date: 开始日期，格式为YYYY-MM-DD，按数据日期列过滤
+            end_date: 结束日期，格式为YYYY-MM-DD，包含当天
+            fields: 字段列表，默认为全部数据字段
+
+        Returns:
+            DataFrame with MultiIndex(code, 数据日期列)
+        """
+        model_cls, _, date_column, _ = self.FUNDAMENTAL_TABLES[meta_type]
+        fields = fields or self.__fundamental_fields(model_cls, date_column)
+
+        where = f"{date_column} >= CAST(? AS DATE) AND {date_column} <= CAST(? AS DATE)"
+        params = [start_date[:10], end_date[:10]]
+        if symbol_list is not None:
+            where += " AND code IN (SELECT UNNEST(?))"
+            params.append(symbol_list)
+
+        model_cls.init_table()
+        with main_db:
+            df = main_db.connection().execute(f"""
+                SELECT code, CAST({date_column} AS TIMESTAMP) AS {date_column}, {', '.join(fields)}
+                FROM {model_cls._meta.table_name}
+                WHERE {where}
+                ORDER BY code, {date_column}
+            """, params).df()
+
+        df[date_column] = pd.to_datetime(df[date_column]).astype('datetime64[ns]')
+        return df.set_index(['code', date_column])
+
+    def query_kdata_with_fundamentals(self,
+                                      symbol_list: list[str],
+                                      start_date: str,
+                                      end_date: str,
+                                      security_type: SecurityType,
+                                      meta_type: MetaType,
+                                      fundamental_fields: Optional[list[str]] = None,
+                                      fields: list[str] = ["open", "high", "low", "close", "volume"],
+                                      adjust: PriceAdjust = PriceAdjust.HFQ) -> pd.DataFrame:
+        """日线行情与基本面数据按日期对齐，在DuckDB中用一次ASOF JOIN完成
+
+        每个交易日取当日或之前最近一条基本面数据。财务数据按公告日期对齐，缺少公告日期时按报告期后4个月
+        (年报的法定披露期限)估计；同一天公告多份报告时取报告期最新的一份。
+
+        Args:
+            symbol_list: 证券代码列表
+            start_date: 开始日期，格式为YYYY-MM-DD
+            end_date: 结束日期，格式为YYYY-MM-DD，包含当天
+            security_type: 证券类型
+            meta_type: 基本面数据的元数据类型
+            fundamental_fields: 基本面字段列表，默认为全部数据字段
+            fields: 行情字段列表
+            adjust: 复权方式
+
+        Returns:
+            DataFrame with MultiIndex(code, date)，列为fields + fundamental_fields
+        """
+        model_cls, _, date_column, asof_column = self.FUNDAMENTAL_TABLES[meta_type]
+        fundamental_fields = fundamental_fields or self.__fundamental_fields(model_cls, date_column)
+
+        available = asof_column
+        if asof_column != date_column:
+            available = f"COALESCE({asof_column}, CAST({date_column} + INTERVAL 4 MONTH AS DATE))"
+        price_columns = ', '.join(f"k.{f}" for f in fields)
+        fundamental_columns = ', '.join(f"f.{f}" for f in fundamental_fields)
+
+        model_cls.init_table()
+        with main_db:
+            conn = main_db.connection()
+            source = self.__kdata_source_sql(conn, security_type, Period.Day, adjust)
+            df = conn.execute(f"""
+                WITH k AS (
+                    SELECT * FROM {source}
+                    WHERE code IN (SELECT UNNEST(?)) AND date >= CAST(? AS DATE) AND date <= CAST(? AS DATE)
+                ),
+                f AS (
+                    SELECT code, {available} AS available_date, {', '.join(fundamental_fields)}
+                    FROM {model_cls._meta.table_name}
+                    WHERE code IN (SELECT UNNEST(?))
+                    QUALIFY row_number() OVER (PARTITION BY code, available_date ORDER BY {date_column} DESC) = 1
+                )
+                SELECT k.code, CAST(k.date AS TIMESTAMP) AS date, {price_columns}, {fundamental_columns}
+                FROM k
+                ASOF LEFT JOIN f ON k.code = f.code AND k.date >= f.available_date
+                ORDER BY k.code, k.date
+            """, [symbol_list, start_date[:10], end_date[:10], symbol_list]).df()
+
+        df['date'] = pd.to_datetime(df['date']).astype('datetime64[ns]')
+        return df.set_index(['code', 'date'])
+
+    @staticmethod
+    def __fundamental_fields(model_cls, date_column: str) -> list[str]:
+        """基本面表的数据字段，不包括代码、日期和创建、更新时间"""
+        excluded = {'code', date_column, 'create_time', 'update_time'}
+        return [f.name for f in model_cls._meta.sorted_fields if f.name not in excluded]
+
+    def save_factor_values(self, factor_name: str, security_type: SecurityType, values: pd.DataFrame) -> int:
+        """保存因子值，已有的(因子, 标的, 日期)覆盖
+
+        Args:
+            factor_name: 因子名称
+            security_type: 证券类型
+            values: DataFrame，index为date，columns为code，nan不保存
+
+        Returns:
+            int: 写入的行数
+        """
+        if values is None or values.empty:
+            return 0
+
+        matrix = values.to_numpy(dtype=np.float64)
+        rows, columns = np.nonzero(~np.isnan(matrix))
+        df = pd.DataFrame({
+            'factor_name': factor_name,
+            'security_type': security_type.value,
+            'code': values.columns.to_numpy().astype(str)[columns],
+            'date': pd.DatetimeIndex(values.index)[rows],
+            'value': matrix[rows, columns],
+        })
+        return self.bulk_upsert(T_Factor, df)
+
+    def get_factor_values(self,
+                          factor_name: str,
+                          security_type: SecurityType,
+                          symbol_list: Optional[list[str]] = None,
+                          start_date: Optional[str] = None,
+                          end_date: Optional[str] = None) -> pd.DataFrame:
+        """查询因子值
+
+        Args:
+            factor_name: 因子名称
+            security_type: 证券类型
+            symbol_list: 证券代码列表，None表示所有标的
+            start_date: 开始日期，格式为YYYY-MM-DD，None表示不限
+            end_date: 结束日期，格式为YYYY-MM-DD，包含当天，None表示不限
+
+        Returns:
+            DataFrame，index为date，columns为code，没有因子值的位置为nan
+        """
+        where = "factor_name = ? AND security_type = ?"
+        params = [factor_name, security_type.value]
+        if symbol_list is not None:
+            where += " AND code IN (SELECT UNNEST(?))"
+            params.append(symbol_list)
+        if start_date is not None:
+            where += " AND date >= CAST(? AS DATE)"
+            params.append(start_date[:10])
+        if end_date is not None:
+            where += " AND date <= CAST(? AS DATE)"
+            params.append(end_date[:10])
+
+        T_Factor.init_table()
+        with main_db:
+            df = main_db.connection().execute(f"""
+                SELECT code, CAST(date AS TIMESTAMP) AS date, value
+                FROM {T_Factor._meta.table_name}
+                WHERE {where}
+            """, params).df()
+
+        if df.empty:
+            return pd.DataFrame(index=pd.DatetimeIndex([], name='date'), columns=pd.Index([], name='code'), dtype=float)
+
+        dates, date_ids = np.unique(df['date'].to_numpy(dtype='datetime64[ns]'), return_inverse=True)
+        codes, code_ids = np.unique(df['code'].to_numpy().astype(str), return_inverse=True)
+        matrix = np.full((len(dates), len(codes)), np.nan)
+        matrix[date_ids, code_ids] = df['value'].to_numpy()
+        return pd.DataFrame(matrix, index=pd.DatetimeIndex(dates, name='date'), columns=pd.Index(codes, name='code'))
+
+    def get_factor_end_dates(self, security_type: SecurityType) -> dict:
+        """各因子已保存的最后日期
+
+        Returns:
+            Dict[str, str]: 因子名称 -> 最后日期(YYYY-MM-DD)
+        """
+        T_Factor.init_table()
+        with main_db:
+            rows = main_db.connection().execute(f"""
+                SELECT factor_name, strftime(MAX(date), '%Y-%m-%d')
+                FROM {T_Factor._meta.table_name}
+                WHERE security_type = ?
+                GROUP BY factor_name
+            """, [security_type.value]).fetchall()
+        return dict(rows)
+
     def update_meta_info(self, 
                         meta_type: MetaType,
                         security_type: SecurityType,
@@ -155,7 +1727,7 @@ class AkshareDataService(DataDbService):
                 table_name = db_model_cls._meta.table_name
 
                 # 获取总数据量
-                total_count = db_model_cls.select().count()
+                total_count = self.__count_meta_rows(main_db.connection(), meta_type, db_model_cls)
 
                 current_time = int(time.time() * 1000)
                 meta_data = {
@@ -0,0 +1,184 @@
+# encoding: utf-8
+from typing import Callable, List, Optional
+
+import pandas as pd
+from loguru import logger
+
+from tgtrader.common import MetaType, SecurityType
+from tgtrader.data_provider.data_provider_akshare import AkshareDataProvider
+from tgtrader.data_provider.service.kline_sync_service import KlineSyncService, SyncResult
+
+
+class FundamentalSyncService:
+    """按水位增量同步基本面数据：股票估值指标、业绩报表、基金净值
+
+    估值指标和基金净值按标的记录水位，数据源每次返回标的的全部历史，只写入水位之外的部分。
+    业绩报表按报告期获取全部股票，水位记录在ALL_SYMBOLS下，为已过披露期限、不会再变化的最后一个报告期；
+    之后的报告期每次同步重新获取，补充新公布的报告。
+    """
+
+    # 每批请求的标的数量，每批保存后推进水位
+    CHUNK_SIZE = 500
+
+    # 按报告期同步的数据集的水位代码
+    ALL_SYMBOLS = '*'
+
+    # 各报告期(季度末月份)的法定披露期限：(距报告期的年数, 月, 日)
+    DISCLOSURE_DEADLINES = {
+        3: (0, 4, 30),
+        6: (0, 8, 31),
+        9: (0, 10, 31),
+        12: (1, 4, 30),
+    }
+
+    def __init__(self, provider: Optional[AkshareDataProvider] = None):
+        """
+        Args:
+            provider: 远程数据提供者，默认为AkshareDataProvider
+        """
+        self.provider = provider or AkshareDataProvider()
+        self.data_service = self.provider.data_service
+
+    def sync_valuation(self,
+                       start_date: str = '2017-01-01',
+                       end_date: Optional[str] = None,
+                       symbols: Optional[List[str]] = None) -> SyncResult:
+        """增量同步股票每日估值指标
+
+        Args:
+            start_date: 同步的起始日期
+            end_date: 同步的结束日期，默认为最近一个已收盘的日期
+            symbols: 需要同步的股票，默认为全部股票
+        """
+        if symbols is None:
+            symbols = list(self.provider.get_all_symbols(SecurityType.Stocks)['code'])
+        return self._sync_symbols(MetaType.StocksValuation, symbols, start_date, end_date,
+                                  self.provider.fetch_valuation)
+
+    def sync_fund_nav(self,
+                      start_date: str = '2017-01-01',
+                      end_date: Optional[str] = None,
+                      symbols: Optional[List[str]] = None) -> SyncResult:
+        """增量同步开放式基金净值
+
+        Args:
+            start_date: 同步的起始日期
+            end_date: 同步的结束日期，默认为最近一个已收盘的日期
+            symbols: 需要同步的基金，默认为全部开放式基金
+        """
+        if symbols is None:
+            symbols = list(self.provider.get_all_symbols(SecurityType.Fund)['code'])
+        return self._sync_symbols(MetaType.FundNav, symbols, start_date, end_date, self.provider.fetch_fund_nav)
+
+    def sync_financial(self, start_date: str = '2017-01-01', end_date: Optional[str] = None) -> SyncResult:
+        """增量同步全部股票的业绩报表
+
+        Args:
+            start_date: 同步的起始日期，从之后的第一个报告期开始
+            end_date: 同步的结束日期，默认为今天
+        """
+        meta_type = MetaType.StocksFinancial
+        end_date = str(end_date)[:10] if end_date else pd.Timestamp.now(tz='Asia/Shanghai').strftime('%Y-%m-%d')
+        watermarks = self.data_service.get_watermarks(meta_type, [self.ALL_SYMBOLS])
+        final_date = str(watermarks['end_time'].iloc[0])[:10] if not watermarks.empty else None
+
+        report_dates = [d.strftime('%Y-%m-%d') for d in pd.date_range(str(start_date)[:10], end_date, freq=pd.offsets.QuarterEnd())]
+        report_dates = [d for d in report_dates if final_date is None or d > final_date]
+
+        result = SyncResult()
+        if report_dates:
+            result.fetched_range = (report_dates[0], report_dates[-1])
+
+        # 水位只推进到连续的、已过披露期限的最后一个报告期
+        final = None
+        closed = True
+        for report_date in report_dates:
+            df = self.provider.fetch_financial_report(report_date)
+            if df.empty:
+                logger.warning(f"No financial report of {report_date}")
+                result.failed_symbols.append(report_date)
+                break
+            result.row_count += self.data_service.save_fundamentals(meta_type, df)
+            result.synced_count += 1
+            closed = closed and self._disclosure_closed(report_date, end_date)
+            if closed:
+                final = report_date
+
+        if final is not None:
+            self.data_service.update_watermarks(meta_type, pd.DataFrame({
+                'code': [self.ALL_SYMBOLS],
+                'start_time': [report_dates[0]],
+                'end_time': [final]
+            }))
+
+        logger.info(f"Sync {meta_type.value} finished, reports: {result.synced_count}, rows: {result.row_count}")
+        return result
+
+    def sync_all(self):
+        """同步全部基本面数据，单个数据集失败不影响其他数据集"""
+        for name, sync_fn in [('valuation', self.sync_valuation),
+                              ('financial', self.sync_financial),
+                              ('fund nav', self.sync_fund_nav)]:
+            try:
+                sync_fn()
+            except Exception as e:
+                logger.exception(e)
+                logger.error(f"Failed to sync {name}: {str(e)}")
+
+    def _sync_symbols(self,
+                      meta_type: MetaType,
+                      symbols: List[str],
+                      start_date: str,
+                      end_date: Optional[str],
+                      fetch_fn: Callable[[List[str]], pd.DataFrame]) -> SyncResult:
+        """按标的水位同步数据源每次返回全部历史的数据集
+
+        水位已覆盖[start_date, end_date]的标的不再请求；其余标的只写入水位区间之外的数据。
+        """
+        start_date = str(start_date)[:10]
+        latest = KlineSyncService._latest_closed_date()
+        end_date = min(str(end_date)[:10], latest) if end_date else latest
+
+        df = self.data_service.get_watermarks(meta_type, symbols)
+        watermarks = {row.code: (str(row.start_time)[:10], str(row.end_time)[:10]) for row in df.itertuples()}
+
+        result = SyncResult(new_symbols=[s for s in symbols if s not in watermarks])
+        pending = [s for s in symbols
+                   if s not in watermarks or watermarks[s][0] > start_date or watermarks[s][1] < end_date]
+        logger.info(f"Sync {meta_type.value}: {len(pending)} of {len(symbols)} symbols to fetch")
+        if pending:
+            result.fetched_range = (start_date, end_date)
+
+        for i in range(0, len(pending), self.CHUNK_SIZE):
+            batch = pending[i:i + self.CHUNK_SIZE]
+            data = fetch_fn(batch)
+            errors = getattr(self.provider, 'last_fetch_errors', {}) or {}
+            result.failed_symbols.extend(s for s in batch if s in errors)
+
+            if not data.empty:
+                dates = data['date'].dt.strftime('%Y-%m-%d')
+                synced_start = data['code'].map(lambda s: watermarks.get(s, ('9999-12-31', ''))[0])
+                synced_end = data['code'].map(lambda s: watermarks.get(s, ('', ''))[1])
+                outside = (dates < synced_start) | (dates > synced_end)
+                data = data[outside & (dates >= start_date) & (dates <= end_date)]
+                result.row_count += self.data_service.save_fundamentals(meta_type, data)
+
+            synced = [s for s in batch if s not in errors]
+            if synced:
+                self.data_service.update_watermarks(meta_type, pd.DataFrame({
+                    'code': synced,
+                    'start_time': start_date,
+                    'end_time': end_date
+                }))
+                result.synced_count += len(synced)
+
+        logger.info(f"Sync {meta_type.value} finished, synced: {result.synced_count}, "
+                    f"rows: {result.row_count}, failed: {len(result.failed_symbols)}")
+        return result
+
+    @classmethod
+    def _disclosure_closed(cls, report_date: str, today: str) -> bool:
+        """报告期的法定披露期限是否已过"""
+        date = pd.Timestamp(report_date)
+        years, month, day = cls.DISCLOSURE_DEADLINES[date.month]
+        return pd.Timestamp(year=date.year + years, month=month, day=day) < pd.Timestamp(today)
@@ -0,0 +1,434 @@
+# encoding: utf-8
+import glob
+import os
+import tempfile
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+from loguru import logger
+
+from tgtrader.common import MetaType, Period, PriceAdjust, SecurityType
+from tgtrader.data_provider.data_provider_akshare import AkshareDataProvider
+from tgtrader.data_provider.kdata_lake import KDataLake
+from tgtrader.data_provider.price_matrix import PriceMatrixStore
+from tgtrader.data_provider.trading_calendar import TradingCalendar
+
+
+@dataclass
+class SyncResult:
+    """增量同步结果"""
+    # 本次新发现(没有水位)的标的
+    new_symbols: List[str] = field(default_factory=list)
+    # 成功推进水位的标的数量
+    synced_count: int = 0
+    # 写入的行数
+    row_count: int = 0
+    # 重试后仍失败的标的，水位保持不变，下次同步重新获取
+    failed_symbols: List[str] = field(default_factory=list)
+    # 本次请求的日期范围(start_date, end_date)，没有请求时为None
+    fetched_range: Optional[Tuple[str, str]] = None
+    # 复权基准发生变化、已按比例调整本地历史数据的标的
+    rebased_symbols: List[str] = field(default_factory=list)
+
+
+class KlineSyncService:
+    """按标的水位增量同步K线数据
+
+    每个标的记录已从远程同步过的日期区间(水位)，同步时只请求水位之后的数据，
+    以及请求的起始日期早于水位起点时需要回补的部分。没有水位的标的视为新上市标的，
+    从起始日期开始获取。区间相同的标的合并请求，每批最多CHUNK_SIZE个标的。
+    """
+
+    # 每批请求的标的数量，每批保存后推进水位，中断后可以从断点继续
+    CHUNK_SIZE = 500
+
+    # 保存到本地库的字段
+    STORE_FIELDS = ["open", "high", "low", "close", "volume"]
+
+    # 收盘后数据源完成更新的时间，之前同步当天的数据不完整
+    MARKET_CLOSE_TIME = '15:30'
+
+    # 定时任务同步的K线类型
+    SCHEDULED_SYNCS = [
+        (SecurityType.Stocks, Period.Day, PriceAdjust.HFQ),
+        (SecurityType.ETF, Period.Day, PriceAdjust.HFQ),
+        (SecurityType.Stocks, Period.Day, PriceAdjust.NO),
+        (SecurityType.ETF, Period.Day, PriceAdjust.NO),
+    ]
+
+    # 定时任务同步后更新的价格矩阵快照(证券类型, 字段, 复权方式)
+    SCHEDULED_MATRICES = [
+        (SecurityType.Stocks, 'close', PriceAdjust.HFQ),
+        (SecurityType.ETF, 'close', PriceAdjust.HFQ),
+    ]
+
+    def __init__(self, provider: Optional[AkshareDataProvider] = None):
+        """
+        Args:
+            provider: 远程数据提供者，默认为AkshareDataProvider
+        """
+        self.provider = provider or AkshareDataProvider()
+        self.data_service = self.provider.data_service
+
+    def sync(self,
+             security_type: SecurityType,
+             period: Period = Period.Day,
+             adjust: PriceAdjust = PriceAdjust.HFQ,
+             start_date: str = '2017-01-01',
+             end_date: Optional[str] = None,
+             symbols: Optional[List[str]] = None,
+             progress_callback: Optional[Callable[[float, str], None]] = None) -> SyncResult:
+        """增量同步K线数据
+
+        Args:
+            security_type: 证券类型
+            period: 周期
+            adjust: 复权方式，分钟线固定为不复权
+            start_date: 同步的起始日期，新上市标的从该日期开始获取
+            end_date: 同步的结束日期，默认为最近一个已收盘的日期
+            symbols: 需要同步的标的，默认为该证券类型的全部标的
+            progress_callback: 进度回调，参数为(进度0~1, 描述)
+
+        Returns:
+            SyncResult
+        """
+        if period == Period.Minute:
+            adjust = PriceAdjust.NO
+
+        start_date = str(start_date)[:10]
+        latest = self._latest_closed_date()
+        end_date = min(str(end_date)[:10], latest) if end_date else latest
+
+        if symbols is None:
+            symbols = list(self.provider.get_all_symbols(security_type)['code'])
+
+        meta_type = MetaType(f"{security_type.value}_{period.value}_{adjust.value}_kdata")
+        watermarks = self._load_watermarks(meta_type, security_type, period, adjust)
+
+        result = SyncResult(new_symbols=[s for s in symbols if s not in watermarks])
+        if result.new_symbols:
+            logger.info(f"Found {len(result.new_symbols)} new symbols for {meta_type.value}")
+
+        plan = self.plan(symbols, watermarks, start_date, end_date)
+        batches = [(gap_start, gap_end, group[i:i + self.CHUNK_SIZE])
+                   for (gap_start, gap_end), group in plan.items()
+                   for i in range(0, len(group), self.CHUNK_SIZE)]
+        logger.info(f"Sync {meta_type.value}: {sum(len(b[2]) for b in batches)} symbol ranges in {len(batches)} batches")
+        if batches:
+            result.fetched_range = (min(b[0] for b in batches), max(b[1] for b in batches))
+
+        if not watermarks and batches:
+            # 首次全量导入：各批写入Parquet暂存文件，最后一次性导入
+            self._bulk_load(batches, security_type, period, adjust, meta_type, result, progress_callback)
+        else:
+            for i, (gap_start, gap_end, batch) in enumerate(batches):
+                if progress_callback:
+                    progress_callback(i / len(batches), f"同步 {gap_start} 至 {gap_end}，{len(batch)} 个标的...")
+
+                # 水位之后的增量区间可以与本地已有数据比较，检查复权基准是否变化
+                overlap = adjust != PriceAdjust.NO and any(
+                    s in watermarks and watermarks[s][1] < gap_start for s in batch)
+                self._sync_batch(batch, gap_start, gap_end, security_type, period, adjust, meta_type, result,
+                                 overlap=overlap)
+
+        if period == Period.Day and result.row_count > 0:
+            self._refresh_resampled(security_type, adjust, meta_type, result)
+
+        if progress_callback:
+            progress_callback(1.0, "同步完成!")
+
+        logger.info(f"Sync {meta_type.value} finished, synced: {result.synced_count}, "
+                    f"rows: {result.row_count}, failed: {len(result.failed_symbols)}")
+        return result
+
+    def sync_all(self):
+        """同步定时任务配置的全部K线类型，单个类型失败不影响其他类型
+
+        同步前刷新证券列表。使用K线Parquet数据湖时，同步后重建涉及的年份分区。全部同步完成后更新价格矩阵快照，
+        历史价格因复权基准变化被调整时重建快照。
+        """
+        # 先刷新证券列表，新上市的标的在本次同步中获取
+        for security_type in dict.fromkeys(st for st, _, _ in self.SCHEDULED_SYNCS):
+            try:
+                self.provider.refresh_symbols(security_type)
+            except Exception as e:
+                logger.exception(e)
+                logger.error(f"Failed to refresh {security_type.value} symbols: {str(e)}")
+
+        lake = KDataLake(data_service=self.data_service) if KDataLake.enabled() else None
+        rebased = set()
+        for security_type, period, adjust in self.SCHEDULED_SYNCS:
+            try:
+                result = self.sync(security_type, period, adjust)
+                meta_type = MetaType(f"{security_type.value}_{period.value}_{adjust.value}_kdata")
+                if result.rebased_symbols:
+                    rebased.add((security_type, adjust))
+                if lake is not None and result.fetched_range is not None:
+                    refresh_start, refresh_end = result.fetched_range
+                    if result.rebased_symbols:
+                        # 历史数据已调整，重建全部年份的分区
+                        meta = self.data_service.get_metadata(meta_type)
+                        refresh_start = min(refresh_start, meta.start_time[:10]) if meta else refresh_start
+                    lake.refresh(meta_type, refresh_start, refresh_end)
+                if period == Period.Day and adjust == PriceAdjust.NO:
+                    self.sync_adj_factors(security_type)
+            except Exception as e:
+                logger.exception(e)
+                logger.error(f"Failed to sync {security_type.value} {period.value} kdata: {str(e)}")
+
+        matrix_store = PriceMatrixStore(data_service=self.data_service)
+        for security_type, field_name, adjust in self.SCHEDULED_MATRICES:
+            try:
+                if (security_type, adjust) in rebased:
+                    # 历史价格已调整，不能只追加新日期
+                    matrix_store.build(security_type, field_name, adjust)
+                else:
+                    matrix_store.update(security_type, field_name, adjust)
+            except Exception as e:
+                logger.exception(e)
+                logger.error(f"Failed to update price matrix {security_type.value} {field_name}: {str(e)}")
+
+    def sync_adj_factors(self, security_type: SecurityType, symbols: Optional[List[str]] = None) -> int:
+        """刷新复权因子，前复权和后复权价格由日线不复权数据乘以因子得到
+
+        除权除息会改变之后的全部因子，数据源每次返回完整的因子序列，按标的整体替换。
+
+        Args:
+            security_type: 证券类型
+            symbols: 需要刷新的标的，默认为本地已有日线不复权数据的全部标的
+
+        Returns:
+            int: 写入的因子行数
+        """
+        if symbols is None:
+            meta_type = MetaType(f"{security_type.value}_{Period.Day.value}_{PriceAdjust.NO.value}_kdata")
+            symbols = list(self.data_service.get_watermarks(meta_type)['code'])
+
+        total_count = 0
+        for i in range(0, len(symbols), self.CHUNK_SIZE):
+            df = self.provider.get_adj_factors(symbols[i:i + self.CHUNK_SIZE], security_type)
+            total_count += self.data_service.save_adj_factors(df, security_type)
+
+        logger.info(f"Refreshed {total_count} adjust factors of {len(symbols)} {security_type.value} symbols")
+        return total_count
+
+    def _refresh_resampled(self,
+                           security_type: SecurityType,
+                           adjust: PriceAdjust,
+                           meta_type: MetaType,
+                           result: SyncResult):
+        """重算受本次同步影响的周线、月线、年线，历史价格被调整时全部重算"""
+        since = result.fetched_range[0]
+        if result.rebased_symbols:
+            meta = self.data_service.get_metadata(meta_type)
+            since = min(since, meta.start_time[:10]) if meta else since
+        try:
+            self.data_service.refresh_resampled_kdata(security_type, adjust, start_date=since)
+        except Exception as e:
+            logger.exception(e)
+            logger.error(f"Failed to resample {meta_type.value}: {str(e)}")
+
+    @classmethod
+    def plan(cls,
+             symbols: List[str],
+             watermarks: Dict[str, Tuple[str, str]],
+             start_date: str,
+             end_date: str) -> Dict[Tuple[str, str], List[str]]:
+        """根据水位计算每个标的需要请求的区间
+
+        Args:
+            symbols: 标的列表
+            watermarks: 标的 -> (已同步起始日期, 已同步结束日期)
+            start_date: 同步的起始日期
+            end_date: 同步的结束日期
+
+        Returns:
+            Dict[(start_date, end_date), symbol_list]，区间相同的标的合并为一次请求
+        """
+        plan = defaultdict(list)
+        for symbol in symbols:
+            if symbol not in watermarks:
+                if cls._has_business_day(start_date, end_date):
+                    plan[(start_date, end_date)].append(symbol)
+                continue
+
+            synced_start, synced_end = watermarks[symbol]
+            if end_date > synced_end:
+                gap_start = (pd.Timestamp(synced_end) + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+                if cls._has_business_day(gap_start, end_date):
+                    plan[(gap_start, end_date)].append(symbol)
+
+            if start_date < synced_start:
+                gap_end = (pd.Timestamp(synced_start) - pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+                if cls._has_business_day(start_date, gap_end):
+                    plan[(start_date, gap_end)].append(symbol)
+
+        return dict(plan)
+
+    def _load_watermarks(self,
+                         meta_type: MetaType,
+                         security_type: SecurityType,
+                         period: Period,
+                         adjust: PriceAdjust) -> Dict[str, Tuple[str, str]]:
+        """读取水位，没有水位记录时用本地已有数据初始化"""
+        df = self.data_service.get_watermarks(meta_type)
+        if df.empty:
+            df = self._bootstrap_watermarks(meta_type, security_type, period, adjust)
+
+        return {row.code: (str(row.start_time)[:10], str(row.end_time)[:10]) for row in df.itertuples()}
+
+    def _bootstrap_watermarks(self,
+                              meta_type: MetaType,
+                              security_type: SecurityType,
+                              period: Period,
+                              adjust: PriceAdjust) -> pd.DataFrame:
+        """用本地K线表的数据范围初始化水位
+
+        表级元数据的起始日期之前整张表都没有同步过，标的的首条数据晚于该日期说明当时尚未上市，
+        因此水位起点取元数据的起始日期；结束日期取标的的最后一条数据，停牌的标的会重新请求一次。
+        """
+        coverage = self.data_service.get_kdata_coverage(None, security_type, period, adjust)
+        if coverage.empty:
+            return coverage
+
+        coverage['start_time'] = coverage['start_time'].astype(str).str[:10]
+        coverage['end_time'] = coverage['end_time'].astype(str).str[:10]
+
+        meta = self.data_service.get_metadata(meta_type)
+        if meta and meta.start_time:
+            coverage['start_time'] = coverage['start_time'].where(coverage['start_time'] < meta.start_time[:10],
+                                                                  meta.start_time[:10])
+
+        self.data_service.update_watermarks(meta_type, coverage)
+        logger.info(f"Initialized watermarks of {len(coverage)} symbols for {meta_type.value} from local data")
+        return coverage
+
+    def _sync_batch(self,
+                    symbols: List[str],
+                    start_date: str,
+                    end_date: str,
+                    security_type: SecurityType,
+                    period: Period,
+                    adjust: PriceAdjust,
+                    meta_type: MetaType,
+                    result: SyncResult,
+                    overlap: bool = False):
+        """同步一批区间相同的标的，保存成功后推进水位
+
+        overlap为True时多获取区间之前的一个交易日，与本地已有数据比较。复权价格在除权除息后整体变化时，
+        按新旧收盘价之比直接调整该标的的本地历史数据，不重新下载。
+        """
+        fetch_start = start_date
+        if overlap:
+            previous_session = TradingCalendar.get().previous_session(start_date)
+            if previous_session is not None:
+                fetch_start = previous_session.strftime('%Y-%m-%d')
+
+        df, synced = self._fetch_batch(symbols, fetch_start, end_date, security_type, period, adjust, result)
+
+        if fetch_start < start_date and df is not None and not df.empty:
+            ratios = self.data_service.detect_adjust_changes(df, start_date, security_type, period, adjust)
+            if not ratios.empty:
+                logger.info(f"Adjust base of {len(ratios)} symbols changed for {meta_type.value}: "
+                            f"{ratios['code'].tolist()[:10]}")
+                # 先调整历史数据再写入新数据，写入失败时历史数据与重叠日期的新数据仍然一致
+                self.data_service.rebase_kdata(ratios, start_date, security_type, period, adjust)
+                result.rebased_symbols.extend(ratios['code'])
+
+        if df is not None and not df.empty:
+            if not self.provider.save_price_data(df, security_type, period, adjust):
+                # 保存失败时不推进水位
+                result.failed_symbols.extend(synced)
+                return
+            result.row_count += len(df)
+
+        self._advance_watermarks(meta_type, synced, start_date, end_date, result)
+
+    def _bulk_load(self,
+                   batches: List[Tuple[str, str, List[str]]],
+                   security_type: SecurityType,
+                   period: Period,
+                   adjust: PriceAdjust,
+                   meta_type: MetaType,
+                   result: SyncResult,
+                   progress_callback: Optional[Callable[[float, str], None]] = None):
+        """首次全量导入，各批数据写入Parquet暂存文件，全部获取后用COPY导入K线表再推进水位"""
+        staged = []
+        dates = []
+        with tempfile.TemporaryDirectory(prefix='kdata_staging_') as staging_dir:
+            for i, (gap_start, gap_end, batch) in enumerate(batches):
+                if progress_callback:
+                    progress_callback(i / len(batches), f"获取 {gap_start} 至 {gap_end}，{len(batch)} 个标的...")
+
+                df, synced = self._fetch_batch(batch, gap_start, gap_end, security_type, period, adjust, result)
+                if df is not None and not df.empty:
+                    path = os.path.join(staging_dir, f"{i:06d}.parquet")
+                    dates.append(df.index.get_level_values('date'))
+                    df = self.data_service.validate_kdata(df, security_type, period, adjust)
+                    self.data_service.stage_kdata_parquet(df, path, adjust, period=period)
+                staged.append((gap_start, gap_end, synced))
+
+            if progress_callback:
+                progress_callback(1.0, "导入数据...")
+
+            paths = sorted(glob.glob(os.path.join(staging_dir, '*.parquet')))
+            result.row_count += self.data_service.copy_kdata_from_parquet(paths, security_type, period, adjust)
+
+        if dates:
+            start_time = min(d.min() for d in dates).strftime('%Y-%m-%d')
+            end_time = max(d.max() for d in dates).strftime('%Y-%m-%d')
+            self.data_service.update_meta_info(meta_type, security_type, period, start_time, end_time)
+
+        for gap_start, gap_end, synced in staged:
+            self._advance_watermarks(meta_type, synced, gap_start, gap_end, result)
+
+    def _fetch_batch(self,
+                     symbols: List[str],
+                     start_date: str,
+                     end_date: str,
+                     security_type: SecurityType,
+                     period: Period,
+                     adjust: PriceAdjust,
+                     result: SyncResult) -> Tuple[Optional[pd.DataFrame], List[str]]:
+        """获取一批标的的数据
+
+        Returns:
+            (数据, 获取成功的标的)，区间内没有数据的标的(未上市、停牌)也算获取成功
+        """
+        df = self.provider.get_price(symbols, start_date, end_date, security_type,
+                                     period, adjust, self.STORE_FIELDS)
+        errors = getattr(self.provider, 'last_fetch_errors', {}) or {}
+        result.failed_symbols.extend(s for s in symbols if s in errors)
+        return df, [s for s in symbols if s not in errors]
+
+    def _advance_watermarks(self,
+                            meta_type: MetaType,
+                            symbols: List[str],
+                            start_date: str,
+                            end_date: str,
+                            result: SyncResult):
+        if not symbols:
+            return
+
+        self.data_service.update_watermarks(meta_type, pd.DataFrame({
+            'code': symbols,
+            'start_time': start_date,
+            'end_time': end_date
+        }))
+        result.synced_count += len(symbols)
+
+    @classmethod
+    def _latest_closed_date(cls) -> str:
+        """最近一个已收盘的交易日，收盘前不同步当天的数据，避免水位越过不完整的当日数据"""
+        now = pd.Timestamp.now(tz='Asia/Shanghai')
+        today = now.strftime('%Y-%m-%d')
+        calendar = TradingCalendar.get()
+        if calendar.is_session(today) and now.strftime('%H:%M') >= cls.MARKET_CLOSE_TIME:
+            return today
+        return calendar.previous_session(today).strftime('%Y-%m-%d')
+
+    @staticmethod
+    def _has_business_day(start_date: str, end_date: str) -> bool:
+        return start_date <= end_date and TradingCalendar.get().has_session(start_date, end_date)
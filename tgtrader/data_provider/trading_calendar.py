@@ -0,0 +1,225 @@
+# encoding: utf-8
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from tgtrader.common import Exchange
+
+
+class TradingCalendar:
+    """交易日历
+
+    交易日保存为排序的datetime64[D]数组，并按自然日预先计算查找表：
+    从第一个交易日到最后一个交易日的每个自然日记录当日或之前最近的交易日序号，
+    判断交易日、查找上一个/下一个交易日、统计区间内的交易日数量都是一次数组下标访问。
+    各周期(周、月、季、年)的第一个和最后一个交易日也预先标记，供调仓和定时任务使用。
+
+    Example:
+        calendar = TradingCalendar.get(Exchange.SSE)
+        calendar.is_session('2024-10-01')            # False，国庆假期
+        calendar.next_session('2024-09-30')          # Timestamp('2024-10-08')
+        calendar.is_period_end('2024-09-30', 'M')    # True
+    """
+
+    # 支持的周期：D日 W周 M月 Q季 Y年
+    FREQS = ('D', 'W', 'M', 'Q', 'Y')
+
+    # 数据库中的日历超过该时间(秒)后从数据源刷新
+    REFRESH_INTERVAL = 7 * 24 * 3600
+
+    NANOS_PER_DAY = 24 * 3600 * 10 ** 9
+
+    _calendars: Dict[Exchange, 'TradingCalendar'] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, sessions, exchange: Exchange = Exchange.SSE, known_until=None):
+        """
+        Args:
+            sessions: 交易日，可以是任意能转换为DatetimeIndex的日期序列
+            exchange: 交易所
+            known_until: 确定的最后一个交易日，之后的交易日由工作日推算；默认为最后一个交易日
+        """
+        days = np.unique(pd.DatetimeIndex(sessions).normalize().values.astype('datetime64[D]'))
+        if len(days) == 0:
+            raise ValueError(f"Trading calendar of {exchange.value} has no sessions")
+
+        self.exchange = exchange
+        self.sessions = days
+        self.first_session = pd.Timestamp(days[0])
+        self.last_session = pd.Timestamp(days[-1])
+        self.known_until = pd.Timestamp(known_until) if known_until is not None else self.last_session
+
+        self._day0 = days[0].astype(np.int64)
+        offsets = days.astype(np.int64) - self._day0
+        self._is_session = np.zeros(offsets[-1] + 1, dtype=bool)
+        self._is_session[offsets] = True
+        # 每个自然日当日或之前最近的交易日序号
+        self._floor = (np.cumsum(self._is_session) - 1).astype(np.int32)
+
+        self._period_start: Dict[str, np.ndarray] = {}
+        self._period_end: Dict[str, np.ndarray] = {}
+        for freq in self.FREQS:
+            keys = self._period_keys(days, freq)
+            change = keys[1:] != keys[:-1]
+            self._period_start[freq] = np.concatenate([[True], change])
+            self._period_end[freq] = np.concatenate([change, [True]])
+
+    @classmethod
+    def _period_keys(cls, days: np.ndarray, freq: str) -> np.ndarray:
+        """各交易日所属周期的编号，同一周期内相同"""
+        day_numbers = days.astype(np.int64)
+        if freq == 'D':
+            return day_numbers
+        if freq == 'W':
+            # 1970-01-01是星期四，加3后按7整除得到以星期一开始的周编号
+            return (day_numbers + 3) // 7
+        months = days.astype('datetime64[M]').astype(np.int64)
+        if freq == 'M':
+            return months
+        if freq == 'Q':
+            return months // 3
+        if freq == 'Y':
+            return months // 12
+        raise ValueError(f"Unsupported frequency: {freq}, expected one of {cls.FREQS}")
+
+    @classmethod
+    def get(cls, exchange: Exchange = Exchange.SSE, refresh: bool = False) -> 'TradingCalendar':
+        """交易所的交易日历，进程内缓存
+
+        先读取本地库，本地没有或超过REFRESH_INTERVAL未更新时从数据源刷新。
+        数据源不可用且本地没有日历时退化为工作日日历。确定的交易日之后到下一年年底按工作日推算。
+
+        Args:
+            exchange: 交易所
+            refresh: 是否强制从数据源刷新
+        """
+        with cls._lock:
+            calendar = cls._calendars.get(exchange)
+            if calendar is None or refresh:
+                calendar = cls._load(exchange, refresh)
+                cls._calendars[exchange] = calendar
+            return calendar
+
+    @classmethod
+    def invalidate(cls, exchange: Optional[Exchange] = None):
+        """清除进程内缓存，None表示全部交易所"""
+        with cls._lock:
+            for key in [exchange] if exchange else list(cls._calendars.keys()):
+                cls._calendars.pop(key, None)
+
+    @classmethod
+    def _load(cls, exchange: Exchange, refresh: bool) -> 'TradingCalendar':
+        # 延迟导入，避免数据提供者与日历互相导入
+        from tgtrader.data_provider.data_provider_akshare import AkshareDataProvider
+
+        provider = AkshareDataProvider()
+        sessions, update_time = provider.data_service.get_trade_calendar(exchange)
+
+        stale = update_time is None or time.time() * 1000 - update_time > cls.REFRESH_INTERVAL * 1000
+        if refresh or stale:
+            fetched = provider.fetch_trade_calendar(exchange)
+            if len(fetched) > 0:
+                provider.data_service.save_trade_calendar(exchange, fetched)
+                sessions = fetched
+            elif len(sessions) > 0:
+                logger.warning(f"Failed to refresh trade calendar of {exchange.value}, using local calendar")
+
+        if len(sessions) == 0:
+            logger.warning(f"No trade calendar of {exchange.value}, falling back to weekdays")
+            sessions = pd.bdate_range('1990-01-01', pd.Timestamp.now().normalize())
+
+        known_until = sessions.max()
+        horizon = pd.Timestamp(year=max(known_until.year, pd.Timestamp.now().year) + 1, month=12, day=31)
+        extension = pd.bdate_range(known_until + pd.Timedelta(days=1), horizon)
+        return cls(sessions.append(extension), exchange, known_until=known_until)
+
+    def _offset(self, date) -> int:
+        """日期相对第一个交易日的天数"""
+        if isinstance(date, str):
+            day = int(np.datetime64(date[:10], 'D').astype(np.int64))
+        else:
+            day = pd.Timestamp(date).value // self.NANOS_PER_DAY
+        return day - int(self._day0)
+
+    def is_session(self, date) -> bool:
+        """是否为交易日"""
+        offset = self._offset(date)
+        return 0 <= offset < len(self._is_session) and bool(self._is_session[offset])
+
+    def session_index(self, date) -> int:
+        """当日或之前最近的交易日在sessions中的序号，早于第一个交易日时为-1"""
+        offset = self._offset(date)
+        if offset < 0:
+            return -1
+        if offset >= len(self._floor):
+            return len(self.sessions) - 1
+        return int(self._floor[offset])
+
+    def session_on_or_before(self, date) -> Optional[pd.Timestamp]:
+        """当日或之前最近的交易日"""
+        i = self.session_index(date)
+        return pd.Timestamp(self.sessions[i]) if i >= 0 else None
+
+    def session_on_or_after(self, date) -> Optional[pd.Timestamp]:
+        """当日或之后最近的交易日"""
+        return self.session_on_or_before(date) if self.is_session(date) else self.next_session(date)
+
+    def previous_session(self, date) -> Optional[pd.Timestamp]:
+        """之前的一个交易日，不包括当日"""
+        i = self.session_index(date)
+        if i >= 0 and self.is_session(date):
+            i -= 1
+        return pd.Timestamp(self.sessions[i]) if i >= 0 else None
+
+    def next_session(self, date) -> Optional[pd.Timestamp]:
+        """之后的一个交易日，不包括当日"""
+        i = self.session_index(date) + 1
+        return pd.Timestamp(self.sessions[i]) if i < len(self.sessions) else None
+
+    def count_sessions(self, start_date, end_date) -> int:
+        """[start_date, end_date]内的交易日数量"""
+        if pd.Timestamp(start_date) > pd.Timestamp(end_date):
+            return 0
+        start = self.session_index(start_date)
+        if not self.is_session(start_date):
+            start += 1
+        return max(0, self.session_index(end_date) - start + 1)
+
+    def has_session(self, start_date, end_date) -> bool:
+        """[start_date, end_date]内是否有交易日"""
+        return self.count_sessions(start_date, end_date) > 0
+
+    def sessions_in_range(self, start_date, end_date) -> pd.DatetimeIndex:
+        """[start_date, end_date]内的交易日"""
+        start = np.searchsorted(self.sessions, np.datetime64(pd.Timestamp(start_date).date(), 'D'), side='left')
+        end = np.searchsorted(self.sessions, np.datetime64(pd.Timestamp(end_date).date(), 'D'), side='right')
+        return pd.DatetimeIndex(self.sessions[start:end].astype('datetime64[ns]'))
+
+    def is_period_start(self, date, freq: str) -> bool:
+        """是否为所在周期的第一个交易日，非交易日返回False
+
+        Args:
+            freq: 周期，D日 W周 M月 Q季 Y年
+        """
+        return self.is_session(date) and bool(self._period_start[freq][self.session_index(date)])
+
+    def is_period_end(self, date, freq: str) -> bool:
+        """是否为所在周期的最后一个交易日，非交易日返回False
+
+        Args:
+            freq: 周期，D日 W周 M月 Q季 Y年
+        """
+        return self.is_session(date) and bool(self._period_end[freq][self.session_index(date)])
+
+    def period_ends(self, freq: str, start_date=None, end_date=None) -> pd.DatetimeIndex:
+        """各周期的最后一个交易日，可以限定日期范围"""
+        ends = pd.DatetimeIndex(self.sessions[self._period_end[freq]].astype('datetime64[ns]'))
+        if start_date is not None:
+            ends = ends[ends >= pd.Timestamp(start_date)]
+        if end_date is not None:
+            ends = ends[ends <= pd.Timestamp(end_date)]
+        return ends
@@ -0,0 +1,128 @@
+# encoding: utf-8
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from tgtrader.common import Period, PriceAdjust, SecurityType
+from tgtrader.data_provider.service.akshare_data_service import AkshareDataService
+from tgtrader.service.symbol_service import SymbolService
+
+
+class UniverseIndex:
+    """按日期查询证券池成员的索引，避免回测只包含当前上市证券的幸存者偏差
+
+    每个证券的上市区间来自证券列表的上市、退市日期，有数据区间来自本地K线的首末日期；
+    按交易日展开为每日一行的位图(每个证券1位)，查询某天的成员只需取出一行。
+
+    Example:
+        index = UniverseIndex.build(SecurityType.Stocks)
+        codes = index.members('2015-06-30')
+    """
+
+    def __init__(self, dates: pd.DatetimeIndex, codes: np.ndarray, listed: np.ndarray, active: np.ndarray):
+        """
+        Args:
+            dates: 交易日期，升序
+            codes: 证券代码
+            listed: 上市状态位图，shape为(len(dates), ceil(len(codes) / 8))
+            active: 上市且在K线数据区间内的位图，shape同listed
+        """
+        self.dates = dates
+        self.codes = codes
+        self._listed = listed
+        self._active = active
+        self._code_pos = pd.Index(codes)
+
+    @classmethod
+    def build(cls,
+              security_type: SecurityType,
+              data_service: Optional[AkshareDataService] = None,
+              adjust: PriceAdjust = PriceAdjust.HFQ) -> 'UniverseIndex':
+        """用证券列表和本地日线K线构建索引
+
+        Args:
+            security_type: 证券类型
+            data_service: 本地K线库服务
+            adjust: 用于确定K线数据区间的复权方式
+        """
+        data_service = data_service or AkshareDataService()
+        dates = data_service.get_kdata_dates(security_type, Period.Day, adjust)
+        coverage = data_service.get_kdata_coverage(None, security_type, Period.Day, adjust)
+        master = SymbolService.get_all_symbols(security_type, include_delisted=True)
+
+        df = pd.merge(master[['code', 'list_date', 'delist_date']],
+                      coverage[['code', 'start_time', 'end_time']], on='code', how='outer', indicator=True)
+        df = df.sort_values('code').reset_index(drop=True)
+        codes = df['code'].astype(str).to_numpy()
+
+        data_start = pd.to_datetime(df['start_time'].astype(str).str[:10], errors='coerce')
+        data_end = pd.to_datetime(df['end_time'].astype(str).str[:10], errors='coerce')
+
+        # 没有上市日期时以首条K线为准；退市日期当天及之后不在证券池中；
+        # 证券列表中没有的证券(列表建立前已退市)以K线区间作为上市区间
+        list_start = pd.to_datetime(df['list_date'], errors='coerce').fillna(data_start)
+        list_end = pd.to_datetime(df['delist_date'], errors='coerce') - pd.Timedelta(days=1)
+        list_end = list_end.where(df['_merge'] != 'right_only', data_end)
+
+        listed = cls._interval_bits(dates, list_start, list_end)
+        in_data = cls._interval_bits(dates, data_start, data_end, open_end=False)
+        active = listed & in_data
+
+        logger.info(f"Built {security_type.value} universe index: {len(dates)} dates, {len(codes)} symbols")
+        return cls(dates, codes, np.packbits(listed, axis=1), np.packbits(active, axis=1))
+
+    @staticmethod
+    def _interval_bits(dates: pd.DatetimeIndex, starts: pd.Series, ends: pd.Series, open_end: bool = True) -> np.ndarray:
+        """将每个证券的[start, end]区间展开为(日期, 证券)的布尔矩阵
+
+        Args:
+            open_end: end为空时是否视为区间持续到最后一天，为False时视为不在区间内
+        """
+        start_idx = np.searchsorted(dates.values, starts.values.astype('datetime64[ns]'), side='left')
+        end_idx = np.searchsorted(dates.values, ends.values.astype('datetime64[ns]'), side='right')
+        end_idx = np.where(ends.isna().to_numpy(), len(dates) if open_end else 0, end_idx)
+        start_idx = np.where(starts.isna().to_numpy(), len(dates), start_idx)
+
+        # 区间起点+1、终点之后-1，按日期累加得到每天是否在区间内
+        diff = np.zeros((len(dates) + 1, len(starts)), dtype=np.int8)
+        valid = start_idx < end_idx
+        columns = np.arange(len(starts))[valid]
+        np.add.at(diff, (start_idx[valid], columns), 1)
+        np.add.at(diff, (end_idx[valid], columns), -1)
+        return np.cumsum(diff[:-1], axis=0, dtype=np.int8) > 0
+
+    def _row(self, date) -> int:
+        """date当天或之前最近一个交易日的行号，早于第一个交易日时为-1"""
+        return int(np.searchsorted(self.dates.values, np.datetime64(pd.Timestamp(date)), side='right')) - 1
+
+    def _bits(self, date, active_only: bool) -> np.ndarray:
+        row = self._row(date)
+        if row < 0:
+            return np.zeros(len(self.codes), dtype=bool)
+        bitset = self._active if active_only else self._listed
+        return np.unpackbits(bitset[row], count=len(self.codes)).astype(bool)
+
+    def members(self, date, active_only: bool = True) -> List[str]:
+        """某天的证券池成员
+
+        Args:
+            date: 日期，非交易日取之前最近的交易日
+            active_only: 为True时只包含在K线数据区间内的证券，否则为当天已上市、未退市的证券
+
+        Returns:
+            List[str]: 证券代码
+        """
+        return self.codes[self._bits(date, active_only)].tolist()
+
+    def is_member(self, date, codes: List[str], active_only: bool = True) -> np.ndarray:
+        """codes中各证券某天是否在证券池中，索引中没有的证券为False"""
+        bits = self._bits(date, active_only)
+        positions = self._code_pos.get_indexer(codes)
+        return np.where(positions >= 0, bits[positions], False)
+
+    def filter(self, date, codes: List[str], active_only: bool = True) -> List[str]:
+        """保留codes中某天在证券池中的证券，顺序不变"""
+        mask = self.is_member(date, list(codes), active_only)
+        return [code for code, member in zip(codes, mask) if member]
@@ -0,0 +1,526 @@
+# encoding: utf-8
+import ast
+import warnings
+from collections import OrderedDict, namedtuple
+from typing import Callable, Dict, List, Union
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from tgtrader.factor.factor import Factor
+
+
+class Node:
+    """表达式语法树的节点
+
+    key为规范化的表达式文本，相同的子表达式key相同，用于去重和缓存计算结果。
+    加法、乘法、max、min的参数按key排序，a + b与b + a为同一个节点。
+    """
+
+    __slots__ = ('op', 'args', 'value', 'key')
+
+    def __init__(self, op: str, args: tuple = (), value=None):
+        """
+        Args:
+            op: field字段、const常量、运算符或函数名
+            args: 子节点
+            value: 字段名或常量值
+        """
+        self.op = op
+        self.args = args
+        self.value = value
+        if op == 'field':
+            self.key = value
+        elif op == 'const':
+            self.key = repr(value)
+        elif op in BINARY_OPS:
+            self.key = f"({args[0].key}{op}{args[1].key})"
+        elif op == 'neg':
+            self.key = f"(-{args[0].key})"
+        else:
+            self.key = f"{op}({','.join(arg.key for arg in args)})"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Node) and self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __repr__(self) -> str:
+        return self.key
+
+    @property
+    def lookback(self) -> int:
+        """计算一个交易日的值需要的之前交易日数量"""
+        lookback = max((arg.lookback for arg in self.args), default=0)
+        if self.op in FUNCTIONS and FUNCTIONS[self.op].windowed:
+            lookback += self.args[-1].value - 1 + FUNCTIONS[self.op].lag
+        return lookback
+
+    def fields(self) -> List[str]:
+        """引用的字段"""
+        return sorted({node.value for node in self.walk() if node.op == 'field'})
+
+    def walk(self) -> List['Node']:
+        """去重后的全部节点，子节点在父节点之前"""
+        nodes = OrderedDict()
+
+        def visit(node: Node):
+            if node.key in nodes:
+                return
+            for arg in node.args:
+                visit(arg)
+            nodes[node.key] = node
+
+        visit(self)
+        return list(nodes.values())
+
+
+# 运算符节点 -> 计算函数
+BINARY_OPS = {
+    '+': np.add,
+    '-': np.subtract,
+    '*': np.multiply,
+    '/': np.divide,
+    '**': np.power,
+    '>': np.greater,
+    '<': np.less,
+    '>=': np.greater_equal,
+    '<=': np.less_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+    '&': np.logical_and,
+    '|': np.logical_or,
+}
+
+# 参数可交换的运算和函数
+COMMUTATIVE = {'+', '*', '==', '!=', '&', '|', 'max', 'min'}
+
+# 由其他字段计算的字段，解析时展开为表达式
+DERIVED_FIELDS = {
+    'ret': 'close / delay(close, 1) - 1',
+}
+
+# 停牌日沿用之前价格的字段
+PRICE_FIELDS = {'open', 'high', 'low', 'close'}
+
+# 滑动窗口分块计算时每块的元素数量上限
+WINDOW_CHUNK_CELLS = 1 << 24
+
+
+def _rolling_sum(x: np.ndarray, window: int):
+    """滑动窗口求和，返回(和, 窗口内有效值数量)，由累加和相减得到"""
+    valid = np.isfinite(x)
+    zeros = np.zeros((1, x.shape[1]))
+    total = np.concatenate([zeros, np.cumsum(np.where(valid, x, 0), axis=0)])
+    count = np.concatenate([zeros, np.cumsum(valid, axis=0)])
+    sums = np.full(x.shape, np.nan)
+    counts = np.zeros(x.shape)
+    if len(x) >= window:
+        sums[window - 1:] = total[window:] - total[:-window]
+        counts[window - 1:] = count[window:] - count[:-window]
+    return sums, counts
+
+
+def _ts_sum(x: np.ndarray, window: int) -> np.ndarray:
+    sums, counts = _rolling_sum(x, window)
+    return np.where(counts == window, sums, np.nan)
+
+
+def _ts_mean(x: np.ndarray, window: int) -> np.ndarray:
+    return _ts_sum(x, window) / window
+
+
+def _ts_std(x: np.ndarray, window: int) -> np.ndarray:
+    # 累加和相减计算方差在价格不变的窗口会残留误差，使用pandas的滑动算法
+    return pd.DataFrame(x).rolling(window).std().to_numpy()
+
+
+def _ts_max(x: np.ndarray, window: int) -> np.ndarray:
+    return pd.DataFrame(x).rolling(window).max().to_numpy()
+
+
+def _ts_min(x: np.ndarray, window: int) -> np.ndarray:
+    return pd.DataFrame(x).rolling(window).min().to_numpy()
+
+
+def _ts_cov(x: np.ndarray, y: np.ndarray, window: int) -> np.ndarray:
+    valid = np.isfinite(x) & np.isfinite(y)
+    # 按列去均值后再累加，减小累加和相减的误差
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        x = np.where(valid, x - np.nanmean(np.where(valid, x, np.nan), axis=0), np.nan)
+        y = np.where(valid, y - np.nanmean(np.where(valid, y, np.nan), axis=0), np.nan)
+    return (_ts_sum(x * y, window) - _ts_sum(x, window) * _ts_sum(y, window) / window) / (window - 1)
+
+
+def _ts_corr(x: np.ndarray, y: np.ndarray, window: int) -> np.ndarray:
+    valid = np.isfinite(x) & np.isfinite(y)
+    x = np.where(valid, x, np.nan)
+    y = np.where(valid, y, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = _ts_cov(x, y, window) / (_ts_std(x, window) * _ts_std(y, window))
+    # 窗口内没有波动时相关系数没有意义
+    return np.where(np.isfinite(corr), np.clip(corr, -1, 1), np.nan)
+
+
+def _delay(x: np.ndarray, window: int) -> np.ndarray:
+    result = np.full(x.shape, np.nan)
+    if len(x) > window:
+        result[window:] = x[:-window]
+    return result
+
+
+def _delta(x: np.ndarray, window: int) -> np.ndarray:
+    return x - _delay(x, window)
+
+
+def _window_apply(x: np.ndarray, window: int, fn: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+    """在(日期, 标的, 窗口)的滑动窗口视图上分块计算，窗口内有nan时结果为nan"""
+    result = np.full(x.shape, np.nan)
+    if len(x) < window:
+        return result
+    windows = sliding_window_view(x, window, axis=0)
+    step = max(1, WINDOW_CHUNK_CELLS // max(1, x.shape[1] * window))
+    for start in range(0, len(windows), step):
+        result[window - 1 + start:window - 1 + start + step] = fn(windows[start:start + step])
+    _, counts = _rolling_sum(x, window)
+    result[counts < window] = np.nan
+    return result
+
+
+def _ts_rank(x: np.ndarray, window: int) -> np.ndarray:
+    """当日值在窗口内的百分位排名"""
+    return _window_apply(x, window, lambda w: (w <= w[..., -1:]).sum(axis=-1) / window)
+
+
+def _decay_linear(x: np.ndarray, window: int) -> np.ndarray:
+    """线性衰减加权平均，最近一天的权重最大"""
+    weights = np.arange(1, window + 1, dtype=np.float64)
+    weights /= weights.sum()
+    return _window_apply(x, window, lambda w: w @ weights)
+
+
+def _cross_section(fn: Callable[[np.ndarray], np.ndarray]) -> Callable[[np.ndarray], np.ndarray]:
+    """截面函数在全部为nan的日期不输出警告"""
+    def wrapper(x: np.ndarray) -> np.ndarray:
+        with warnings.catch_warnings(), np.errstate(divide='ignore', invalid='ignore'):
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return fn(x)
+    return wrapper
+
+
+@_cross_section
+def _rank(x: np.ndarray) -> np.ndarray:
+    """截面百分位排名，并列取平均排名，与DataFrame.rank(axis=1, pct=True)相同"""
+    x = np.where(np.isfinite(x), x, np.nan)
+    count = np.isfinite(x).sum(axis=1, keepdims=True)
+    # nan排在每行最后
+    order = np.argsort(x, axis=1)
+    ordered = np.take_along_axis(x, order, axis=1)
+    position = np.broadcast_to(np.arange(1, x.shape[1] + 1), x.shape)
+
+    # 并列的值取第一个和最后一个位置的平均
+    start = np.ones(x.shape, dtype=bool)
+    start[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    end = np.ones(x.shape, dtype=bool)
+    end[:, :-1] = start[:, 1:]
+    first = np.maximum.accumulate(np.where(start, position, 0), axis=1)
+    last = np.minimum.accumulate(np.where(end, position, x.shape[1] + 1)[:, ::-1], axis=1)[:, ::-1]
+
+    ranks = np.empty(x.shape)
+    np.put_along_axis(ranks, order, (first + last) / 2, axis=1)
+    return np.where(np.isnan(x), np.nan, ranks / count)
+
+
+@_cross_section
+def _zscore(x: np.ndarray) -> np.ndarray:
+    return (x - np.nanmean(x, axis=1, keepdims=True)) / np.nanstd(x, axis=1, keepdims=True)
+
+
+@_cross_section
+def _demean(x: np.ndarray) -> np.ndarray:
+    return x - np.nanmean(x, axis=1, keepdims=True)
+
+
+@_cross_section
+def _scale(x: np.ndarray) -> np.ndarray:
+    return x / np.nansum(np.abs(x), axis=1, keepdims=True)
+
+
+def _where(condition, x, y):
+    result = np.where(condition == 1, x, y)
+    return np.where(np.isnan(condition), np.nan, result)
+
+
+# arity为数组参数数量，windowed表示最后一个参数为窗口长度(正整数常量)，
+# lag为窗口之外额外需要的交易日数量(delay、delta使用第t-window天的值)
+Function = namedtuple('Function', ['arity', 'windowed', 'lag', 'kernel'])
+
+FUNCTIONS: Dict[str, Function] = {
+    # 逐元素
+    'abs': Function(1, False, 0, np.abs),
+    'log': Function(1, False, 0, np.log),
+    'sqrt': Function(1, False, 0, np.sqrt),
+    'sign': Function(1, False, 0, np.sign),
+    'max': Function(2, False, 0, np.maximum),
+    'min': Function(2, False, 0, np.minimum),
+    'where': Function(3, False, 0, _where),
+    # 截面
+    'rank': Function(1, False, 0, _rank),
+    'zscore': Function(1, False, 0, _zscore),
+    'demean': Function(1, False, 0, _demean),
+    'scale': Function(1, False, 0, _scale),
+    # 时间序列
+    'delay': Function(1, True, 1, _delay),
+    'delta': Function(1, True, 1, _delta),
+    'ts_sum': Function(1, True, 0, _ts_sum),
+    'ts_mean': Function(1, True, 0, _ts_mean),
+    'ts_std': Function(1, True, 0, _ts_std),
+    'ts_max': Function(1, True, 0, _ts_max),
+    'ts_min': Function(1, True, 0, _ts_min),
+    'ts_rank': Function(1, True, 0, _ts_rank),
+    'decay_linear': Function(1, True, 0, _decay_linear),
+    'ts_cov': Function(2, True, 0, _ts_cov),
+    'ts_corr': Function(2, True, 0, _ts_corr),
+}
+
+# 可以在解析时对常量参数直接求值的函数
+ELEMENTWISE = {'abs', 'log', 'sqrt', 'sign', 'max', 'min', 'where'}
+
+
+class _Parser:
+    """使用Python的ast解析表达式，只接受字段、数值常量、四则运算、比较和FUNCTIONS中的函数"""
+
+    AST_OPS = {
+        ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/', ast.Pow: '**',
+        ast.Gt: '>', ast.Lt: '<', ast.GtE: '>=', ast.LtE: '<=', ast.Eq: '==', ast.NotEq: '!=',
+        ast.BitAnd: '&', ast.BitOr: '|',
+    }
+
+    def __init__(self):
+        # key -> 节点，相同的子表达式只创建一个节点
+        self.nodes: Dict[str, Node] = {}
+
+    def parse(self, expression: str) -> Node:
+        try:
+            tree = ast.parse(expression.strip(), mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"Invalid expression: {expression}: {e.msg}")
+        return self._visit(tree.body, expression)
+
+    def _node(self, op: str, args: tuple = (), value=None) -> Node:
+        if op in COMMUTATIVE:
+            args = tuple(sorted(args, key=lambda arg: arg.key))
+        # 参数全部为常量的逐元素运算直接求值
+        if args and all(arg.op == 'const' for arg in args) and (op in BINARY_OPS or op == 'neg' or op in ELEMENTWISE):
+            values = [arg.value for arg in args]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if op == 'neg':
+                    result = -values[0]
+                elif op in BINARY_OPS:
+                    result = BINARY_OPS[op](*values)
+                else:
+                    result = FUNCTIONS[op].kernel(*values)
+            return self._node('const', value=float(result))
+
+        node = Node(op, args, value)
+        return self.nodes.setdefault(node.key, node)
+
+    def _visit(self, tree: ast.AST, expression: str) -> Node:
+        if isinstance(tree, ast.Constant) and isinstance(tree.value, (int, float)) and not isinstance(tree.value, bool):
+            return self._node('const', value=float(tree.value))
+
+        if isinstance(tree, ast.Name):
+            if tree.id in DERIVED_FIELDS:
+                return self._visit(ast.parse(DERIVED_FIELDS[tree.id], mode='eval').body, expression)
+            if tree.id in FUNCTIONS:
+                raise ValueError(f"Function {tree.id} used as a field in expression: {expression}")
+            return self._node('field', value=tree.id)
+
+        if isinstance(tree, ast.UnaryOp) and isinstance(tree.op, (ast.USub, ast.UAdd)):
+            operand = self._visit(tree.operand, expression)
+            return operand if isinstance(tree.op, ast.UAdd) else self._node('neg', (operand,))
+
+        if isinstance(tree, ast.BinOp) and type(tree.op) in self.AST_OPS:
+            left = self._visit(tree.left, expression)
+            right = self._visit(tree.right, expression)
+            return self._node(self.AST_OPS[type(tree.op)], (left, right))
+
+        if isinstance(tree, ast.Compare) and len(tree.ops) == 1 and type(tree.ops[0]) in self.AST_OPS:
+            left = self._visit(tree.left, expression)
+            right = self._visit(tree.comparators[0], expression)
+            return self._node(self.AST_OPS[type(tree.ops[0])], (left, right))
+
+        if isinstance(tree, ast.Call) and isinstance(tree.func, ast.Name) and not tree.keywords:
+            return self._visit_call(tree, expression)
+
+        raise ValueError(f"Unsupported syntax '{ast.unparse(tree)}' in expression: {expression}")
+
+    def _visit_call(self, tree: ast.Call, expression: str) -> Node:
+        name = tree.func.id
+        if name not in FUNCTIONS:
+            raise ValueError(f"Unknown function {name} in expression: {expression}")
+        function = FUNCTIONS[name]
+        expected = function.arity + (1 if function.windowed else 0)
+        if len(tree.args) != expected:
+            raise ValueError(f"Function {name} expects {expected} arguments, got {len(tree.args)} in expression: {expression}")
+
+        args = tuple(self._visit(arg, expression) for arg in tree.args)
+        if function.windowed:
+            window = args[-1]
+            if window.op != 'const' or float(window.value) != int(window.value) or int(window.value) < 1:
+                raise ValueError(f"Window of {name} must be a positive integer in expression: {expression}")
+            if name in ('ts_std', 'ts_cov', 'ts_corr') and int(window.value) < 2:
+                raise ValueError(f"Window of {name} must be at least 2 in expression: {expression}")
+            args = args[:-1] + (self._node('const', value=int(window.value)),)
+        return self._node(name, args)
+
+
+def parse(expression: str) -> Node:
+    """解析表达式为语法树，相同的子表达式共享节点
+
+    Example:
+        node = parse('rank(ts_mean(close, 20) / close) - rank(ts_std(ret, 60))')
+        node.fields()      # ['close']
+        node.lookback      # 60
+    """
+    return _Parser().parse(expression)
+
+
+class ExpressionEngine:
+    """在date x code的宽表上计算表达式
+
+    计算结果按节点key缓存(LRU)，同一个引擎计算多个表达式时，相同的子表达式只计算一次。
+    价格字段停牌日沿用之前的价格、成交量为0，结果在当日没有收盘价的位置为nan。
+
+    Example:
+        data = FactorEngine().load_inputs(['close', 'volume'], SecurityType.Stocks, '2020-01-01', '2024-12-31')
+        engine = ExpressionEngine(data)
+        alpha = engine.evaluate('rank(ts_mean(close, 20) / close) - rank(ts_std(ret, 60))')
+    """
+
+    def __init__(self, data: Dict[str, pd.DataFrame], cache_size: int = 64):
+        """
+        Args:
+            data: 字段 -> DataFrame，index为date，columns为code，以第一个字段的index和columns对齐
+            cache_size: 缓存的中间结果数量上限，每个结果与一个字段的宽表大小相同
+        """
+        if not data:
+            raise ValueError("No input data for expression engine")
+        first = next(iter(data.values()))
+        self.index = first.index
+        self.columns = first.columns
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[str, np.ndarray]' = OrderedDict()
+
+        self.data: Dict[str, np.ndarray] = {}
+        for field, values in data.items():
+            values = values.reindex(index=self.index, columns=self.columns)
+            if field in PRICE_FIELDS:
+                values = values.ffill()
+            elif field == 'volume':
+                values = values.fillna(0).where(values.ffill().notna())
+            self.data[field] = values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+        # 当日没有行情的标的不给出结果
+        self._quoted = data['close'].reindex(index=self.index, columns=self.columns).notna().to_numpy() \
+            if 'close' in data else None
+
+    def evaluate(self, expression: Union[str, Node]) -> pd.DataFrame:
+        """计算表达式
+
+        Returns:
+            DataFrame，index和columns与输入相同
+        """
+        node = parse(expression) if isinstance(expression, str) else expression
+        missing = [field for field in node.fields() if field not in self.data]
+        if missing:
+            raise ValueError(f"Missing input fields {missing} for expression: {node.key}")
+
+        values = self._evaluate(node, {})
+        values = np.broadcast_to(np.asarray(values, dtype=np.float64), (len(self.index), len(self.columns)))
+        values = np.where(np.isfinite(values), values, np.nan)
+        if self._quoted is not None:
+            values = np.where(self._quoted, values, np.nan)
+        return pd.DataFrame(values, index=self.index, columns=self.columns)
+
+    def evaluate_many(self, expressions: Dict[str, str]) -> Dict[str, pd.DataFrame]:
+        """计算多个表达式，共享子表达式的计算结果
+
+        Returns:
+            Dict[str, pd.DataFrame]: 名称 -> 计算结果
+        """
+        return {name: self.evaluate(expression) for name, expression in expressions.items()}
+
+    def clear_cache(self):
+        self._cache.clear()
+
+    def _evaluate(self, node: Node, local: Dict[str, np.ndarray]):
+        """计算节点，local保存本次计算的中间结果，避免计算过程中被缓存淘汰"""
+        if node.op == 'const':
+            return node.value
+        if node.op == 'field':
+            return self.data[node.value]
+        if node.key in local:
+            return local[node.key]
+        if node.key in self._cache:
+            self._cache.move_to_end(node.key)
+            return self._cache[node.key]
+
+        if node.op in FUNCTIONS and FUNCTIONS[node.op].windowed:
+            arrays = [self._array(self._evaluate(arg, local)) for arg in node.args[:-1]]
+            result = FUNCTIONS[node.op].kernel(*arrays, node.args[-1].value)
+        else:
+            args = [self._evaluate(arg, local) for arg in node.args]
+            if node.op in FUNCTIONS and node.op not in ELEMENTWISE:
+                args = [self._array(arg) for arg in args]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if node.op == 'neg':
+                    result = -args[0]
+                elif node.op in BINARY_OPS:
+                    result = self._binary(node.op, *args)
+                else:
+                    result = FUNCTIONS[node.op].kernel(*args)
+
+        local[node.key] = result
+        self._cache[node.key] = result
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def _array(self, value) -> np.ndarray:
+        return np.broadcast_to(np.asarray(value, dtype=np.float64), (len(self.index), len(self.columns)))
+
+    @staticmethod
+    def _binary(op: str, left, right):
+        result = BINARY_OPS[op](left, right)
+        if op in ('+', '-', '*', '/', '**'):
+            return result
+        # 比较和逻辑运算的结果为1.0/0.0，任一侧为nan时为nan
+        return np.where(np.isnan(left) | np.isnan(right), np.nan, result.astype(np.float64))
+
+
+class AlphaFactor(Factor):
+    """由表达式定义的因子，可以与其他因子一样由FactorEngine计算、保存，
+    或通过FactorSelector用于SelectWhere
+
+    Example:
+        alpha = AlphaFactor('alpha_rev', 'rank(ts_mean(close, 20) / close) - rank(ts_std(ret, 60))')
+        bt.algos.SelectWhere(FactorSelector(alpha, top=0.1))
+    """
+
+    def __init__(self, name: str, expression: str):
+        """
+        Args:
+            name: 因子名称
+            expression: 因子表达式，字段为K线字段或估值指标，函数见FUNCTIONS
+        """
+        self.node = parse(expression)
+        super().__init__(name, lookback=self.node.lookback)
+        self.expression = expression
+        self.inputs = self.node.fields()
+
+    def compute(self, data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        return ExpressionEngine(data).evaluate(self.node)
@@ -1 +1,172 @@
 # encoding: utf-8
+from abc import ABC, abstractmethod
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+class Factor(ABC):
+    """因子基类
+
+    因子在date x code的宽表上按整列计算，一次得到全部标的、全部日期的因子值，不逐个标的循环。
+    输入为K线字段(open、high、low、close、volume，后复权)或估值指标字段(如pb、total_mv)，
+    由FactorEngine从本地库读取并对齐为相同形状的宽表。
+    """
+
+    # 计算需要的输入字段
+    inputs: List[str] = []
+
+    def __init__(self, name: str, lookback: int = 0):
+        """
+        Args:
+            name: 因子名称，保存和查询因子值时使用
+            lookback: 计算一个交易日的因子值需要的之前交易日数量，增量更新时据此多读取数据
+        """
+        self.name = name
+        self.lookback = lookback
+
+    @abstractmethod
+    def compute(self, data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """计算因子值
+
+        Args:
+            data: 输入字段 -> DataFrame，index为date，columns为code，所有输入的形状相同
+
+        Returns:
+            DataFrame，index和columns与输入相同，没有因子值的位置为nan
+        """
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.name})"
+
+    @staticmethod
+    def _traded_close(close: pd.DataFrame) -> np.ndarray:
+        """停牌日沿用之前的收盘价，计算收益率时停牌期间价格不变"""
+        return close.ffill().to_numpy(dtype=np.float64)
+
+
+class Momentum(Factor):
+    """动量：过去window个交易日的收益率，可以跳过最近skip个交易日(如12-1月动量)"""
+
+    inputs = ['close']
+
+    def __init__(self, window: int = 20, skip: int = 0):
+        name = f"momentum_{window}" if skip == 0 else f"momentum_{window}_{skip}"
+        super().__init__(name, lookback=window + skip)
+        self.window = window
+        self.skip = skip
+
+    def compute(self, data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        close = data['close']
+        prices = self._traded_close(close)
+        values = np.full(prices.shape, np.nan)
+        n = self.window + self.skip
+        if len(prices) > n:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values[n:] = prices[self.window:len(prices) - self.skip] / prices[:len(prices) - n] - 1
+        # 当天没有行情的标的不给出因子值
+        values[close.isna().to_numpy()] = np.nan
+        return pd.DataFrame(values, index=close.index, columns=close.columns)
+
+
+class Volatility(Factor):
+    """波动率：过去window个交易日对数收益率的年化标准差，停牌日不计入"""
+
+    inputs = ['close']
+
+    # 年化的交易日数量
+    ANNUAL_DAYS = 252
+
+    def __init__(self, window: int = 20):
+        super().__init__(f"volatility_{window}", lookback=window)
+        self.window = window
+
+    def compute(self, data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        close = data['close']
+        prices = self._traded_close(close)
+        returns = np.full(prices.shape, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns[1:] = np.log(prices[1:] / prices[:-1])
+        returns[close.isna().to_numpy()] = np.nan
+
+        returns = pd.DataFrame(returns, index=close.index, columns=close.columns)
+        values = returns.rolling(self.window, min_periods=max(2, self.window // 2)).std() * np.sqrt(self.ANNUAL_DAYS)
+        return values.where(close.notna())
+
+
+class Turnover(Factor):
+    """换手率：过去window个交易日成交量占流通股本比例的均值"""
+
+    inputs = ['volume', 'circ_shares']
+
+    # 数据源的成交量单位为手
+    VOLUME_UNIT = 100
+
+    def __init__(self, window: int = 20):
+        super().__init__(f"turnover_{window}", lookback=window)
+        self.window = window
+
+    def compute(self, data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        volume = data['volume']
+        shares = data['circ_shares'].where(data['circ_shares'] > 0)
+        daily = volume * self.VOLUME_UNIT / shares
+        values = daily.rolling(self.window, min_periods=max(1, self.window // 2)).mean()
+        return values.where(volume.notna())
+
+
+class Value(Factor):
+    """价值：估值倍数的倒数，bp账面市值比、ep盈利收益率、sp销售收益率
+
+    市净率、市销率不为正时没有意义，因子值为nan；亏损公司的ep为负。
+    """
+
+    # 因子名称 -> 估值指标
+    METRICS = {
+        'bp': 'pb',
+        'ep': 'pe_ttm',
+        'sp': 'ps_ttm',
+    }
+
+    def __init__(self, metric: str = 'bp'):
+        if metric not in self.METRICS:
+            raise ValueError(f"Unsupported value metric: {metric}, expected one of {list(self.METRICS)}")
+        super().__init__(metric)
+        self.metric = metric
+        self.inputs = [self.METRICS[metric]]
+
+    def compute(self, data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        multiple = data[self.METRICS[self.metric]]
+        if self.metric == 'ep':
+            multiple = multiple.where(multiple != 0)
+        else:
+            multiple = multiple.where(multiple > 0)
+        return 1 / multiple
+
+
+class Size(Factor):
+    """规模：总市值的自然对数"""
+
+    inputs = ['total_mv']
+
+    def __init__(self):
+        super().__init__('size')
+
+    def compute(self, data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        total_mv = data['total_mv']
+        return np.log(total_mv.where(total_mv > 0))
+
+
+# 定时任务更新的因子
+DEFAULT_FACTORS: List[Factor] = [
+    Momentum(20),
+    Momentum(60),
+    Momentum(250, skip=20),
+    Volatility(20),
+    Volatility(60),
+    Turnover(20),
+    Value('bp'),
+    Value('ep'),
+    Size(),
+]
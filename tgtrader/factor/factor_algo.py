@@ -0,0 +1,132 @@
+# encoding: utf-8
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from tgtrader.common import SecurityType
+from tgtrader.factor.factor import Factor
+from tgtrader.factor.factor_engine import FactorEngine
+
+
+class FactorSignal:
+    """回测时按回测的日期和标的读取因子值
+
+    作为bt.algos.SelectWhere、WeighTarget的参数，algo第一次执行时以target调用一次，
+    按回测的全部日期和标的一次读取因子值，之后每个调仓日只做行选择。
+    factor为因子名称时读取已保存的因子值，为Factor对象时现场计算。
+    """
+
+    def __init__(self,
+                 factor: Union[str, Factor],
+                 security_type: SecurityType = SecurityType.Stocks,
+                 engine: Optional[FactorEngine] = None):
+        """
+        Args:
+            factor: 因子名称或因子对象
+            security_type: 证券类型
+            engine: 因子引擎，默认为FactorEngine()
+        """
+        self.factor = factor
+        self.security_type = security_type
+        self.engine = engine or FactorEngine()
+
+    def load(self, target) -> pd.DataFrame:
+        """读取target回测区间、回测标的的因子值，index和columns与回测的价格矩阵相同
+
+        target.universe只包含当前日期之前的数据，回测区间取策略保存的完整价格矩阵。
+        因子值只使用当日及之前的数据计算，一次读取全部日期不会引入未来数据。
+        """
+        prices = target._original_data
+        dates = prices.index
+        codes = list(prices.columns)
+        start_date = dates[0].strftime('%Y-%m-%d')
+        end_date = dates[-1].strftime('%Y-%m-%d')
+
+        values = self.engine.load_factor(self.factor, self.security_type, start_date, end_date, codes)
+        return values.reindex(index=dates, columns=codes)
+
+    def __call__(self, target) -> pd.DataFrame:
+        return self.load(target)
+
+
+class FactorSelector(FactorSignal):
+    """按因子值排序选择标的，返回SelectWhere使用的布尔矩阵
+
+    Example:
+        algos = [
+            bt.algos.RunMonthly(),
+            bt.algos.SelectWhere(FactorSelector('momentum_20', top=0.1)),
+            bt.algos.WeighEqually(),
+            bt.algos.Rebalance(),
+        ]
+    """
+
+    def __init__(self,
+                 factor: Union[str, Factor],
+                 top: Union[int, float] = 0.2,
+                 ascending: bool = False,
+                 security_type: SecurityType = SecurityType.Stocks,
+                 engine: Optional[FactorEngine] = None):
+        """
+        Args:
+            factor: 因子名称或因子对象
+            top: 选择的数量，小于1时为有因子值标的的比例
+            ascending: True选择因子值最小的标的，False选择因子值最大的标的
+            security_type: 证券类型
+            engine: 因子引擎，默认为FactorEngine()
+        """
+        super().__init__(factor, security_type, engine)
+        self.top = top
+        self.ascending = ascending
+
+    def __call__(self, target) -> pd.DataFrame:
+        return self._select(self.load(target))
+
+    def _select(self, values: pd.DataFrame) -> pd.DataFrame:
+        ranks = values.rank(axis=1, ascending=self.ascending, method='first')
+        if self.top < 1:
+            counts = np.ceil(values.notna().sum(axis=1) * self.top)
+        else:
+            counts = pd.Series(self.top, index=values.index)
+        return ranks.le(counts, axis=0)
+
+
+class FactorWeigher(FactorSelector):
+    """按因子值选择标的并给出目标权重，返回WeighTarget使用的权重矩阵
+
+    选中的标的等权，或按因子值的排序分数加权(排名越靠前权重越大)，未选中的标的为nan。
+
+    Example:
+        algos = [
+            bt.algos.RunMonthly(),
+            bt.algos.WeighTarget(FactorWeigher('bp', top=50, by_score=True)),
+            bt.algos.Rebalance(),
+        ]
+    """
+
+    def __init__(self,
+                 factor: Union[str, Factor],
+                 top: Union[int, float] = 0.2,
+                 ascending: bool = False,
+                 by_score: bool = False,
+                 security_type: SecurityType = SecurityType.Stocks,
+                 engine: Optional[FactorEngine] = None):
+        """
+        Args:
+            by_score: True按排序分数加权，False等权
+            其余参数同FactorSelector
+        """
+        super().__init__(factor, top, ascending, security_type, engine)
+        self.by_score = by_score
+
+    def __call__(self, target) -> pd.DataFrame:
+        values = self.load(target)
+        selected = self._select(values)
+        if self.by_score:
+            # 选中标的中排名最后的分数为1，依次加1
+            ranks = values.rank(axis=1, ascending=not self.ascending, method='first')
+            scores = ranks.where(selected) - ranks.where(selected).min(axis=1).to_numpy()[:, None] + 1
+        else:
+            scores = selected.astype(float).where(selected)
+        return scores.div(scores.sum(axis=1), axis=0)
@@ -0,0 +1,249 @@
+# encoding: utf-8
+from dataclasses import dataclass
+from typing import Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from tgtrader.common import SecurityType
+from tgtrader.data_provider.trading_calendar import TradingCalendar
+from tgtrader.factor.factor import Factor
+from tgtrader.factor.factor_engine import FactorEngine
+
+
+@dataclass
+class FactorReport:
+    """单因子评价结果"""
+    # 各日期的Rank IC，index为date，columns为持有期(交易日数)
+    ic: pd.DataFrame
+    # 各持有期的IC统计：ic_mean、ic_std、icir、t_stat、positive_ratio
+    ic_summary: pd.DataFrame
+    # IC衰减：因子与之后第lag个交易日收益率的平均Rank IC，index为lag
+    ic_decay: pd.Series
+    # 分组组合的日收益率，index为date，columns为分组(1为因子值最小)和long_short(最大组减最小组)
+    quantile_returns: pd.DataFrame
+    # 分组组合的净值
+    quantile_nav: pd.DataFrame
+
+
+class FactorAnalyzer:
+    """单因子评价：Rank IC、IC衰减、分组收益
+
+    因子值和收盘价对齐为date x code矩阵后按整个矩阵计算，不按日期循环：
+    每行排序后逐行求相关系数得到各日期的Rank IC；
+    分组收益按(日期, 分组)一次bincount汇总各组成分股的收益率，得到全部分组的日收益率。
+
+    Example:
+        analyzer = FactorAnalyzer()
+        report = analyzer.analyze('momentum_20', start_date='2020-01-01', end_date='2024-12-31')
+        report.ic_summary
+        report.quantile_nav.plot()
+    """
+
+    # 计算IC的持有期(交易日数)
+    DEFAULT_PERIODS = (1, 5, 10, 20)
+
+    # 计算IC需要的最少有效标的数量
+    MIN_STOCKS = 5
+
+    def __init__(self, engine: Optional[FactorEngine] = None):
+        """
+        Args:
+            engine: 因子引擎，用于读取因子值和收盘价，默认为FactorEngine()
+        """
+        self.engine = engine or FactorEngine()
+
+    def analyze(self,
+                factor: Union[str, Factor, pd.DataFrame],
+                security_type: SecurityType = SecurityType.Stocks,
+                start_date: Optional[str] = None,
+                end_date: Optional[str] = None,
+                symbols: Optional[list] = None,
+                periods: Sequence[int] = DEFAULT_PERIODS,
+                quantiles: int = 5,
+                decay_lags: int = 20,
+                rebalance: int = 1) -> FactorReport:
+        """读取因子值和收盘价并评价因子
+
+        Args:
+            factor: 因子名称(读取已保存的因子值)、因子对象(现场计算)或因子值矩阵(index为date，columns为code)
+            security_type: 证券类型
+            start_date: 开始日期，因子为矩阵时默认为矩阵的第一个日期
+            end_date: 结束日期，因子为矩阵时默认为矩阵的最后一个日期
+            symbols: 标的列表，默认为全部标的
+            periods: 计算IC的持有期
+            quantiles: 分组数量
+            decay_lags: IC衰减计算的最大间隔交易日数
+            rebalance: 分组组合的调仓间隔交易日数
+
+        Returns:
+            FactorReport
+        """
+        if isinstance(factor, pd.DataFrame):
+            values = factor if symbols is None else factor.reindex(columns=symbols)
+            start_date = start_date or values.index[0].strftime('%Y-%m-%d')
+            end_date = end_date or values.index[-1].strftime('%Y-%m-%d')
+        else:
+            if start_date is None or end_date is None:
+                raise ValueError("start_date and end_date are required unless factor values are given")
+            values = self.engine.load_factor(factor, security_type, start_date, end_date, symbols)
+        if values.empty:
+            raise ValueError("Factor has no values in the given range")
+
+        # 多读取之后的收盘价用于计算最后日期的远期收益率
+        calendar = TradingCalendar.get()
+        horizon = max(max(periods), decay_lags, rebalance)
+        last = min(len(calendar.sessions) - 1, calendar.session_index(end_date) + horizon)
+        price_end = pd.Timestamp(calendar.sessions[last]).strftime('%Y-%m-%d')
+        close = self.engine.load_inputs(['close'], security_type, start_date, price_end,
+                                        [str(c) for c in values.columns])['close']
+
+        values = values.loc[pd.Timestamp(start_date[:10]):pd.Timestamp(end_date[:10])]
+        values = values.reindex(index=close.index, columns=close.columns)
+        return self.evaluate(values, close, periods, quantiles, decay_lags, rebalance)
+
+    @classmethod
+    def evaluate(cls,
+                 factor: pd.DataFrame,
+                 close: pd.DataFrame,
+                 periods: Sequence[int] = DEFAULT_PERIODS,
+                 quantiles: int = 5,
+                 decay_lags: int = 20,
+                 rebalance: int = 1) -> FactorReport:
+        """在对齐的矩阵上评价因子
+
+        Args:
+            factor: 因子值，index为date，columns为code，没有因子值的日期为nan
+            close: 收盘价(后复权)，与factor形状相同，可以包含因子最后日期之后的收盘价，停牌为nan
+            其余参数同analyze
+
+        Returns:
+            FactorReport
+        """
+        dates = close.index
+        tradable = close.notna().to_numpy()
+        prices = close.ffill().to_numpy(dtype=np.float64)
+        values = factor.to_numpy(dtype=np.float64, na_value=np.nan)
+        # 当天停牌的标的无法买入，不参与评价
+        values = np.where(tradable, values, np.nan)
+        factor_rows = np.flatnonzero(np.isfinite(values).any(axis=1))
+        if len(factor_rows) == 0:
+            raise ValueError("Factor has no values on trading dates")
+        rows = np.arange(factor_rows[0], factor_rows[-1] + 1)
+
+        # IC：远期收益率在有因子值的标的内排序。价格已向前填充，有因子值(当天可交易)的标的
+        # 远期收益率都有效，因子排序对所有持有期相同，只计算一次
+        valid = np.isfinite(values)
+        factor_rank = cls._rank_rows(values)
+        ic = {}
+        for period in periods:
+            forward = cls._forward_returns(prices, tradable, period)
+            ic[period] = cls._row_corr(factor_rank, cls._rank_rows(np.where(valid, forward, np.nan)))[rows]
+        ic = pd.DataFrame(ic, index=dates[rows])
+        ic.columns.name = 'period'
+
+        # IC衰减：第t行对应t+lag-1日买入的日收益率，与IC相同只在t日有因子值的标的内排序，
+        # lag为1时与持有期1的IC一致。之后停牌的标的没有收益率，这些日期的因子在剩余标的内重新排序
+        daily = cls._forward_returns(prices, tradable, 1)
+        decay = {}
+        for lag in range(1, decay_lags + 1):
+            shifted = np.full(daily.shape, np.nan)
+            shifted[:len(shifted) - lag + 1] = daily[lag - 1:]
+            shifted = np.where(valid, shifted, np.nan)
+            both = np.isfinite(shifted)
+            lag_rank = factor_rank
+            stale = (valid != both).any(axis=1)
+            if stale.any():
+                lag_rank = factor_rank.copy()
+                lag_rank[stale] = cls._rank_rows(np.where(both[stale], values[stale], np.nan))
+            decay[lag] = np.nanmean(cls._row_corr(lag_rank, cls._rank_rows(shifted))[rows])
+        decay = pd.Series(decay, name='ic')
+        decay.index.name = 'lag'
+
+        quantile_returns = cls._quantile_returns(values, factor_rank, daily, rows, dates, quantiles, rebalance)
+        return FactorReport(
+            ic=ic,
+            ic_summary=cls._ic_summary(ic),
+            ic_decay=decay,
+            quantile_returns=quantile_returns,
+            quantile_nav=(1 + quantile_returns.fillna(0)).cumprod(),
+        )
+
+    @classmethod
+    def _quantile_returns(cls,
+                          values: np.ndarray,
+                          factor_rank: np.ndarray,
+                          daily: np.ndarray,
+                          rows: np.ndarray,
+                          dates: pd.DatetimeIndex,
+                          quantiles: int,
+                          rebalance: int) -> pd.DataFrame:
+        """分组组合的日收益率，组内等权
+
+        调仓日按因子值排序分为quantiles组，持有到下一个调仓日；
+        第t个交易日的分组持有到t+1，收益率记在t+1。
+        """
+        count = np.isfinite(values).sum(axis=1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            groups = np.ceil(factor_rank / count * quantiles)
+        groups = np.nan_to_num(groups, nan=0).astype(np.int64)
+
+        # 持有期内沿用调仓日的分组，最后一个因子日期的分组没有持有收益
+        hold = rows[:-1]
+        holding = groups[rows[0] + (hold - rows[0]) // rebalance * rebalance]
+        returns = daily[hold]
+        valid = (holding > 0) & np.isfinite(returns)
+
+        # (日期, 分组)编号后一次汇总全部分组的收益率
+        keys = (np.arange(len(hold))[:, None] * (quantiles + 1) + holding)[valid]
+        size = len(hold) * (quantiles + 1)
+        sums = np.bincount(keys, weights=returns[valid], minlength=size).reshape(len(hold), quantiles + 1)
+        counts = np.bincount(keys, minlength=size).reshape(len(hold), quantiles + 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = sums[:, 1:] / counts[:, 1:]
+
+        result = pd.DataFrame(means, index=dates[hold + 1], columns=pd.RangeIndex(1, quantiles + 1, name='quantile'))
+        result['long_short'] = result[quantiles] - result[1]
+        return result
+
+    @classmethod
+    def _ic_summary(cls, ic: pd.DataFrame) -> pd.DataFrame:
+        mean = ic.mean()
+        std = ic.std()
+        count = ic.count()
+        return pd.DataFrame({
+            'ic_mean': mean,
+            'ic_std': std,
+            'icir': mean / std,
+            't_stat': mean / std * np.sqrt(count),
+            'positive_ratio': (ic > 0).sum() / count,
+        })
+
+    @staticmethod
+    def _forward_returns(prices: np.ndarray, tradable: np.ndarray, period: int) -> np.ndarray:
+        """第t个交易日买入、持有period个交易日的收益率，t日停牌为nan"""
+        forward = np.full(prices.shape, np.nan)
+        if len(prices) > period:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                forward[:-period] = prices[period:] / prices[:-period] - 1
+        forward[~tradable] = np.nan
+        return forward
+
+    @staticmethod
+    def _rank_rows(x: np.ndarray) -> np.ndarray:
+        """逐行排序，nan不参与排序，并列取平均排名"""
+        return pd.DataFrame(x).rank(axis=1).to_numpy()
+
+    @classmethod
+    def _row_corr(cls, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """逐行求相关系数，只使用两侧都有效的位置"""
+        mask = np.isfinite(x) & np.isfinite(y)
+        n = mask.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_mean = np.where(mask, x, 0).sum(axis=1) / n
+            y_mean = np.where(mask, y, 0).sum(axis=1) / n
+            xc = np.where(mask, x - x_mean[:, None], 0)
+            yc = np.where(mask, y - y_mean[:, None], 0)
+            corr = (xc * yc).sum(axis=1) / np.sqrt((xc * xc).sum(axis=1) * (yc * yc).sum(axis=1))
+        corr[n < cls.MIN_STOCKS] = np.nan
+        return corr
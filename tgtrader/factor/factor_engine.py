@@ -0,0 +1,201 @@
+# encoding: utf-8
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from tgtrader.common import MetaType, Period, PriceAdjust, SecurityType
+from tgtrader.data_provider.service.akshare_data_service import AkshareDataService
+from tgtrader.data_provider.trading_calendar import TradingCalendar
+from tgtrader.factor.factor import DEFAULT_FACTORS, Factor
+
+
+class FactorEngine:
+    """因子计算引擎
+
+    从本地K线库和估值表一次读取全部标的的输入字段，对齐为date x code的宽表后计算因子，
+    结果保存到因子表。增量更新时每个因子从已保存的最后日期之后开始，
+    多读取lookback个交易日的数据用于滚动窗口，共享输入的因子只读取一次。
+
+    Example:
+        engine = FactorEngine()
+        engine.update()                                                  # 增量更新DEFAULT_FACTORS
+        momentum = engine.get_factor('momentum_20', SecurityType.Stocks, start_date='2024-01-01')
+    """
+
+    # 没有保存过的因子从该日期开始计算
+    DEFAULT_START_DATE = '2017-01-01'
+
+    # K线表中的字段，其余输入从估值表读取
+    KDATA_FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+    def __init__(self, data_service: Optional[AkshareDataService] = None, adjust: PriceAdjust = PriceAdjust.HFQ):
+        """
+        Args:
+            data_service: 本地数据服务，默认为AkshareDataService
+            adjust: K线的复权方式
+        """
+        self.data_service = data_service or AkshareDataService()
+        self.adjust = adjust
+
+    def compute(self,
+                factors: List[Factor],
+                security_type: SecurityType,
+                start_date: str,
+                end_date: str,
+                symbols: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
+        """计算因子，不保存
+
+        Args:
+            factors: 因子列表
+            security_type: 证券类型
+            start_date: 开始日期，格式为YYYY-MM-DD
+            end_date: 结束日期，格式为YYYY-MM-DD，包含当天
+            symbols: 标的列表，默认为本地K线库中的全部标的
+
+        Returns:
+            Dict[str, pd.DataFrame]: 因子名称 -> 因子值，index为date，columns为code
+        """
+        lookback = max(f.lookback for f in factors)
+        load_start = self._lookback_start(start_date, lookback)
+        inputs = list(dict.fromkeys(field for f in factors for field in f.inputs))
+        data = self.load_inputs(inputs, security_type, load_start, end_date, symbols)
+
+        results = {}
+        for factor in factors:
+            if any(data[field].isna().all().all() for field in factor.inputs):
+                logger.warning(f"No input data for factor {factor.name}, skipped")
+                continue
+            values = factor.compute({field: data[field] for field in factor.inputs})
+            results[factor.name] = values.loc[pd.Timestamp(start_date[:10]):]
+        return results
+
+    def update(self,
+               factors: Optional[List[Factor]] = None,
+               security_type: SecurityType = SecurityType.Stocks,
+               end_date: Optional[str] = None) -> Dict[str, int]:
+        """增量计算并保存因子，每个因子从已保存的最后日期之后开始
+
+        Args:
+            factors: 因子列表，默认为DEFAULT_FACTORS
+            security_type: 证券类型
+            end_date: 结束日期，默认为本地K线的最后日期
+
+        Returns:
+            Dict[str, int]: 因子名称 -> 写入的行数
+        """
+        factors = factors or DEFAULT_FACTORS
+        if end_date is None:
+            meta = self.data_service.get_metadata(
+                MetaType(f"{security_type.value}_{Period.Day.value}_{self.adjust.value}_kdata"))
+            if meta is None:
+                logger.warning(f"No local kdata of {security_type.value}, skip factor update")
+                return {}
+            end_date = meta.end_time[:10]
+
+        end_dates = self.data_service.get_factor_end_dates(security_type)
+        calendar = TradingCalendar.get()
+        starts = {}
+        for factor in factors:
+            last = end_dates.get(factor.name)
+            start = calendar.next_session(last).strftime('%Y-%m-%d') if last else self.DEFAULT_START_DATE
+            if start <= end_date:
+                starts[factor.name] = start
+
+        pending = [f for f in factors if f.name in starts]
+        if not pending:
+            logger.info("All factors are up to date")
+            return {}
+
+        results = self.compute(pending, security_type, min(starts.values()), end_date)
+        counts = {}
+        for name, values in results.items():
+            counts[name] = self.data_service.save_factor_values(name, security_type,
+                                                                values.loc[pd.Timestamp(starts[name]):])
+        logger.info(f"Updated factors of {security_type.value} to {end_date}: {counts}")
+        return counts
+
+    def get_factor(self,
+                   factor_name: str,
+                   security_type: SecurityType = SecurityType.Stocks,
+                   symbols: Optional[List[str]] = None,
+                   start_date: Optional[str] = None,
+                   end_date: Optional[str] = None) -> pd.DataFrame:
+        """读取已保存的因子值
+
+        Returns:
+            DataFrame，index为date，columns为code
+        """
+        return self.data_service.get_factor_values(factor_name, security_type, symbols, start_date, end_date)
+
+    def load_factor(self,
+                    factor: Union[str, Factor],
+                    security_type: SecurityType,
+                    start_date: str,
+                    end_date: str,
+                    symbols: Optional[List[str]] = None) -> pd.DataFrame:
+        """读取因子值，factor为因子名称时读取已保存的因子值，为Factor对象时现场计算
+
+        Returns:
+            DataFrame，index为date，columns为code
+        """
+        if isinstance(factor, Factor):
+            return self.compute([factor], security_type, start_date, end_date, symbols).get(factor.name, pd.DataFrame())
+        return self.get_factor(factor, security_type, symbols, start_date, end_date)
+
+    def load_inputs(self,
+                    fields: List[str],
+                    security_type: SecurityType,
+                    start_date: str,
+                    end_date: str,
+                    symbols: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
+        """读取输入字段并对齐为相同形状的宽表
+
+        日期为K线的交易日，估值指标按日期向前填充到交易日。
+
+        Returns:
+            Dict[str, pd.DataFrame]: 字段 -> DataFrame，index为date，columns为code
+        """
+        if symbols is None:
+            coverage = self.data_service.get_kdata_coverage(None, security_type, Period.Day, self.adjust)
+            symbols = sorted(coverage['code'].astype(str))
+
+        kdata_fields = [f for f in fields if f in self.KDATA_FIELDS]
+        # 交易日由收盘价确定，只需要估值指标时也读取收盘价
+        kdata = self.data_service.query_kdata(symbols, start_date, end_date, security_type,
+                                              Period.Day, self.adjust, kdata_fields or ['close'])
+        dates, codes, matrices = self._to_wide(kdata, kdata_fields or ['close'])
+        data = {field: pd.DataFrame(matrices[field], index=dates, columns=codes) for field in kdata_fields}
+
+        fundamental_fields = [f for f in fields if f not in self.KDATA_FIELDS]
+        if fundamental_fields:
+            fundamentals = self.data_service.query_fundamentals(MetaType.StocksValuation, list(codes),
+                                                                start_date, end_date, fundamental_fields)
+            fundamentals.index = fundamentals.index.set_names(['code', 'date'])
+            fundamental_dates, fundamental_codes, fundamental_matrices = self._to_wide(fundamentals, fundamental_fields)
+            for field in fundamental_fields:
+                values = pd.DataFrame(fundamental_matrices[field], index=fundamental_dates, columns=fundamental_codes)
+                data[field] = values.reindex(index=values.index.union(dates)).ffill().reindex(index=dates, columns=codes)
+
+        return data
+
+    @staticmethod
+    def _to_wide(df: pd.DataFrame, fields: List[str]):
+        """MultiIndex(code, date)的长表转为各字段的date x code矩阵"""
+        dates, date_ids = np.unique(df.index.get_level_values('date').to_numpy(dtype='datetime64[ns]'),
+                                    return_inverse=True)
+        codes, code_ids = np.unique(df.index.get_level_values('code').to_numpy().astype(str), return_inverse=True)
+        matrices = {}
+        for field in fields:
+            matrix = np.full((len(dates), len(codes)), np.nan)
+            matrix[date_ids, code_ids] = df[field].to_numpy(dtype=np.float64, na_value=np.nan)
+            matrices[field] = matrix
+        return pd.DatetimeIndex(dates, name='date'), pd.Index(codes, name='code'), matrices
+
+    @staticmethod
+    def _lookback_start(start_date: str, lookback: int) -> str:
+        """start_date之前lookback个交易日的日期，多取一些交易日以覆盖停牌"""
+        calendar = TradingCalendar.get()
+        index = max(0, calendar.session_index(start_date) - lookback - lookback // 10 - 1)
+        return pd.Timestamp(calendar.sessions[index]).strftime('%Y-%m-%d')
@@ -0,0 +1,396 @@
+# encoding: utf-8
+"""
+策略稳健性分析
+
+基于回测区间的真实行情，用块自助法(block bootstrap)或随机扰动生成大量价格路径，
+在每条路径上运行策略，统计CAGR、最大回撤、夏普比率的分布。
+
+路径按批生成，全部使用NumPy数组运算；支持固定权重的策略直接用矩阵乘法计算净值，
+其余策略在每条路径上运行bt回测，并通过进程池并行。
+使用成交模型的策略，开盘价(相对前一日收盘价的跳空比例)和成交量按与收益相同的原始日期重采样。
+"""
+import enum
+import math
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from tqdm import tqdm
+
+from tgtrader.strategy import StrategyDef
+
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+class ResampleMethod(enum.Enum):
+    """路径生成方式"""
+    # 按连续的收益块有放回抽样，保留截面相关性和短期自相关
+    BlockBootstrap = 'block_bootstrap'
+    # 在原始收益上叠加与各标的波动率成比例的高斯噪声
+    Perturb = 'perturb'
+
+
+def block_bootstrap_returns(returns: np.ndarray,
+                            n_paths: int,
+                            block_size: int,
+                            rng: np.random.Generator) -> np.ndarray:
+    """块自助法生成收益路径
+
+    Args:
+        returns: 原始收益矩阵，shape=(T, N)
+        n_paths: 路径数量
+        block_size: 块长度(交易日)
+        rng: 随机数生成器
+
+    Returns:
+        np.ndarray: shape=(n_paths, T, N)
+    """
+    return returns[block_bootstrap_indices(returns.shape[0], n_paths, block_size, rng)]
+
+
+def block_bootstrap_indices(n_dates: int,
+                            n_paths: int,
+                            block_size: int,
+                            rng: np.random.Generator) -> np.ndarray:
+    """块自助法抽取的原始日期序号，开盘价、成交量等附加数据按相同序号重采样
+
+    Returns:
+        np.ndarray: shape=(n_paths, n_dates)
+    """
+    block_size = max(1, min(block_size, n_dates))
+    n_blocks = math.ceil(n_dates / block_size)
+
+    # 每条路径抽取n_blocks个块起点，展开成日期索引后截断到T
+    starts = rng.integers(0, n_dates - block_size + 1, size=(n_paths, n_blocks))
+    return (starts[:, :, None] + np.arange(block_size)).reshape(n_paths, -1)[:, :n_dates]
+
+
+def perturb_returns(returns: np.ndarray,
+                    n_paths: int,
+                    noise_scale: float,
+                    rng: np.random.Generator) -> np.ndarray:
+    """在原始收益上叠加随机噪声生成收益路径
+
+    Args:
+        returns: 原始收益矩阵，shape=(T, N)
+        n_paths: 路径数量
+        noise_scale: 噪声标准差相对各标的日波动率的倍数
+        rng: 随机数生成器
+
+    Returns:
+        np.ndarray: shape=(n_paths, T, N)
+    """
+    vol = returns.std(axis=0)
+    noise = rng.standard_normal((n_paths,) + returns.shape) * (vol * noise_scale)
+    # 收益不低于-100%，避免价格变成负数
+    return np.maximum(returns[None, :, :] + noise, -0.99)
+
+
+def returns_to_prices(returns: np.ndarray, start_prices: np.ndarray) -> np.ndarray:
+    """将收益路径还原为价格路径
+
+    Args:
+        returns: shape=(n_paths, T, N)，第0个交易日的收益应为0
+        start_prices: 首日价格，shape=(N,)
+
+    Returns:
+        np.ndarray: shape=(n_paths, T, N)
+    """
+    return start_prices * np.cumprod(1.0 + returns, axis=1)
+
+
+def nav_metrics(navs: np.ndarray, years: float) -> pd.DataFrame:
+    """批量计算净值曲线的收益风险指标
+
+    Args:
+        navs: 净值矩阵，shape=(n_paths, T)
+        years: 回测区间长度(年)
+
+    Returns:
+        DataFrame with columns: [cagr, max_drawdown, daily_sharpe]
+    """
+    total_return = navs[:, -1] / navs[:, 0]
+    cagr = np.power(total_return, 1.0 / years) - 1 if years > 0 else np.full(len(navs), np.nan)
+
+    drawdown = navs / np.maximum.accumulate(navs, axis=1) - 1
+    max_drawdown = drawdown.min(axis=1)
+
+    daily_returns = navs[:, 1:] / navs[:, :-1] - 1
+    std = daily_returns.std(axis=1, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std > 0, daily_returns.mean(axis=1) / std * np.sqrt(TRADING_DAYS_PER_YEAR), np.nan)
+
+    return pd.DataFrame({'cagr': cagr, 'max_drawdown': max_drawdown, 'daily_sharpe': sharpe})
+
+
+@dataclass
+class _SimulationState:
+    """进程池子进程共享的模拟参数，通过fork继承，避免序列化策略对象"""
+    strategy: StrategyDef
+    dates: pd.DatetimeIndex
+    columns: List[str]
+    returns: np.ndarray
+    start_prices: np.ndarray
+    availability: np.ndarray
+    weights: Optional[np.ndarray]
+    # 成交模型使用的开盘价相对前一日收盘价的比例、成交量，shape=(T, N)；不使用成交模型时为None
+    gaps: Optional[np.ndarray]
+    volumes: Optional[np.ndarray]
+    start_opens: Optional[np.ndarray]
+    method: ResampleMethod
+    block_size: int
+    noise_scale: float
+    batch_size: int
+    years: float
+
+
+_SIMULATION_STATE: Optional[_SimulationState] = None
+
+
+def _generate_returns(state: _SimulationState, n_paths: int, rng: np.random.Generator):
+    """生成收益路径
+
+    Returns:
+        (收益路径 shape=(n_paths, T, N)，各路径每日对应的原始日期序号 shape=(n_paths, T))
+    """
+    n_dates = len(state.returns)
+    if state.method == ResampleMethod.BlockBootstrap:
+        idx = block_bootstrap_indices(n_dates - 1, n_paths, state.block_size, rng) + 1
+        returns = state.returns[idx]
+    elif state.method == ResampleMethod.Perturb:
+        idx = np.broadcast_to(np.arange(1, n_dates), (n_paths, n_dates - 1))
+        returns = perturb_returns(state.returns[1:], n_paths, state.noise_scale, rng)
+    else:
+        raise ValueError(f"Unsupported resample method: {state.method}")
+
+    # 首日收益为0，价格路径从真实首日价格出发
+    first = np.zeros((n_paths, 1, returns.shape[2]))
+    idx = np.concatenate([np.zeros((n_paths, 1), dtype=idx.dtype), idx], axis=1)
+    return np.concatenate([first, returns], axis=1), idx
+
+
+def _execution_paths(state: _SimulationState, prices: np.ndarray, idx: np.ndarray) -> Optional[dict]:
+    """按路径的原始日期序号重采样开盘价和成交量
+
+    开盘价为路径前一日收盘价乘以原始日期的跳空比例，停牌(原始开盘价为nan)的日期保持为nan。
+    """
+    if state.gaps is None and state.volumes is None:
+        return None
+
+    execution = {}
+    if state.gaps is not None:
+        opens = np.empty(prices.shape)
+        opens[:, 1:] = prices[:, :-1] * state.gaps[idx[:, 1:]]
+        opens[:, 0] = state.start_opens
+        execution['open'] = opens
+    if state.volumes is not None:
+        execution['volume'] = state.volumes[idx]
+    return execution
+
+
+def _simulate_batch(state: _SimulationState, n_paths: int, rng: np.random.Generator) -> pd.DataFrame:
+    returns, idx = _generate_returns(state, n_paths, rng)
+
+    if state.weights is not None:
+        # 每日再平衡的固定权重组合：组合收益即收益矩阵与权重的乘积
+        port_returns = returns @ state.weights
+        navs = np.cumprod(1.0 + port_returns, axis=1)
+        return nav_metrics(navs, state.years)
+
+    prices = returns_to_prices(returns, state.start_prices)
+    # 保留原始数据中标的尚无行情的位置
+    prices = np.where(state.availability, prices, np.nan)
+    execution = _execution_paths(state, prices, idx)
+
+    navs = []
+    for i, path in enumerate(prices):
+        additional_data = None
+        if execution is not None:
+            additional_data = {field: pd.DataFrame(values[i], index=state.dates, columns=state.columns)
+                               for field, values in execution.items()}
+        result = state.strategy._run_prices(pd.DataFrame(path, index=state.dates, columns=state.columns),
+                                            additional_data=additional_data)
+        navs.append(result.prices.iloc[:, 0].values)
+
+    return nav_metrics(np.vstack(navs), state.years)
+
+
+def _simulate_chunk(seed: np.random.SeedSequence, n_paths: int) -> pd.DataFrame:
+    state = _SIMULATION_STATE
+    rng = np.random.default_rng(seed)
+
+    results = []
+    for start in range(0, n_paths, state.batch_size):
+        results.append(_simulate_batch(state, min(state.batch_size, n_paths - start), rng))
+
+    return pd.concat(results, ignore_index=True)
+
+
+@dataclass
+class MonteCarloResult:
+    """蒙特卡洛模拟结果"""
+    # 每条路径的指标
+    metrics: pd.DataFrame
+    # 真实行情下的指标
+    baseline: pd.Series
+
+    def summary(self, quantiles: tuple = (0.05, 0.25, 0.5, 0.75, 0.95)) -> pd.DataFrame:
+        """指标分布的分位数，以及真实行情下指标在模拟分布中的分位"""
+        summary = self.metrics.quantile(list(quantiles)).T
+        summary.columns = [f"q{int(q * 100)}" for q in quantiles]
+        summary['mean'] = self.metrics.mean()
+        summary['std'] = self.metrics.std()
+        summary['baseline'] = self.baseline
+        summary['baseline_pct_rank'] = (self.metrics < self.baseline).mean()
+        return summary
+
+
+class StrategyMonteCarlo:
+    """策略的蒙特卡洛/自助法稳健性分析
+
+    Example:
+        mc = StrategyMonteCarlo(strategy, '2020-01-01', '2024-01-01')
+        result = mc.run(n_paths=10000, method=ResampleMethod.BlockBootstrap, block_size=20)
+        result.summary()
+    """
+    def __init__(self, strategy: StrategyDef, start_date: str, end_date: str):
+        self.strategy = strategy
+        self.start_date = start_date
+        self.end_date = end_date
+        self.prices: Optional[pd.DataFrame] = None
+        # 成交模型需要的开盘价、成交量矩阵
+        self.execution_data: Optional[dict] = None
+
+    def load_prices(self) -> pd.DataFrame:
+        """获取回测区间的价格矩阵，只获取一次"""
+        if self.prices is None:
+            df = self.strategy._load_data(self.start_date, self.end_date)
+            self.prices = self.strategy._get_price_matrix(df)
+            self.execution_data = self.strategy._get_execution_data(df)
+        return self.prices
+
+    def run(self,
+            n_paths: int = 1000,
+            method: ResampleMethod = ResampleMethod.BlockBootstrap,
+            block_size: int = 20,
+            noise_scale: float = 0.5,
+            n_workers: Optional[int] = None,
+            batch_size: int = 256,
+            seed: Optional[int] = None) -> MonteCarloResult:
+        """运行模拟
+
+        Args:
+            n_paths: 路径数量
+            method: 路径生成方式
+            block_size: 块自助法的块长度(交易日)
+            noise_scale: 随机扰动的噪声倍数
+            n_workers: 进程数，默认为CPU核数，1表示在当前进程中运行
+            batch_size: 每批生成的路径数，控制内存占用
+            seed: 随机种子
+
+        Returns:
+            MonteCarloResult
+        """
+        global _SIMULATION_STATE
+
+        prices = self.load_prices()
+        if len(prices) < 2:
+            raise ValueError("回测区间内的行情数据不足，无法生成路径")
+
+        values = prices.values.astype(float)
+        availability = ~np.isnan(values)
+        returns = np.nan_to_num(prices.pct_change().values, nan=0.0, posinf=0.0, neginf=0.0)
+        # 首日价格：以各标的第一个有效价格作为起点
+        start_prices = prices.bfill().iloc[0].values.astype(float)
+
+        weights = self.strategy.vectorized_weights(list(prices.columns))
+        if weights is not None:
+            logger.info("strategy supports vectorized nav, skipping per-path backtest")
+            weights = weights.values.astype(float)
+
+        gaps = volumes = start_opens = None
+        if self.execution_data is not None:
+            gaps, volumes, start_opens = self._execution_arrays(prices)
+
+        years = (prices.index[-1] - prices.index[0]).days / 365.25
+        _SIMULATION_STATE = _SimulationState(
+            strategy=self.strategy,
+            dates=prices.index,
+            columns=list(prices.columns),
+            returns=returns,
+            start_prices=start_prices,
+            availability=availability,
+            weights=weights,
+            gaps=gaps,
+            volumes=volumes,
+            start_opens=start_opens,
+            method=method,
+            block_size=block_size,
+            noise_scale=noise_scale,
+            batch_size=batch_size,
+            years=years
+        )
+
+        baseline_navs = self._baseline_nav(prices, returns, weights)
+        baseline = nav_metrics(baseline_navs[None, :], years).iloc[0]
+
+        n_workers = n_workers or os.cpu_count() or 1
+        # 子进程通过fork继承模拟参数，不支持fork的平台在当前进程中运行
+        if n_workers > 1 and 'fork' not in mp.get_all_start_methods():
+            logger.warning("fork start method is unavailable, running simulation in current process")
+            n_workers = 1
+
+        # 每个任务分配独立的随机种子，保证结果可复现
+        n_chunks = min(n_paths, n_workers * 4) if n_workers > 1 else 1
+        chunk_sizes = [len(c) for c in np.array_split(np.arange(n_paths), n_chunks)]
+        seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+
+        try:
+            if n_workers == 1:
+                results = [_simulate_chunk(s, n) for s, n in tqdm(list(zip(seeds, chunk_sizes)), desc="Monte Carlo")]
+            else:
+                with ProcessPoolExecutor(max_workers=n_workers, mp_context=mp.get_context('fork')) as executor:
+                    futures = executor.map(_simulate_chunk, seeds, chunk_sizes)
+                    results = list(tqdm(futures, total=n_chunks, desc="Monte Carlo"))
+        finally:
+            _SIMULATION_STATE = None
+
+        metrics = pd.concat(results, ignore_index=True)
+        return MonteCarloResult(metrics=metrics, baseline=baseline)
+
+    def _baseline_nav(self, prices: pd.DataFrame, returns: np.ndarray, weights: Optional[np.ndarray]) -> np.ndarray:
+        """真实行情下的净值，与路径使用相同的计算方式
+
+        Args:
+            prices: 价格矩阵
+            returns: 价格矩阵的日收益率
+            weights: 固定权重，为None时运行bt回测
+        """
+        if weights is not None:
+            port_returns = returns @ weights
+            return np.cumprod(1.0 + port_returns)
+
+        result = self.strategy._run_prices(prices, additional_data=self.execution_data)
+        return result.prices.iloc[:, 0].values
+
+    def _execution_arrays(self, prices: pd.DataFrame):
+        """成交模型数据转换为按价格矩阵对齐的数组：(开盘跳空比例, 成交量, 首日开盘价)，缺少的数据为None"""
+        gaps = volumes = start_opens = None
+        opens = self.execution_data.get('open')
+        if opens is not None:
+            opens = opens.reindex(index=prices.index, columns=prices.columns).values.astype(float)
+            prev_close = prices.ffill().shift(1).values.astype(float)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                gaps = opens / prev_close
+            start_opens = opens[0]
+
+        volumes = self.execution_data.get('volume')
+        if volumes is not None:
+            volumes = volumes.reindex(index=prices.index, columns=prices.columns).values.astype(float)
+        return gaps, volumes, start_opens
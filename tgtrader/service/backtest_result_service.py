@@ -0,0 +1,179 @@
+# encoding: utf-8
+import dataclasses
+import glob
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Optional
+
+import duckdb
+import pandas as pd
+from loguru import logger
+
+from tgtrader.common import Period
+from tgtrader.data_provider.dao.akshare.common import main_db
+from tgtrader.data_provider.dao.akshare.t_meta import T_Meta
+from tgtrader.strategy import BacktestResult, PerformanceStats, StrategyDef
+from tgtrader.utils.db_path_utils import get_backtest_result_dir
+
+
+class BacktestResultService:
+    """回测结果存储服务
+
+    回测结果(净值、持仓权重、交易记录、统计指标)以Parquet文件保存，
+    目录名为 {配置hash}_{数据版本}：配置或行情数据更新后会重新回测，否则直接读取已保存的结果。
+    """
+
+    # 结果中的各张表
+    TABLES = ('prices', 'weights', 'transactions', 'stats')
+
+    @classmethod
+    def config_hash(cls, config_json: str, start_date: str, end_date: Optional[str] = None) -> str:
+        """计算回测配置的hash
+
+        Args:
+            config_json: 策略配置JSON
+            start_date: 回测开始日期
+            end_date: 回测结束日期，None表示回测到最新数据
+
+        Returns:
+            str: 配置hash
+        """
+        config = json.loads(config_json)
+        key = json.dumps({
+            'config': config,
+            'start_date': start_date,
+            'end_date': end_date or 'latest'
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+    @classmethod
+    def data_version(cls, strategy: StrategyDef) -> int:
+        """策略所用行情数据的版本，取相关日线元数据的最近更新时间
+
+        Args:
+            strategy: 策略
+
+        Returns:
+            int: 数据版本，无元数据时为0
+        """
+        security_types = [security_type.value for security_type in strategy.symbols.keys()]
+        if not security_types:
+            return 0
+
+        with main_db:
+            metas = T_Meta.select().where(
+                (T_Meta.security_type.in_(security_types)) &
+                (T_Meta.period == Period.Day.value)
+            )
+            versions = [meta.update_time for meta in metas]
+
+        return max(versions) if versions else 0
+
+    @classmethod
+    def get_or_run(cls,
+                   strategy: StrategyDef,
+                   config_json: str,
+                   start_date: str,
+                   end_date: Optional[str] = None) -> BacktestResult:
+        """读取已保存的回测结果，不存在或已过期时运行回测并保存
+
+        Args:
+            strategy: 策略
+            config_json: 策略配置JSON
+            start_date: 回测开始日期
+            end_date: 回测结束日期，None表示回测到今天
+
+        Returns:
+            BacktestResult: 回测结果，同时加载到strategy中
+        """
+        config_hash = cls.config_hash(config_json, start_date, end_date)
+        version = cls.data_version(strategy)
+
+        result = cls.load(config_hash, version)
+        if result is not None:
+            logger.info(f"load backtest result from store, config_hash: {config_hash}, data_version: {version}")
+            strategy.load_result(result)
+            return result
+
+        strategy.backtest(start_date, end_date or datetime.now().strftime('%Y-%m-%d'))
+        result = strategy.get_result()
+        cls.save(config_hash, version, result)
+
+        return result
+
+    @classmethod
+    def save(cls, config_hash: str, data_version: int, result: BacktestResult):
+        """保存回测结果，并删除同一配置的旧版本结果"""
+        result_dir = cls._get_result_dir(config_hash, data_version)
+        tmp_dir = f"{result_dir}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        tables = {
+            'prices': result.prices.rename_axis('date').reset_index(),
+            'weights': result.weights.rename_axis('date').reset_index(),
+            'transactions': result.transactions,
+            'stats': pd.DataFrame([dataclasses.asdict(result.stats)]),
+        }
+
+        con = duckdb.connect()
+        try:
+            for name, df in tables.items():
+                if df.empty and len(df.columns) == 0:
+                    continue
+                df.columns = [str(c) for c in df.columns]
+                con.register(name, df)
+                con.execute(f"COPY {name} TO '{os.path.join(tmp_dir, name)}.parquet' (FORMAT PARQUET)")
+                con.unregister(name)
+        finally:
+            con.close()
+
+        # 写完后整体替换，读取时不会看到写了一半的结果
+        for old_dir in glob.glob(os.path.join(get_backtest_result_dir(), f"{config_hash}_*")):
+            if old_dir != tmp_dir:
+                shutil.rmtree(old_dir, ignore_errors=True)
+        os.rename(tmp_dir, result_dir)
+
+        logger.info(f"saved backtest result to {result_dir}")
+
+    @classmethod
+    def load(cls, config_hash: str, data_version: int) -> Optional[BacktestResult]:
+        """读取回测结果，不存在时返回None"""
+        result_dir = cls._get_result_dir(config_hash, data_version)
+        if not os.path.exists(os.path.join(result_dir, 'prices.parquet')):
+            return None
+
+        con = duckdb.connect()
+        try:
+            tables = {}
+            for name in cls.TABLES:
+                path = os.path.join(result_dir, f"{name}.parquet")
+                if os.path.exists(path):
+                    tables[name] = con.execute(f"SELECT * FROM read_parquet('{path}')").df()
+                else:
+                    tables[name] = pd.DataFrame()
+        finally:
+            con.close()
+
+        stats = PerformanceStats(**tables['stats'].iloc[0].to_dict())
+        weights = tables['weights']
+        if not weights.empty:
+            weights = weights.set_index('date')
+
+        return BacktestResult(prices=tables['prices'].set_index('date'),
+                              stats=stats,
+                              weights=weights,
+                              transactions=tables['transactions'])
+
+    @classmethod
+    def delete(cls, config_hash: str):
+        """删除某个配置的全部回测结果"""
+        for result_dir in glob.glob(os.path.join(get_backtest_result_dir(), f"{config_hash}_*")):
+            shutil.rmtree(result_dir, ignore_errors=True)
+
+    @classmethod
+    def _get_result_dir(cls, config_hash: str, data_version: int) -> str:
+        return os.path.join(get_backtest_result_dir(), f"{config_hash}_{data_version}")
@@ -1,7 +1,182 @@
 # encoding: utf-8
+import bisect
+import difflib
+import threading
+import time
+from typing import Dict, List, Optional
+
+import pandas as pd
+from loguru import logger
+
 from tgtrader.common import SecurityType
+from tgtrader.data_provider.service.akshare_data_service import AkshareDataService
+
+
+class SymbolIndex:
+    """证券列表的内存索引，支持代码、名称的前缀查找和名称的模糊查找"""
+
+    def __init__(self, symbols: pd.DataFrame):
+        """
+        Args:
+            symbols: DataFrame with columns: [code, name, list_date, delist_date]
+        """
+        self.symbols = symbols.reset_index(drop=True)
+        self.codes: List[str] = self.symbols['code'].tolist()
+        self.names: List[str] = self.symbols['name'].tolist()
+
+        # 按代码、名称排序的(键, 行号)，前缀查找时用bisect定位区间
+        self._code_keys = sorted((code, i) for i, code in enumerate(self.codes))
+        self._name_keys = sorted((name.lower(), i) for i, name in enumerate(self.names))
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    @staticmethod
+    def _prefix_range(keys: list, prefix: str) -> List[int]:
+        start = bisect.bisect_left(keys, (prefix,))
+        end = bisect.bisect_left(keys, (prefix + '\uffff',))
+        return [i for _, i in keys[start:end]]
+
+    def search(self, keyword: str, limit: int = 20) -> List[int]:
+        """查找证券，依次为代码前缀、名称前缀、名称包含、名称相似的匹配
+
+        Returns:
+            List[int]: 匹配的行号，按匹配优先级排序
+        """
+        keyword = keyword.strip().lower()
+        if not keyword:
+            return []
+
+        matched = []
+        seen = set()
+
+        def add(rows: List[int]):
+            for row in rows:
+                if row not in seen and len(matched) < limit:
+                    seen.add(row)
+                    matched.append(row)
+
+        add(self._prefix_range(self._code_keys, keyword))
+        add(self._prefix_range(self._name_keys, keyword))
+        if len(matched) < limit:
+            add([i for i, name in enumerate(self.names) if keyword in name.lower()])
+        if len(matched) < limit:
+            lower_names = [name.lower() for name in self.names]
+            close = difflib.get_close_matches(keyword, lower_names, n=limit, cutoff=0.5)
+            add([i for name in close for i in self._prefix_range(self._name_keys, name) if self.names[i].lower() == name])
+        return matched
+
 
 class SymbolService:
+    """证券列表服务
+
+    证券列表保存在t_symbol_master表中，由数据源定期刷新，读取时使用进程内缓存，
+    不再每次请求实时行情接口。缓存超过CACHE_TTL后从数据库重新加载，
+    以获取其他进程(如定时同步任务)刷新的结果。
+    """
+
+    # 进程内缓存的有效期(秒)
+    CACHE_TTL = 600
+
+    # 距离上次从数据源刷新超过该时间(秒)后需要重新刷新
+    REFRESH_INTERVAL = 24 * 3600
+
+    _data_service = AkshareDataService()
+    _cache: Dict[SecurityType, SymbolIndex] = {}
+    _loaded_at: Dict[SecurityType, float] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_index(cls, security_type: SecurityType) -> SymbolIndex:
+        """证券列表的内存索引，缓存过期时从数据库重新加载"""
+        with cls._lock:
+            index = cls._cache.get(security_type)
+            if index is not None and time.monotonic() - cls._loaded_at[security_type] < cls.CACHE_TTL:
+                return index
+
+            symbols = cls._data_service.get_symbol_master(security_type)
+            index = SymbolIndex(symbols)
+            cls._cache[security_type] = index
+            cls._loaded_at[security_type] = time.monotonic()
+            return index
+
+    @classmethod
+    def get_all_symbols(cls, security_type: SecurityType, include_delisted: bool = False) -> pd.DataFrame:
+        """获取所有证券代码
+
+        Args:
+            security_type: 证券类型
+            include_delisted: 是否包含已退市的证券
+
+        Returns:
+            DataFrame with columns: [code, name, list_date, delist_date]
+        """
+        symbols = cls.get_index(security_type).symbols
+        if not include_delisted:
+            symbols = symbols[symbols['delist_date'].isna()]
+        return symbols[['code', 'name', 'list_date', 'delist_date']].reset_index(drop=True)
+
+    @classmethod
+    def needs_refresh(cls, security_type: SecurityType) -> bool:
+        """证券列表为空或距离上次从数据源刷新超过REFRESH_INTERVAL"""
+        symbols = cls.get_index(security_type).symbols
+        if symbols.empty:
+            return True
+        return time.time() * 1000 - symbols['update_time'].max() > cls.REFRESH_INTERVAL * 1000
+
+    @classmethod
+    def save_symbols(cls, security_type: SecurityType, symbols: pd.DataFrame) -> int:
+        """保存从数据源获取的证券列表，并使缓存失效
+
+        Args:
+            security_type: 证券类型
+            symbols: DataFrame with columns: [code, name]，可选列list_date, delist_date
+
+        Returns:
+            int: 写入的证券数量
+        """
+        count = cls._data_service.save_symbol_master(symbols, security_type)
+        cls.invalidate(security_type)
+        return count
+
+    @classmethod
+    def invalidate(cls, security_type: Optional[SecurityType] = None):
+        """清除进程内缓存，None表示全部证券类型"""
+        with cls._lock:
+            for key in [security_type] if security_type else list(cls._cache.keys()):
+                cls._cache.pop(key, None)
+                cls._loaded_at.pop(key, None)
+
+    @classmethod
+    def search(cls, keyword: str, security_type: Optional[SecurityType] = None, limit: int = 20) -> pd.DataFrame:
+        """按代码或名称查找证券，支持前缀和模糊匹配
+
+        Args:
+            keyword: 代码或名称关键字
+            security_type: 证券类型，None表示股票和ETF
+            limit: 最多返回的数量
+
+        Returns:
+            DataFrame with columns: [security_type, code, name, list_date, delist_date]
+        """
+        security_types = [security_type] if security_type else [SecurityType.Stocks, SecurityType.ETF]
+        dfs = []
+        for st in security_types:
+            index = cls.get_index(st)
+            rows = index.search(keyword, limit)
+            df = index.symbols.iloc[rows][['code', 'name', 'list_date', 'delist_date']]
+            dfs.append(df.assign(security_type=st.value))
+
+        result = pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+        return result[['security_type', 'code', 'name', 'list_date', 'delist_date']].head(limit)
+
     @classmethod
-    def get_all_symbols(cls, security_type: SecurityType):
-        pass
+    def get_name(cls, code: str, security_type: SecurityType) -> Optional[str]:
+        """证券名称，不存在时返回None"""
+        index = cls.get_index(security_type)
+        rows = SymbolIndex._prefix_range(index._code_keys, code)
+        for row in rows:
+            if index.codes[row] == code:
+                return index.names[row]
+        logger.debug(f"Symbol {code} not found in {security_type.value} symbol master")
+        return None
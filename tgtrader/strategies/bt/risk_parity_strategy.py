@@ -7,12 +7,13 @@ TargetWeightStrategy
 import pandas as pd
 from tgtrader import bt
 from tgtrader.bt.core import Algo
+from tgtrader.bt.execution import ExecutionModel
 from tgtrader.data import DataGetter
 from tgtrader.strategies.bt.strategy_bt import BtStrategy
 from tgtrader.strategy import RebalancePeriod, strategy_def
 from tgtrader.data import DataGetter, DEFAULT_DATA_PROVIDER
 from tgtrader.common import SecurityType
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import json
 from pydantic import Field
 from tgtrader.strategy_config import StrategyConfig, strategy_config_def
@@ -36,7 +37,9 @@ class RiskParityStrategy(BtStrategy):
                  integer_positions: bool = True, 
                  commissions = lambda q, p: 0.0,
                  backtest_field: str = 'close',
-                 initial_capital: float = 1000000.0):
+                 initial_capital: float = 1000000.0,
+                 execution_model: Optional[ExecutionModel] = None,
+                 lot_sizes: Optional[Dict[str, int]] = None):
         super().__init__(name="RiskParityStrategy", 
                          symbols=symbols, 
                          rebalance_period=rebalance_period, 
@@ -44,7 +47,9 @@ class RiskParityStrategy(BtStrategy):
                          integer_positions=integer_positions, 
                          commissions=commissions,
                          backtest_field=backtest_field,
-                         initial_capital=initial_capital)
+                         initial_capital=initial_capital,
+                         execution_model=execution_model,
+                         lot_sizes=lot_sizes)
 
     def _get_algos(self) -> list[Algo]:
         if self.rebalance_period == RebalancePeriod.Daily:
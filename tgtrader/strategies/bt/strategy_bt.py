@@ -2,16 +2,40 @@
 
 
 from abc import abstractmethod
-from typing import Dict
+from typing import Dict, Optional
 import pandas as pd
 from tgtrader import bt
 from tgtrader.bt.core import Algo
+from tgtrader.bt.execution import ExecutionModel, lot_sizes as get_lot_sizes
 from tgtrader.common import SecurityType, RebalancePeriod
 from tgtrader.data import DEFAULT_DATA_PROVIDER, DataGetter
-from tgtrader.strategy import StrategyDef
+from tgtrader.strategy import BacktestResult, StrategyDef
 
 
 
+# A股、ETF的交易单位为100股(1手)
+BOARD_LOT_SIZES = {
+    SecurityType.Stocks: 100,
+    SecurityType.ETF: 100,
+}
+
+
+def board_lot_sizes(symbols: Dict[SecurityType, list[str]]) -> Dict[str, int]:
+    """按证券类型生成每手股数
+
+    Args:
+        symbols: 证券类型及对应的代码列表
+
+    Returns:
+        Dict[str, int]: code到每手股数的映射，未知类型按1股处理
+    """
+    return {
+        code: BOARD_LOT_SIZES.get(security_type, 1)
+        for security_type, codes in symbols.items()
+        for code in codes
+    }
+
+
 """
 以下是具体的策略的实现
 """
@@ -24,23 +48,96 @@ class BtStrategy(StrategyDef):
                  integer_positions: bool = True,
                  commissions = lambda q, p: 0.0,
                  backtest_field: str = 'close',
-                 initial_capital: float = 1000000.0):
+                 initial_capital: float = 1000000.0,
+                 execution_model: Optional[ExecutionModel] = None,
+                 lot_sizes: Optional[Dict[str, int]] = None):
         super().__init__(name, symbols, rebalance_period, data_getter, initial_capital)
         self.integer_positions = integer_positions
         self.commissions = commissions
         self.backtest_field = backtest_field
+        # 成交模型，为None时按当前价格立即成交
+        self.execution_model = execution_model
+        # 每手股数，key为code，整数持仓时按整手取整；默认按1股取整，与已保存的回测结果一致，
+        # 按A股交易单位回测时传入board_lot_sizes(symbols)
+        self.lot_sizes = lot_sizes
+
+    def _load_price_matrix(self, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        # 不需要成交模型时直接从价格矩阵快照切片，不获取和透视长表；
+        # 子类自定义了行情获取或价格矩阵转换时仍走_load_data
+        if (self.execution_model is not None
+                or not isinstance(self.data_getter, DataGetter)
+                or type(self)._load_data is not StrategyDef._load_data
+                or type(self)._get_price_matrix is not BtStrategy._get_price_matrix):
+            return None
+
+        prices = pd.concat([
+            self.data_getter.get_price_matrix(symbols, start_date, end_date, security_type, self.backtest_field)
+            for security_type, symbols in self.symbols.items()
+        ], axis=1)
+        return prices.sort_index().ffill()
 
     def _run(self, df: pd.DataFrame):
+        return self._run_prices(self._get_price_matrix(df),
+                                progress_bar=True,
+                                additional_data=self._get_execution_data(df))
+
+    def _get_price_matrix(self, df: pd.DataFrame) -> pd.DataFrame:
         df = df[[self.backtest_field]]
         df = pd.pivot_table(df, index='date', columns='code', values=self.backtest_field)
 
-        df = df.fillna(method='ffill')
+        return df.fillna(method='ffill')
+
+    def _get_execution_data(self, df: pd.DataFrame) -> Optional[dict]:
+        """成交模型需要的开盘价、成交量矩阵
+
+        停牌日不做前值填充，成交模型据此跳过无法成交的交易日
+        """
+        if self.execution_model is None:
+            return None
+
+        return {
+            field: pd.pivot_table(df, index='date', columns='code', values=field)
+            for field in ['open', 'volume'] if field in df.columns
+        }
 
-        s = bt.Strategy(self.name, self._get_algos())
-        t = bt.Backtest(s, df, integer_positions=self.integer_positions, commissions=self.commissions, progress_bar=True)
-        ret = bt.run(t)
+    def _run_prices(self, prices: pd.DataFrame, progress_bar: bool = False, additional_data: Optional[dict] = None):
+        lot_sizes = self._get_lot_sizes()
+        if lot_sizes:
+            additional_data = dict(additional_data or {})
+            additional_data['lot_size'] = get_lot_sizes(prices.columns, overrides=lot_sizes)
 
-        return ret
+        s = self._build_strategy()
+        t = bt.Backtest(s, prices,
+                        integer_positions=self.integer_positions,
+                        commissions=self.commissions,
+                        progress_bar=progress_bar,
+                        additional_data=additional_data,
+                        execution_model=self.execution_model)
+        if progress_bar:
+            return bt.run(t)
+
+        # 批量回测时不输出进度条
+        t.run()
+        return bt.backtest.Result(t)
+
+    def _build_strategy(self) -> bt.Strategy:
+        return bt.Strategy(self.name, self._get_algos())
+
+    def _get_lot_sizes(self) -> Optional[Dict[str, int]]:
+        return self.lot_sizes
+
+    def get_result(self) -> BacktestResult:
+        if self.backtest_result is None:
+            return super().get_result()
+
+        backtest = self.backtest_result.backtests[self.name]
+        transactions = backtest.strategy.get_transactions().reset_index()
+        transactions.columns = ['date', 'code', 'price', 'quantity']
+
+        return BacktestResult(prices=self.get_prices(),
+                              stats=self.performance_stats(),
+                              weights=backtest.security_weights,
+                              transactions=transactions)
 
     @abstractmethod
     def _get_algos(self) -> list[Algo]:
@@ -56,26 +153,24 @@ class BtTreeStrategy(BtStrategy):
                  integer_positions: bool = True,
                  commissions = lambda q, p: 0.0,
                  backtest_field: str = 'close',
-                 initial_capital: float = 1000000.0):
-        super().__init__(name, symbols, rebalance_period, data_getter, initial_capital, integer_positions, commissions, backtest_field)
+                 initial_capital: float = 1000000.0,
+                 execution_model: Optional[ExecutionModel] = None,
+                 lot_sizes: Optional[Dict[str, int]] = None):
+        super().__init__(name, symbols, rebalance_period, data_getter, integer_positions, commissions, backtest_field,
+                         initial_capital, execution_model, lot_sizes)
         self.strategies: list[BtStrategy] = []
 
     def add_strategy(self, strategy: BtStrategy):
         self.strategies.append(strategy)
 
-    def _run(self, df: pd.DataFrame):
-        df = df[self.backtest_field]
-        df = pd.pivot_table(df, index='date', columns='code', values=self.backtest_field)
+    def _build_strategy(self) -> bt.Strategy:
+        children = [bt.Strategy(strategy.name, strategy._get_algos()) for strategy in self.strategies]
+        return bt.Strategy(self.name, self._get_algos(), children=children)
 
-        df = df.fillna(method='ffill')
-    
-        strats_list = []
+    def _get_lot_sizes(self) -> Optional[Dict[str, int]]:
+        # 子策略的标的使用子策略的每手股数，组合自身的设置优先
+        lot_sizes = {}
         for strategy in self.strategies:
-            strats = bt.Strategy(strategy.name, strategy.get_algos())
-            strats_list.append(strats)
-
-        s = bt.Strategy(self.name, self.get_algos(), children=strats_list)
-        t = bt.Backtest(s, df, integer_positions=self.integer_positions, commissions=self.commissions, progress_bar=True)
-        ret = bt.run(t)
-
-        return ret
+            lot_sizes.update(strategy.lot_sizes or {})
+        lot_sizes.update(self.lot_sizes or {})
+        return lot_sizes
@@ -7,12 +7,13 @@ TargetWeightStrategy
 import pandas as pd
 from tgtrader import bt
 from tgtrader.bt.core import Algo
+from tgtrader.bt.execution import ExecutionModel
 from tgtrader.data import DataGetter
 from tgtrader.strategies.bt.strategy_bt import BtStrategy
 from tgtrader.strategy import RebalancePeriod, strategy_def
 from tgtrader.data import DataGetter, DEFAULT_DATA_PROVIDER
 from tgtrader.common import SecurityType
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import json
 from pydantic import Field
 from tgtrader.strategy_config import StrategyConfig, strategy_config_def
@@ -47,7 +48,9 @@ class TargetWeightStrategy(BtStrategy):
                  integer_positions: bool = True, 
                  commissions = lambda q, p: 0.0,
                  backtest_field: str = 'close',
-                 initial_capital: float = 1000000.0):
+                 initial_capital: float = 1000000.0,
+                 execution_model: Optional[ExecutionModel] = None,
+                 lot_sizes: Optional[Dict[str, int]] = None):
         super().__init__(name="TargetWeightStrategy", 
                          symbols=symbols, 
                          rebalance_period=rebalance_period, 
@@ -55,9 +58,24 @@ class TargetWeightStrategy(BtStrategy):
                          integer_positions=integer_positions, 
                          commissions=commissions,
                          backtest_field=backtest_field,
-                         initial_capital=initial_capital)
+                         initial_capital=initial_capital,
+                         execution_model=execution_model,
+                         lot_sizes=lot_sizes)
         self.target_weights_dict = target_weights_dict
 
+    def vectorized_weights(self, columns: list[str]) -> Optional[pd.Series]:
+        # 仅每日再平衡、立即成交、不取整且没有交易费用时，目标权重组合的净值才等价于按固定权重加权的收益
+        if self.rebalance_period != RebalancePeriod.Daily or self.execution_model is not None:
+            return None
+        if self.integer_positions or self._has_commissions():
+            return None
+
+        return pd.Series(self.target_weights_dict, dtype=float).reindex(columns).fillna(0.0)
+
+    def _has_commissions(self) -> bool:
+        """交易费用函数对买入、卖出是否都返回0"""
+        return any(self.commissions(quantity, 10.0) != 0 for quantity in (100, -100))
+
     def _get_algos(self) -> list[Algo]:
         if self.rebalance_period == RebalancePeriod.Daily:
             period_run_algo = bt.algos.RunDaily()
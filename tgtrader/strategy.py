@@ -2,7 +2,7 @@
 from abc import abstractmethod
 import enum
 from typing import Dict, List, Optional, Type, Union
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 import pandas as pd
 import ffn
@@ -171,6 +171,19 @@ class PerformanceStats:
         return df.set_index('指标')
 
 
+@dataclass
+class BacktestResult:
+    """回测结果，不依赖回测引擎对象，可持久化后重新加载"""
+    # 策略净值，index为日期
+    prices: pd.DataFrame
+    # 性能统计指标
+    stats: PerformanceStats
+    # 各标的持仓权重，index为日期，columns为code
+    weights: pd.DataFrame = field(default_factory=pd.DataFrame)
+    # 交易记录，columns: [date, code, price, quantity]
+    transactions: pd.DataFrame = field(default_factory=pd.DataFrame)
+
+
 # 策略
 class StrategyDef:
     def __init__(self, 
@@ -185,9 +198,37 @@ class StrategyDef:
         self.rebalance_period: RebalancePeriod = rebalance_period
         self.initial_capital: float = initial_capital
         self.backtest_result: ffn.GroupStats = None
+        # 从结果存储中加载的回测结果，未重新运行回测时使用
+        self.loaded_result: Optional[BacktestResult] = None
 
 
     def backtest(self, start_date: str, end_date: str):
+        prices = self._load_price_matrix(start_date, end_date)
+        if prices is not None:
+            self.backtest_result = self._run_prices(prices, progress_bar=True)
+        else:
+            df = self._load_data(start_date, end_date)
+            self.backtest_result = self._run(df)
+        self.loaded_result = None
+
+    def get_result(self) -> BacktestResult:
+        """导出回测结果，用于持久化"""
+        if self.backtest_result is None and self.loaded_result is not None:
+            return self.loaded_result
+
+        return BacktestResult(prices=self.get_prices(), stats=self.performance_stats())
+
+    def load_result(self, result: BacktestResult):
+        """加载已保存的回测结果，无需重新运行回测"""
+        self.backtest_result = None
+        self.loaded_result = result
+
+    def _load_data(self, start_date: str, end_date: str) -> pd.DataFrame:
+        """获取回测所需的行情数据
+
+        Returns:
+            DataFrame with MultiIndex(code, date)，按code分组前值填充并去除nan
+        """
         # 遍历每个证券类型，获取数据
         dfs = []
         for security_type, symbols in self.symbols.items():
@@ -205,19 +246,56 @@ class StrategyDef:
         # 按code分组，按date排序，用前值填充，去除nan
         df = df.sort_values(['code', 'date']).groupby('code').fillna(method='ffill').dropna()
 
-        self.backtest_result = self._run(df)
+        return df
     
+    def _load_price_matrix(self, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """直接读取回测所需的 date x code 价格矩阵，跳过_load_data和_get_price_matrix
+
+        Returns:
+            前值填充后的价格矩阵，返回None时由_load_data获取行情后调用_run
+        """
+        return None
+
     @abstractmethod
     def _run(self, df: pd.DataFrame):
         raise NotImplementedError
+
+    def _get_price_matrix(self, df: pd.DataFrame) -> pd.DataFrame:
+        """将行情数据转换为 date x code 的价格矩阵"""
+        raise NotImplementedError
+
+    def _get_execution_data(self, df: pd.DataFrame) -> Optional[dict]:
+        """成交模型需要的附加行情矩阵(如开盘价、成交量)，不使用成交模型时为None"""
+        return None
+
+    def _run_prices(self, prices: pd.DataFrame, progress_bar: bool = False, additional_data: Optional[dict] = None):
+        """直接在价格矩阵上运行回测，用于重采样路径等不经过数据获取的场景"""
+        raise NotImplementedError
+
+    def vectorized_weights(self, columns: List[str]) -> Optional[pd.Series]:
+        """返回每日再平衡的固定目标权重，支持时可用向量化方式直接计算净值
+
+        向量化净值不考虑交易费用、整数(整手)持仓和成交模型，只有在策略的回测结果与之一致时才应返回权重。
+
+        Args:
+            columns: 价格矩阵的列(code)
+
+        Returns:
+            按columns对齐的权重，不支持向量化净值时返回None
+        """
+        return None
     
     @abstractmethod
     def get_prices(self) -> pd.DataFrame:
+        if self.backtest_result is None and self.loaded_result is not None:
+            return self.loaded_result.prices
         return self.backtest_result.prices
 
     @abstractmethod
     def performance_stats(self) -> PerformanceStats:
         """返回策略的性能统计指标"""
+        if self.backtest_result is None and self.loaded_result is not None:
+            return self.loaded_result.stats
         return PerformanceStats.from_ffn_stats(self.backtest_result.stats)
     
     @abstractmethod
@@ -9,6 +9,7 @@ from datetime import datetime
 
 from tgtrader.common import DataDbService, DataProvider, DataSource, MetaType, Period, PriceAdjust, SecurityType
 from tgtrader.data_provider.dao.models.t_meta_model import T_Meta_Model
+from tgtrader.data_provider.service.kline_sync_service import KlineSyncService
 
 
 def init_database(data_source: str):
@@ -49,6 +50,22 @@ def update_data(data_source: str,
                           meta_info,
                           sel_start_date,
                           sel_end_date)
+    elif meta_type in [MetaType.Stocks1dNfqKdata, MetaType.ETF1dNfqKdata]:
+        update_price_data(security_type,
+                          Period.Day,
+                          PriceAdjust.NO,
+                          data_provider,
+                          meta_info,
+                          sel_start_date,
+                          sel_end_date)
+    elif meta_type in [MetaType.Stocks1minNfqKdata, MetaType.ETF1minNfqKdata]:
+        update_price_data(security_type,
+                          Period.Minute,
+                          PriceAdjust.NO,
+                          data_provider,
+                          meta_info,
+                          sel_start_date,
+                          sel_end_date)
     else:
         raise NotImplementedError(f'元数据类型 {meta_type} 不支持')
 
@@ -59,34 +76,29 @@ def update_price_data(security_type: SecurityType,
                       meta_info: T_Meta_Model,
                       sel_start_date: str,
                       sel_end_date: str):
-    all_symbols = data_provider.get_all_symbols(security_type)
-    all_symbols = list(all_symbols['code'])
-
-    fetch_time_ranges = __get_fetch_time_range(sel_start_date, sel_end_date)
-
     progress_bar = st.progress(0)
     status_text = st.empty()
 
-    for i, (start_time, end_time) in enumerate(fetch_time_ranges):
-        progress = i / len(fetch_time_ranges)
+    def on_progress(progress: float, text: str):
         progress_bar.progress(progress)
-        status_text.text(f"更新数据： {start_time} 至 {end_time}...")
-
-        df = data_provider.get_price(all_symbols,
-                                     start_time,
-                                     end_time,
-                                     security_type,
-                                     period,    
-                                     adjust,
-                                     multi_thread_cnt=5)
-        data_provider.save_price_data(df, 
-                                      security_type,
-                                      period,
-                                      adjust)
-        time.sleep(0.1)
-        
-    progress_bar.progress(1.0)
-    status_text.text("更新完成!")
+        status_text.text(text)
+
+    # 按标的水位增量同步，已同步过的区间不再请求
+    sync_service = KlineSyncService(data_provider)
+    result = sync_service.sync(security_type,
+                               period,
+                               adjust,
+                               start_date=str(sel_start_date),
+                               end_date=str(sel_end_date),
+                               progress_callback=on_progress)
+
+    # 日线不复权数据配合复权因子计算前复权、后复权价格
+    if period == Period.Day and adjust == PriceAdjust.NO:
+        status_text.text("刷新复权因子...")
+        sync_service.sync_adj_factors(security_type)
+
+    status_text.text(f"更新完成! 新增标的 {len(result.new_symbols)} 个，写入 {result.row_count} 条，"
+                     f"失败 {len(result.failed_symbols)} 个")
     time.sleep(1)
     
     progress_bar.empty()
@@ -95,60 +107,19 @@ def update_price_data(security_type: SecurityType,
     st.rerun()
 
 
-def __get_fetch_time_range(sel_start_date: str, sel_end_date: str):
-    return __get_fetch_time_range_by_month(arrow.get(sel_start_date, tzinfo='+08:00').timestamp(),
-                                           arrow.get(sel_end_date, tzinfo='+08:00').timestamp())
-
-
-def __get_fetch_time_range_by_month(start_time: int, end_time: int) -> list:
-    """按年拆分时间范围
-
-    Args:
-        start_time: 开始时间戳
-        end_time: 结束时间戳
-
-    Returns:
-        list: [(start_time, end_time), ...] 按年拆分的时间范围列表
-    """
-    # 转换为arrow对象
-    start_date = arrow.get(start_time, tzinfo='+08:00')
-    end_date = arrow.get(end_time, tzinfo='+08:00')
-
-    # 初始化结果列表
-    time_ranges = []
-
-    # 当前处理的时间
-    current_date = start_date
-
-    # 按年拆分时间范围
-    while current_date <= end_date:
-        # 获取当年第一天和最后一天
-        year_start = current_date.floor('year')
-        year_end = current_date.ceil('year')
-
-        if year_start < current_date:
-            year_start = current_date
-        
-        if year_end > end_date:
-            year_end = end_date
-        
-        # 添加时间范围元组
-        time_ranges.append((
-            year_start.format('YYYY-MM-DD'),
-            year_end.format('YYYY-MM-DD')
-        ))
-
-        # 移动到下一年第一天
-        current_date = year_end.shift(days=1).floor('day')
-
-
-    return time_ranges
-
 def get_table_name(meta_type: MetaType):
     if meta_type == MetaType.Stocks1dHfqKdata:
         return 't_kdata'
     elif meta_type == MetaType.ETF1dHfqKdata:
         return 't_etf_kdata'
+    elif meta_type == MetaType.Stocks1dNfqKdata:
+        return 't_kdata_nfq'
+    elif meta_type == MetaType.ETF1dNfqKdata:
+        return 't_etf_kdata_nfq'
+    elif meta_type == MetaType.Stocks1minNfqKdata:
+        return 't_kdata_1min'
+    elif meta_type == MetaType.ETF1minNfqKdata:
+        return 't_etf_kdata_1min'
     else:
         raise NotImplementedError(f'元数据类型 {meta_type} 不支持')
     
@@ -270,3 +241,25 @@ def run():
                 meta_type=MetaType.ETF1dHfqKdata, 
                 title='ETF历史行情(日)', 
                 security_type=SecurityType.ETF)
+
+    # 日线不复权行情，前复权价格由复权因子计算
+    create_card(data_source, 
+                meta_type=MetaType.Stocks1dNfqKdata, 
+                title='股票历史行情(日，不复权+复权因子)', 
+                security_type=SecurityType.Stocks)
+
+    create_card(data_source, 
+                meta_type=MetaType.ETF1dNfqKdata, 
+                title='ETF历史行情(日，不复权+复权因子)', 
+                security_type=SecurityType.ETF)
+
+    # 分钟行情更新区域，数据源仅提供最近几个交易日的1分钟数据
+    create_card(data_source, 
+                meta_type=MetaType.Stocks1minNfqKdata, 
+                title='股票历史行情(1分钟)', 
+                security_type=SecurityType.Stocks)
+
+    create_card(data_source, 
+                meta_type=MetaType.ETF1minNfqKdata, 
+                title='ETF历史行情(1分钟)', 
+                security_type=SecurityType.ETF)
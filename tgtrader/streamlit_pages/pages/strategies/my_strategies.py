@@ -7,6 +7,7 @@ from tgtrader.strategies.bt.strategy_bt import BtStrategy
 from tgtrader.strategy import StrategyRegistry
 from tgtrader.streamlit_pages.pages.component.backtest_results import display_backtest_results
 from tgtrader.service.user_strategy import UserStrategyService
+from tgtrader.service.backtest_result_service import BacktestResultService
 from tgtrader.strategy_config import StrategyConfig, StrategyConfigRegistry
 from loguru import logger
 from datetime import datetime, timezone, timedelta
@@ -201,10 +202,9 @@ def view_strategy(strategy_id):
             # 合并所有参数并创建策略实例
             strategy = strategy_cls(**base_params, **other_params)
         
-        # 运行回测
+        # 运行回测，策略配置和行情数据未变化时直接读取已保存的结果
         with st.spinner('运行中...'):
-            end_date = datetime.now().strftime('%Y-%m-%d')
-            strategy.backtest(strategy_config.start_date, end_date)
+            BacktestResultService.get_or_run(strategy, strategy_obj.strategy, strategy_config.start_date)
             
             display_backtest_results(strategy, strategy_config.end_date)
         
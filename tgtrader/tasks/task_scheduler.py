@@ -4,12 +4,16 @@ import sys
 import logging
 from datetime import datetime
 from threading import Event
+import pandas as pd
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.jobstores.memory import MemoryJobStore
 from tgtrader.dao.t_task import TTask
 from tgtrader.dao.t_flow import FlowCfg
 from tgtrader.service.flow_config_service import FlowConfigService
+from tgtrader.data_provider.service.kline_sync_service import KlineSyncService
+from tgtrader.data_provider.trading_calendar import TradingCalendar
+from tgtrader.factor.factor_engine import FactorEngine
 from loguru import logger
 
 # 将APScheduler的日志转发到loguru
@@ -49,6 +53,9 @@ class TaskScheduler:
     """
     
     _instance: Optional['TaskScheduler'] = None
+
+    # 内置的K线增量同步任务，交易日收盘后运行
+    KLINE_SYNC_CRONTAB = '30 16 * * 1-5'
     
     def __new__(cls) -> 'TaskScheduler':
         """单例模式实现."""
@@ -105,6 +112,18 @@ class TaskScheduler:
             replace_existing=True
         )
         logger.info("Task scanner started")
+
+        # 添加内置的K线增量同步job
+        self.scheduler.add_job(
+            func=self._run_kline_sync,
+            trigger=CronTrigger.from_crontab(self.KLINE_SYNC_CRONTAB, timezone='Asia/Shanghai'),
+            id='kline_sync',
+            name='Kline Sync',
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True
+        )
+        logger.info(f"Kline sync job started with schedule: {self.KLINE_SYNC_CRONTAB}")
         
     def stop(self) -> None:
         """停止调度器."""
@@ -293,6 +312,29 @@ class TaskScheduler:
             logger.exception(e)
             logger.error(f"Failed to execute task {task_id}: {str(e)}")
 
+    def _run_kline_sync(self) -> None:
+        """执行K线增量同步."""
+        try:
+            # 工作日的节假日休市，没有新数据
+            today = pd.Timestamp.now(tz='Asia/Shanghai').strftime('%Y-%m-%d')
+            if not TradingCalendar.get().is_session(today):
+                logger.info(f"Skip kline sync, {today} is not a trading day")
+                return
+
+            logger.info(f"Executing kline sync at {datetime.now()}")
+            KlineSyncService().sync_all()
+        except Exception as e:
+            logger.exception(e)
+            logger.error(f"Failed to execute kline sync: {str(e)}")
+            return
+
+        # 因子依赖当日K线，同步完成后增量更新
+        try:
+            FactorEngine().update()
+        except Exception as e:
+            logger.exception(e)
+            logger.error(f"Failed to update factors: {str(e)}")
+
     @classmethod
     def run_service(cls) -> None:
         """运行任务服务的主函数."""
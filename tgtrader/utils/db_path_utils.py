@@ -71,3 +71,50 @@ def get_common_data_database() -> SqliteDatabase:
     })
     return db
 
+
+def get_backtest_result_dir() -> str:
+    """
+    获取回测结果存储目录。
+
+    Returns:
+        str: 目录路径
+    """
+    default_path = os.path.join(os.getcwd(), 'data', 'backtest_results')
+    result_dir: str = os.getenv('BACKTEST_RESULT_PATH', default_path)
+    os.makedirs(result_dir, exist_ok=True)
+    return result_dir
+
+
+def get_kdata_lake_dir() -> str:
+    """
+    获取K线Parquet数据湖目录。
+
+    Returns:
+        str: 目录路径
+    """
+    default_path = os.path.join(os.getcwd(), 'data', 'kdata_lake')
+    lake_dir: str = os.getenv('KDATA_LAKE_PATH', default_path)
+    os.makedirs(lake_dir, exist_ok=True)
+    return lake_dir
+
+
+def get_price_matrix_dir() -> str:
+    """
+    获取价格矩阵快照目录。
+
+    Returns:
+        str: 目录路径
+    """
+    default_path = os.path.join(os.getcwd(), 'data', 'price_matrix')
+    return os.getenv('PRICE_MATRIX_PATH', default_path)
+
+
+def get_file_data_dir() -> str:
+    """
+    获取本地行情文件(CSV/Parquet)目录。
+
+    Returns:
+        str: 目录路径
+    """
+    default_path = os.path.join(os.getcwd(), 'data', 'files')
+    return os.getenv('FILE_DATA_PATH', default_path)
@@ -40,6 +40,11 @@ class DuckDBDatabase(Database):
         'ILIKE': 'ILIKE'
     }
 
+    # peewee maps DoubleField to REAL, which is single precision in DuckDB
+    field_types = {
+        'DOUBLE': 'DOUBLE'
+    }
+
     index_schema_prefix = True
     limit_max = -1
     server_version = None
@@ -6,9 +6,18 @@ import pandas as pd
 from typing import List, Optional, Tuple
 
 from tgtrader.data_provider.dao.akshare.common import main_db as akshare_db
+from tgtrader.data_provider.kdata_lake import KDataLake
 
 class DuckDBQuery:
-    def __init__(self, db: Optional[DuckDBDatabase|DataSource|str] = None):
+    def __init__(self, db: Optional[DuckDBDatabase|DataSource|KDataLake|str] = None):
+        """
+        Args:
+            db: 数据库、数据源名称，或K线数据湖(KDataLake)。数据湖的每种K线注册为与元数据类型同名的视图，
+                如 SELECT * FROM stocks_1d_hfq_kdata WHERE year = 2024
+        """
+        if isinstance(db, KDataLake):
+            db = db.database()
+
         if isinstance(db, str):
             db = DataSource(db.lower())
         